@@ -2,16 +2,39 @@
 Module that contains all request APIs
 """
 import json
+import logging
 import flask
 from core_lib.api.api_base import APIBase
 from core_lib.utils.common_utils import clean_split
 from core.controller.request_controller import RequestController
 from core.model.request import Request
+from core.utils.job_queue import JobQueue
 
 
 request_controller = RequestController()
 
 
+def stream_text(chunks):
+    """
+    Return a plain text response that sends chunks as they are made
+    First chunk is made right away, so errors before any output become error responses
+    Errors after that cannot change the status that was already sent, so they
+    end the output with an error line and a command that stops the script
+    """
+    chunks = iter(chunks)
+    first_chunk = next(chunks, '')
+
+    def iter_chunks():
+        yield first_chunk
+        try:
+            yield from chunks
+        except Exception as ex:
+            logging.getLogger().error('Error streaming text: %s', ex, exc_info=True)
+            yield f'\n\n# ERROR: output is incomplete: {ex}\nexit 1\n'
+
+    return flask.Response(iter_chunks(), mimetype='text/plain')
+
+
 class CreateRequestAPI(APIBase):
     """
     Endpoint for creating a request
@@ -25,12 +48,18 @@ class CreateRequestAPI(APIBase):
     @APIBase.ensure_role('manager')
     def put(self):
         """
-        Create a request with the provided JSON content. Requires a unique prepid
+        Create a request or a list of requests with the provided JSON content
         """
         data = flask.request.data
         request_json = json.loads(data.decode('utf-8'))
-        obj = request_controller.create(request_json)
-        return self.output_text({'response': obj.get_json(), 'success': True, 'message': ''})
+        if isinstance(request_json, dict):
+            results = request_controller.create(request_json).get_json()
+        elif isinstance(request_json, list):
+            results = [r.get_json() for r in request_controller.create_many(request_json)]
+        else:
+            raise ValueError('Expected a single request dict or a list of request dicts')
+
+        return self.output_text({'response': results, 'success': True, 'message': ''})
 
 
 class DeleteRequestAPI(APIBase):
@@ -105,10 +134,28 @@ class GetRequestAPI(APIBase):
         Get a single request with given prepid
         """
         args = flask.request.args
-        obj = request_controller.get(prepid, args.get('deleted', '').lower() == 'true')
+        obj = request_controller.get_read_only(prepid,
+                                               args.get('deleted', '').lower() == 'true')
         return self.output_text({'response': obj.get_json(), 'success': True, 'message': ''})
 
 
+class GetRequestChainAPI(APIBase):
+    """
+    Endpoint for getting all input and subsequent requests of a request
+    """
+
+    def __init__(self):
+        APIBase.__init__(self)
+
+    @APIBase.exceptions_to_errors
+    def get(self, prepid):
+        """
+        Get a list of all requests in the chain of given request
+        """
+        chain = request_controller.get_chain(prepid)
+        return self.output_text({'response': chain, 'success': True, 'message': ''})
+
+
 class GetEditableRequestAPI(APIBase):
     """
     Endpoint for getting information on which request fields are editable
@@ -159,10 +206,9 @@ class GetCMSDriverAPI(APIBase):
         """
         Get a text file with request's cmsDriver.py commands
         """
-        request = request_controller.get(prepid)
+        request = request_controller.get_read_only(prepid)
         for_submission = flask.request.args.get('submission', '').lower() == 'true'
-        commands = request_controller.get_cmsdriver(request, for_submission)
-        return self.output_text(commands, content_type='text/plain')
+        return stream_text(request_controller.iter_cmsdriver(request, for_submission))
 
 
 class GetConfigUploadAPI(APIBase):
@@ -178,9 +224,8 @@ class GetConfigUploadAPI(APIBase):
         """
         Get a text file with request's cmsDriver.py commands
         """
-        request = request_controller.get(prepid)
-        commands = request_controller.get_config_upload_file(request)
-        return self.output_text(commands, content_type='text/plain')
+        request = request_controller.get_read_only(prepid)
+        return stream_text(request_controller.iter_config_upload_file(request))
 
 
 class GetRequestJobDictAPI(APIBase):
@@ -196,13 +241,35 @@ class GetRequestJobDictAPI(APIBase):
         """
         Get a text file with ReqMgr2's dictionary
         """
-        request = request_controller.get(prepid)
-        dict_string = json.dumps(request_controller.get_job_dict(request),
-                                 indent=2,
-                                 sort_keys=True)
+        job_dicts, errors = request_controller.get_job_dicts([prepid])
+        if errors:
+            raise ValueError(errors[prepid])
+
+        dict_string = json.dumps(job_dicts[prepid], indent=2, sort_keys=True)
         return self.output_text(dict_string, content_type='text/plain')
 
 
+class GetRequestJobDictsAPI(APIBase):
+    """
+    Endpoint for getting dictionaries with job information of multiple requests
+    """
+
+    def __init__(self):
+        APIBase.__init__(self)
+
+    @APIBase.exceptions_to_errors
+    def get(self, prepid):
+        """
+        Get ReqMgr2's dictionaries of comma separated requests
+        """
+        job_dicts, errors = request_controller.get_job_dicts(clean_split(prepid, ','))
+        if errors:
+            message = '\n'.join(f'{p}: {e}' for p, e in sorted(errors.items()))
+            return self.output_text({'response': job_dicts, 'success': False, 'message': message})
+
+        return self.output_text({'response': job_dicts, 'success': True, 'message': ''})
+
+
 class RequestNextStatus(APIBase):
     """
     Endpoint for moving one or multiple requests to next status
@@ -364,19 +431,57 @@ class UpdateRequestWorkflowsAPI(APIBase):
             results = request_controller.update_workflows(request)
             results = results.get_json()
         elif isinstance(request_json, list):
-            results = []
-            for single_request_json in request_json:
-                prepid = single_request_json.get('prepid')
-                request = request_controller.get(prepid)
-                results.append(request_controller.update_workflows(request))
-
+            prepids = [r.get('prepid') for r in request_json]
+            results, errors = request_controller.update_workflows_many(prepids)
             results = [x.get_json() for x in results]
+            if errors:
+                message = '\n'.join(f'{p}: {e}' for p, e in sorted(errors.items()))
+                return self.output_text({'response': results, 'success': False, 'message': message})
         else:
             raise ValueError('Expected a single request dict or a list of request dicts')
 
         return self.output_text({'response': results, 'success': True, 'message': ''})
 
 
+class MoveSubmittedToDoneAPI(APIBase):
+    """
+    Endpoint for trying to move all submitted requests to done in a background
+    job and getting progress of the job
+    """
+
+    def __init__(self):
+        APIBase.__init__(self)
+
+    @APIBase.exceptions_to_errors
+    def get(self):
+        """
+        Get status and progress of a job with key given in "job" argument or
+        of the last job
+        """
+        key = flask.request.args.get('job')
+        job_queue = JobQueue()
+        if key:
+            job = job_queue.get_job(key)
+        else:
+            job = job_queue.get_last_job('move_submitted_to_done')
+
+        if not job:
+            raise ValueError(f'Job "{key}" does not exist' if key else 'There are no jobs')
+
+        return self.output_text({'response': job, 'success': True, 'message': ''})
+
+    @APIBase.exceptions_to_errors
+    @APIBase.ensure_role('manager')
+    def post(self):
+        """
+        Start a job that updates all submitted requests from Stats2 and moves
+        finished ones to done
+        Return key of the job that can be used to get its progress
+        """
+        key = request_controller.start_move_submitted_to_done()
+        return self.output_text({'response': key, 'success': True, 'message': ''})
+
+
 class RequestOptionResetAPI(APIBase):
     """
     Endpoint for rewriting request values from subcampaign
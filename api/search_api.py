@@ -1,14 +1,17 @@
 """
 Module that contains all search APIs
 """
-import re
-import time
 import flask
 from core_lib.api.api_base import APIBase
 from core_lib.database.database import Database
+from core_lib.utils.common_utils import clean_split
 from core.model.subcampaign import Subcampaign
 from core.model.ticket import Ticket
 from core.model.request import Request
+from core.utils.search_index import SearchIndex
+from core.utils.prepid_index import PrepidIndex
+from core.utils.search_query import SearchQuery
+from core.utils.ticket_requests_cache import TicketRequestsCache
 
 
 class SearchAPI(APIBase):
@@ -36,23 +39,41 @@ class SearchAPI(APIBase):
         limit = int(args.pop('limit', 20))
         sort = args.pop('sort', None)
         sort_asc = args.pop('sort_asc', 'true').lower() == 'true'
+        # Cursor pagination, projection and count options
+        cursor = args.pop('cursor', None)
+        fields = args.pop('fields', None)
+        count = args.pop('count', None)
 
         # Special cases
         from_ticket = args.pop('ticket', None)
+        prepids = None
         if db_name == 'requests' and from_ticket:
-            ticket_database = Database('tickets')
-            tickets = ticket_database.query(query_string=f'prepid={from_ticket}',
-                                            limit=100,
-                                            ignore_case=True)
-            created_requests = []
-            for ticket in tickets:
-                created_requests.extend(ticket['created_requests'])
-
-            created_requests = ','.join(created_requests)
-            prepid_query = args.pop('prepid', '')
-            args['prepid'] = ('%s,%s' % (prepid_query, created_requests)).strip(',')
+            # Requests of tickets are matched by exact prepids instead of a query string
+            prepids = TicketRequestsCache().get(from_ticket)
 
         limit = max(1, min(limit, 500))
+        if cursor is not None or fields is not None or count is not None or prepids is not None:
+            if count not in (None, 'exact', 'estimated', 'none'):
+                raise ValueError('Count must be "exact", "estimated" or "none"')
+
+            legacy = cursor is None and fields is None and count is None
+            search_query = SearchQuery(db_name, self.classes[db_name])
+            response = search_query.search(args,
+                                           sort_attr=sort,
+                                           sort_asc=sort_asc,
+                                           limit=limit,
+                                           cursor=cursor,
+                                           fields=clean_split(fields, ',') if fields else None,
+                                           count='exact' if legacy else count or 'estimated',
+                                           page=page,
+                                           prepids=prepids)
+            if legacy:
+                # Ticket lookups without new options keep the response of other searches
+                response = {'results': response['results'],
+                            'total_rows': response['total_rows']}
+
+            return self.output_text({'response': response, 'success': True, 'message': ''})
+
         query_string = '&&'.join(['%s=%s' % (pair) for pair in args.items()])
         database = Database(db_name)
         query_string = database.build_query_with_types(query_string, self.classes[db_name])
@@ -63,7 +84,6 @@ class SearchAPI(APIBase):
                                                              sort_asc=sort_asc,
                                                              ignore_case=True)
 
-
         return self.output_text({'response': {'results': results,
                                               'total_rows': total_rows},
                                  'success': True,
@@ -88,16 +108,13 @@ class SuggestionsAPI(APIBase):
             args = {}
 
         db_name = args.pop('db_name', None)
-        query = args.pop('query', None).replace(' ', '.*')
-        limit = max(1, min(50, args.pop('limit', 20)))
+        query = args.pop('query', None)
+        limit = max(1, min(50, int(args.pop('limit', 20))))
 
-        if not db_name or not query:
+        if db_name not in ('subcampaigns', 'tickets', 'requests') or not query:
             raise ValueError('Bad db_name or query parameter')
 
-        database = Database(db_name)
-        db_query = {'prepid': re.compile(f'.*{query}.*', re.IGNORECASE)}
-        results = database.collection.find(db_query).limit(limit)
-        results = [x['prepid'] for x in results]
+        results = PrepidIndex.get(db_name).suggest(query, limit)
 
         return self.output_text({'response': results,
                                  'success': True,
@@ -111,9 +128,6 @@ class WildSearchAPI(APIBase):
 
     def __init__(self):
         APIBase.__init__(self)
-        self.classes = {'subcampaigns': Subcampaign,
-                        'requests': Request,
-                        'tickets': Ticket}
 
     @APIBase.exceptions_to_errors
     def get(self):
@@ -136,105 +150,7 @@ class WildSearchAPI(APIBase):
                                      'success': True,
                                      'message': 'Query string too short'})
 
-        subcampaigns_db = Database('subcampaigns')
-        tickets_db = Database('tickets')
-        requests_db = Database('requests')
-
-        attempts = [('requests', requests_db, 'prepid', False),
-                    ('tickets', tickets_db, 'prepid', False),
-                    ('subcampaigns', subcampaigns_db, 'prepid', False),
-                    ('requests', requests_db, 'prepid', True),
-                    ('tickets', tickets_db, 'prepid', True),
-                    ('subcampaigns', subcampaigns_db, 'prepid', True),
-                    # Tickets
-                    ('tickets', tickets_db, 'subcampaign', True),
-                    ('tickets', tickets_db, 'processing_string', True),
-                    ('tickets', tickets_db, 'input', True),
-                    # Requests
-                    ('requests', requests_db, 'subcampaign', True),
-                    ('requests', requests_db, 'processing_string', True),
-                    ('requests', requests_db, 'input_dataset', True),
-                    ('requests', requests_db, 'output_dataset', True),
-                    ('requests', requests_db, 'workflow', True),]
-
-        results = []
-        used_values = set()
-        for attempt in attempts:
-            db_name = attempt[0]
-            database = attempt[1]
-            attr = attempt[2]
-            wrap_in_wildcards = attempt[3]
-            if wrap_in_wildcards:
-                wrapped_query = f'*{query}*'
-            else:
-                wrapped_query = f'{query}'
-
-            self.logger.info('Trying to query %s in %s', wrapped_query, db_name)
-            typed_query = database.build_query_with_types(f'{attr}={wrapped_query}',
-                                                          self.classes[db_name])
-            query_results = database.query(typed_query, 0, 5, ignore_case=True)
-            for result in query_results:
-                values = self.extract_values(result, attr, wrapped_query, db_name)
-                for value in values:
-                    key = f'{db_name}:{attr}:{value}'
-                    if key not in used_values:
-                        used_values.add(key)
-                        results.append({'value': value,
-                                        'attribute': attr,
-                                        'database': db_name})
-
-            # Limit results to 20 to save DB some queries
-            if len(results) >= 20:
-                results = results[:20]
-                break
-
-            # Limit DB query rate as this is very expensive
-            time.sleep(0.075)
-
+        results = SearchIndex().search(query, limit=20)
         return self.output_text({'response': results,
                                  'success': True,
                                  'message': ''})
-
-    def extract_values(self, item, attribute, query, db_name):
-        """
-        Return a list of one or multiple values got from an object
-        One object might have multiple values, e.g. output datasets
-        """
-        if attribute in item and attribute != 'input':
-            return [item[attribute]]
-
-        values = []
-        matcher = re.compile(query.replace('*', '.*'), re.IGNORECASE)
-        self.logger.info('Item: %s, attribute: %s, query: %s, db name: %s',
-                         item['prepid'],
-                         attribute,
-                         query,
-                         db_name)
-        if db_name == 'tickets':
-            if attribute in ('subcampaign', 'processing_string'):
-                for step in item['steps']:
-                    if matcher.fullmatch(step[attribute]):
-                        values.append(step[attribute])
-            elif attribute == 'input':
-                for input_item in item['input']:
-                    if matcher.fullmatch(input_item):
-                        values.append(input_item)
-
-        elif db_name == 'requests':
-            if attribute == 'input_dataset':
-                values.append(item['input']['dataset'])
-
-            elif attribute == 'input_request':
-                values.append(item['input']['request'])
-
-            elif attribute == 'output_dataset':
-                for dataset in item['output_datasets']:
-                    if matcher.fullmatch(dataset):
-                        values.append(dataset)
-
-            elif attribute == 'workflow':
-                for workflow in item['workflows']:
-                    if matcher.fullmatch(workflow['name']):
-                        values.append(workflow['name'])
-
-        return values
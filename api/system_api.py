@@ -1,13 +1,21 @@
 """
 Module that contains all system APIs
 """
+import json
 import time
 import os.path
+import flask
 from core_lib.api.api_base import APIBase
 from core_lib.utils.locker import Locker
-from core_lib.database.database import Database
 from core_lib.utils.user_info import UserInfo
 from core.utils.request_submitter import RequestSubmitter
+from core.utils.config_cache import ConfigCache
+from core.utils.dcs_cache import DCSCache
+from core.utils.job_queue import JobQueue
+from core.utils.job_dict_cache import JobDictCache
+from core.utils.scram_arch_index import ScramArchIndex
+from core.utils.index_manager import IndexManager
+from core.utils.object_stats import ObjectStats
 
 
 class SubmissionWorkerStatusAPI(APIBase):
@@ -21,11 +29,122 @@ class SubmissionWorkerStatusAPI(APIBase):
     @APIBase.exceptions_to_errors
     def get(self):
         """
-        Get status of all request submission workers
+        Get status of all request submission workers and submission stages
+        """
+        submitter = RequestSubmitter()
+        status = {'workers': submitter.get_worker_status(),
+                  'stages': submitter.get_stage_status(),
+                  'connections': submitter.get_connection_status(),
+                  'config_cache': submitter.get_config_cache_status()}
+        return self.output_text({'response': status, 'success': True, 'message': ''})
+
+
+class ConfigCacheAPI(APIBase):
+    """
+    Endpoint for invalidating cached config IDs
+    """
+
+    def __init__(self):
+        APIBase.__init__(self)
+
+    @APIBase.ensure_request_data
+    @APIBase.exceptions_to_errors
+    @APIBase.ensure_role('administrator')
+    def delete(self):
+        """
+        Remove cached configs of given CMSSW release or all cached configs
+        """
+        data = json.loads(flask.request.data.decode('utf-8'))
+        deleted = ConfigCache().invalidate(data.get('cmssw_release'))
+        return self.output_text({'response': {'deleted': deleted},
+                                 'success': True,
+                                 'message': ''})
+
+
+class CacheStatusAPI(APIBase):
+    """
+    Endpoint for getting hit and miss statistics of caches
+    """
+
+    def __init__(self):
+        APIBase.__init__(self)
+
+    @APIBase.exceptions_to_errors
+    def get(self):
+        """
+        Get statistics of all caches
+        """
+        status = {'dcs': DCSCache().get_status(),
+                  'job_dict': JobDictCache().get_status(),
+                  'scram_arch': ScramArchIndex().get_status(),
+                  'object_stats': ObjectStats().get_status()}
+        return self.output_text({'response': status, 'success': True, 'message': ''})
+
+
+class IndexStatusAPI(APIBase):
+    """
+    Endpoint for checking and creating database indexes
+    """
+
+    def __init__(self):
+        APIBase.__init__(self)
+
+    @APIBase.exceptions_to_errors
+    def get(self):
+        """
+        Get declared and missing indexes and plans of latest slow queries
         """
-        status = RequestSubmitter().get_worker_status()
+        index_manager = IndexManager()
+        status = index_manager.get_status()
+        status['declared'] = index_manager.get_declared_indexes()
+        status['missing'] = index_manager.get_missing_indexes()
         return self.output_text({'response': status, 'success': True, 'message': ''})
 
+    @APIBase.exceptions_to_errors
+    @APIBase.ensure_role('administrator')
+    def post(self):
+        """
+        Create missing indexes
+        """
+        created = IndexManager().create_indexes()
+        return self.output_text({'response': {'created': created},
+                                 'success': True,
+                                 'message': ''})
+
+
+class JobQueueAPI(APIBase):
+    """
+    Endpoint for inspecting and retrying background jobs
+    """
+
+    def __init__(self):
+        APIBase.__init__(self)
+
+    @APIBase.exceptions_to_errors
+    def get(self):
+        """
+        Get number of jobs in each status and list of jobs that are not done
+        or jobs with status given in "status" argument
+        """
+        args = flask.request.args
+        job_queue = JobQueue()
+        jobs = job_queue.get_jobs(args.get('status'), int(args.get('limit', 100)))
+        return self.output_text({'response': {'status': job_queue.get_status(),
+                                              'jobs': jobs},
+                                 'success': True,
+                                 'message': ''})
+
+    @APIBase.ensure_request_data
+    @APIBase.exceptions_to_errors
+    @APIBase.ensure_role('administrator')
+    def post(self):
+        """
+        Retry a failed job with given key
+        """
+        data = json.loads(flask.request.data.decode('utf-8'))
+        JobQueue().retry(data['key'])
+        return self.output_text({'response': data['key'], 'success': True, 'message': ''})
+
 
 class SubmissionQueueAPI(APIBase):
     """
@@ -88,53 +207,72 @@ class ObjectsInfoAPI(APIBase):
     def __init__(self):
         APIBase.__init__(self)
 
-    def get_requests(self):
+    @staticmethod
+    def sum_by(counts, attribute_index, order=None):
         """
-        Return summary of requests by status and submitted requests by processing string
+        Return list of attribute values and numbers of objects with these values
         """
-        collection = Database('requests').collection
-        by_status = collection.aggregate([{'$match': {'deleted': {'$ne': True}}},
-                                          {'$group': {'_id': '$status',
-                                                      'count': {'$sum': 1}}}])
+        sums = {}
+        for key, count in counts.items():
+            sums[key[attribute_index]] = sums.get(key[attribute_index], 0) + count
+
+        order = order or []
+        return sorted([{'_id': value, 'count': count} for value, count in sums.items()],
+                      key=lambda x: (order.index(x['_id']) if x['_id'] in order else len(order),
+                                     x['_id']))
 
-        by_processing_string = collection.aggregate([{'$match': {'deleted': {'$ne': True}}},
-                                                     {'$match': {'status': 'submitted'}},
-                                                     {'$group': {'_id': '$processing_string',
-                                                                 'count': {'$sum': 1}}},
-                                                     {'$sort': {'count': -1}}])
+    def get_requests(self, counts):
+        """
+        Return summary of requests by status, submitted requests by processing
+        string and requests of each subcampaign by status
+        """
         statuses = ['new', 'approved', 'submitting', 'submitted', 'done']
-        by_status = sorted(list(by_status), key=lambda x: statuses.index(x['_id']))
-        by_processing_string = sorted(list(by_processing_string),
+        by_status = self.sum_by(counts, 0, statuses)
+        submitted = {k: c for k, c in counts.items() if k[0] == 'submitted'}
+        by_processing_string = sorted(self.sum_by(submitted, 2),
                                       key=lambda x: (x['count'], x['_id'].lower()),
                                       reverse=True)
-        self.logger.debug('Requests - by status %s, by PS %s',
+        by_subcampaign = []
+        for subcampaign in self.sum_by(counts, 1):
+            subcampaign_counts = {k: c for k, c in counts.items() if k[1] == subcampaign['_id']}
+            subcampaign['by_status'] = self.sum_by(subcampaign_counts, 0, statuses)
+            by_subcampaign.append(subcampaign)
+
+        self.logger.debug('Requests - by status %s, by PS %s, by subcampaign %s',
                           len(by_status),
-                          len(by_processing_string))
-        return by_status, by_processing_string
+                          len(by_processing_string),
+                          len(by_subcampaign))
+        return by_status, by_processing_string, by_subcampaign
 
-    def get_tickets(self):
+    def get_tickets(self, counts):
         """
         Return summary of tickets by status
         """
-        collection = Database('tickets').collection
-        by_status = collection.aggregate([{'$match': {'deleted': {'$ne': True}}},
-                                          {'$group': {'_id': '$status',
-                                                      'count': {'$sum': 1}}}])
-
-        statuses = ['new', 'done']
-        by_status = sorted(list(by_status), key=lambda x: statuses.index(x['_id']))
+        by_status = self.sum_by(counts, 0, ['new', 'done'])
         self.logger.debug('Tickets - by status %s', len(by_status))
         return by_status
 
     @APIBase.exceptions_to_errors
     def get(self):
         """
-        Get number of Requests with each status and processing strings of submitted requests
+        Get number of Requests with each status, processing strings of submitted
+        requests and number of requests of each subcampaign with each status
         """
-        requests_by_status, requests_by_ps = self.get_requests()
-        tickets_by_status = self.get_tickets()
-        return self.output_text({'response': {'requests' : {'by_status': requests_by_status,
-                                                            'by_processing_string': requests_by_ps},
+        object_stats = ObjectStats()
+        if not object_stats.is_reconciled():
+            # Numbers are counted until first reconciliation finished
+            request_counts = object_stats.count('requests')
+            ticket_counts = object_stats.count('tickets')
+        else:
+            request_counts = object_stats.get_counts('requests')
+            ticket_counts = object_stats.get_counts('tickets')
+
+        by_status, by_processing_string, by_subcampaign = self.get_requests(request_counts)
+        requests = {'by_status': by_status,
+                    'by_processing_string': by_processing_string,
+                    'by_subcampaign': by_subcampaign}
+        tickets_by_status = self.get_tickets(ticket_counts)
+        return self.output_text({'response': {'requests' : requests,
                                               'tickets' : {'by_status': tickets_by_status}},
                                  'success': True,
                                  'message': ''})
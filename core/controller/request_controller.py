@@ -2,12 +2,16 @@
 Module that contains RequestController class
 """
 import json
+import time
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import environment
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError
 from core_lib.database.database import Database
 from core_lib.utils.common_utils import (change_workflow_priority,
                                          cmsweb_reject_workflows,
                                          dbs_dataset_runs,
-                                         get_scram_arch,
                                          config_cache_lite_setup,
                                          dbs_datasetlist,
                                          get_workflows_from_stats,
@@ -20,10 +24,27 @@ from core.model.subcampaign import Subcampaign
 from core.model.ticket import Ticket
 from core.utils.request_submitter import RequestSubmitter
 from core.controller.subcampaign_controller import SubcampaignController
+from core.utils.serial_number_counter import SerialNumberCounter
+from core.utils.request_graph import RequestGraph
+from core.utils.job_queue import JobQueue
+from core.utils.job_dict_cache import JobDictCache
+from core.utils.scram_arch_index import ScramArchIndex
+from core.utils.search_index import SearchIndex
+from core.utils.prepid_index import PrepidIndex
+from core.utils.ticket_requests_cache import TicketRequestsCache
+from core.utils.object_stats import ObjectStats
 
 
 DEAD_WORKFLOW_STATUS = {'rejected', 'aborted', 'failed', 'rejected-archived',
                         'aborted-archived', 'failed-archived', 'aborted-completed'}
+# Number of concurrent Stats2 queries when updating many requests
+STATS_WORKERS = 8
+# Number of workflows fetched by name in one Stats2 query
+STATS_BATCH_SIZE = 100
+# Number of requests that are locked and saved in one bulk write
+WRITE_BATCH_SIZE = 100
+# Number of times requests that were changed by other processes are updated again
+WRITE_ATTEMPTS = 3
 
 
 class RequestController(ControllerBase):
@@ -31,10 +52,15 @@ class RequestController(ControllerBase):
     Controller that has all actions related to a request
     """
 
-    def __init__(self):
+    def __init__(self, propagate=True):
+        """
+        Propagate tells whether updates of requests are propagated to their
+        subsequent requests
+        """
         ControllerBase.__init__(self)
         self.database_name = 'requests'
         self.model_class = Request
+        self.propagate = propagate
 
     def create(self, json_data):
         # Get a subcampaign
@@ -46,7 +72,31 @@ class RequestController(ControllerBase):
 
         request_db = Database(self.database_name)
         subcampaign = Subcampaign(json_input=subcampaign_json)
+        input_requests = {}
+        input_request_prepid = json_data.get('input', {}).get('request')
+        if input_request_prepid:
+            input_request_json = request_db.get(input_request_prepid)
+            if input_request_json:
+                input_requests[input_request_prepid] = Request(json_input=input_request_json,
+                                                               read_only=True)
+
+        new_request, prepid_middle_part = self.build_new_request(json_data,
+                                                                 subcampaign,
+                                                                 input_requests)
+        # Get a new serial number
+        prepid_prefix = f'ReReco-{prepid_middle_part}'
+        serial_number = SerialNumberCounter(self.database_name).reserve(prepid_prefix)
+        prepid = f'{prepid_prefix}-{serial_number:05d}'
+        new_request.set('prepid', prepid)
+        new_request_json = super().create(new_request.get_json())
+        return new_request_json
 
+    def build_new_request(self, json_data, subcampaign, input_requests):
+        """
+        Make a new request object based on given json and subcampaign
+        Input requests is a dictionary of prepids and request objects that might be input
+        Return request and middle part of prepid
+        """
         json_data['cmssw_release'] = subcampaign.get('cmssw_release')
         json_data['subcampaign'] = subcampaign.get_prepid()
         json_data['prepid'] = 'PlaceholderPrepID'
@@ -88,28 +138,109 @@ class RequestController(ControllerBase):
             era = input_dataset_parts[1].split('-')[0]
             dataset = input_dataset_parts[0]
         elif not input_dataset and input_request_prepid:
-            input_request_json = request_db.get(input_request_prepid)
-            if not input_request_json:
+            input_request = input_requests.get(input_request_prepid)
+            if not input_request:
                 raise ValueError(f'Request "{input_request_prepid}" does not exist')
 
-            input_request = Request(json_input=input_request_json)
             era = input_request.get_era()
             dataset = input_request.get_dataset()
+            if input_request.get_prepid() != input_request_prepid:
+                # Input was referenced by a temporary prepid
+                new_request.set('input', {'dataset': '',
+                                          'request': input_request.get_prepid()})
         else:
             raise AssertionError('Request must have either a input request or input dataset')
 
         processing_string = new_request.get('processing_string')
         prepid_middle_part = f'{era}-{dataset}-{processing_string}'
-        with self.locker.get_lock(f'create-request-prepid-{prepid_middle_part}'):
-            # Get a new serial number
-            serial_number = self.get_highest_serial_number(request_db,
-                                                           f'ReReco-{prepid_middle_part}-*')
-            serial_number += 1
-            prepid = f'ReReco-{prepid_middle_part}-{serial_number:05d}'
-            new_request.set('prepid', prepid)
-            new_request_json = super().create(new_request.get_json())
+        return new_request, prepid_middle_part
 
-        return new_request_json
+    def create_many(self, json_list):
+        """
+        Create multiple requests at once and return list of created requests
+        Request may have a temporary prepid which can be used as input request
+        of other requests in the list. All requests are checked before they are
+        inserted in one operation. If insertion fails, inserted requests are removed
+        """
+        request_db = Database(self.database_name)
+        subcampaign_names = list({j.get('subcampaign') for j in json_list})
+        subcampaign_db = Database('subcampaigns')
+        subcampaigns = subcampaign_db.collection.find({'_id': {'$in': subcampaign_names}})
+        subcampaigns = {s['_id']: Subcampaign(json_input=s) for s in subcampaigns}
+        input_request_prepids = {j.get('input', {}).get('request') for j in json_list}
+        input_request_prepids = list(input_request_prepids - {'', None})
+        input_requests = request_db.collection.find({'_id': {'$in': input_request_prepids}})
+        input_requests = {r['_id']: Request(json_input=r, read_only=True) for r in input_requests}
+        # New requests with their new input requests, new requests by temporary
+        # prepids and new requests grouped by prepid prefix
+        new_requests = []
+        temporary_prepids = {}
+        prefixes = {}
+        for json_data in json_list:
+            subcampaign_name = json_data.get('subcampaign')
+            if subcampaign_name not in subcampaigns:
+                raise ValueError(f'Subcampaign "{subcampaign_name}" does not exist')
+
+            temporary_prepid = json_data.get('prepid')
+            input_request_prepid = json_data.get('input', {}).get('request')
+            new_request, prepid_middle_part = self.build_new_request(json_data,
+                                                                     subcampaigns[subcampaign_name],
+                                                                     input_requests)
+            # Until serial numbers are reserved, prepid has a zero serial number,
+            # so era and dataset of following requests can be taken from it
+            prepid_prefix = f'ReReco-{prepid_middle_part}'
+            new_request.set('prepid', f'{prepid_prefix}-00000')
+            new_requests.append((new_request, temporary_prepids.get(input_request_prepid)))
+            prefixes.setdefault(prepid_prefix, []).append(new_request)
+            if temporary_prepid:
+                input_requests[temporary_prepid] = new_request
+                temporary_prepids[temporary_prepid] = new_request
+
+        self.reserve_prepids(prefixes)
+        new_requests = [self.finish_new_request(r, i) for r, i in new_requests]
+
+        prepids = [r.get_prepid() for r in new_requests]
+        self.logger.info('Creating %s requests: %s', len(prepids), ', '.join(prepids))
+        try:
+            request_db.collection.insert_many([r.get_json() for r in new_requests])
+        except BulkWriteError as ex:
+            # Insertion is ordered, so only requests before the first error were inserted
+            inserted = prepids[:ex.details.get('nInserted', 0)]
+            self.logger.error('Error creating requests, removing %s: %s', inserted, ex.details)
+            if inserted:
+                request_db.collection.delete_many({'_id': {'$in': inserted}})
+
+            raise ex
+
+        self.after_create_many(new_requests)
+        return new_requests
+
+    def reserve_prepids(self, prefixes):
+        """
+        Reserve serial numbers for a dictionary of prepid prefixes and lists of
+        new requests with one counter increment for each prefix and set prepids
+        """
+        counter = SerialNumberCounter(self.database_name)
+        for prepid_prefix, requests in prefixes.items():
+            serial_number = counter.reserve(prepid_prefix, len(requests))
+            for index, new_request in enumerate(requests):
+                new_request.set('prepid', f'{prepid_prefix}-{serial_number + index:05d}')
+
+    def finish_new_request(self, new_request, input_request):
+        """
+        Point a new request to final prepid of its new input request, if any,
+        add creation history and check the request
+        """
+        prepid = new_request.get_prepid()
+        if input_request:
+            new_request.set('input', {'dataset': '', 'request': input_request.get_prepid()})
+
+        new_request.set('_id', prepid)
+        new_request.add_history('create', prepid, None)
+        if not self.check_for_create(new_request):
+            raise ValueError(f'Check for create failed for {prepid}')
+
+        return new_request
 
     def check_for_create(self, obj):
         sequences = obj.get('sequences')
@@ -149,27 +280,53 @@ class RequestController(ControllerBase):
         if obj.get('status') != 'new':
             raise AssertionError('Request must be in status "new" before it is deleted')
 
-        requests_db = Database('requests')
         prepid = obj.get_prepid()
-        subsequent_requests_query = f'input.request={prepid}'
-        subsequent_requests = requests_db.query(subsequent_requests_query)
+        subsequent_requests = RequestGraph().get_children(prepid)
         if subsequent_requests:
-            subsequent_requests_prepids = ', '.join([r['prepid'] for r in subsequent_requests])
+            subsequent_requests_prepids = ', '.join(subsequent_requests)
             raise AssertionError(f'Request cannot be deleted because it is input request'
                                  f'for {subsequent_requests_prepids}. Delete these requests first')
 
         return True
 
     def after_update(self, old_obj, new_obj, changed_values):
+        SearchIndex().update('requests', new_obj.get_json())
+        ObjectStats().change('requests', old_obj.get_json(), new_obj.get_json())
         if new_obj.get('status') == 'submitted':
             if old_obj.get('priority') != new_obj.get('priority'):
                 self.change_request_priority(new_obj, new_obj.get('priority'))
 
-        if new_obj.get('runs') != old_obj.get('runs'):
-            self.update_subsequent_requests(new_obj, {'runs': new_obj.get('runs')})
+        runs_changed = new_obj.get('runs') != old_obj.get('runs')
+        if runs_changed and self.propagate:
+            # Update subsequent requests in the background
+            prepid = new_obj.get_prepid()
+            history_length = len(new_obj.get('history'))
+            JobQueue().add('update_subsequent_requests',
+                           f'update-subsequent-{prepid}-runs-{history_length}',
+                           prepid=prepid,
+                           values={'runs': new_obj.get('runs')})
+
+    def after_create(self, obj):
+        self.after_create_many([obj])
+
+    def after_create_many(self, objs):
+        """
+        Update graph, indexes and statistics after requests were created
+        """
+        RequestGraph().add_many(objs)
+        SearchIndex().update_many('requests', [o.get_json() for o in objs])
+        for obj in objs:
+            PrepidIndex.add_prepid('requests', obj.get_prepid())
+
+        ObjectStats().change_many('requests', [(None, o.get_json()) for o in objs])
 
     def after_delete(self, obj):
         prepid = obj.get_prepid()
+        RequestGraph().remove(prepid)
+        SearchIndex().remove('requests', prepid)
+        PrepidIndex.remove_prepid('requests', prepid)
+        JobDictCache().invalidate(prepid)
+        ObjectStats().change('requests', obj.get_json(), None)
         tickets_db = Database('tickets')
         tickets = tickets_db.query(f'created_requests={prepid}')
         self.logger.debug(json.dumps(tickets, indent=2))
@@ -186,8 +343,22 @@ class RequestController(ControllerBase):
                 ticket.add_history('remove_request', prepid, None)
                 tickets_db.save(ticket.get_json())
 
+        if tickets:
+            TicketRequestsCache().invalidate()
+
         return True
 
+    def get_read_only(self, prepid, deleted=False):
+        """
+        Return a request that is neither copied nor checked, it should be used
+        only to read values, because it is checked before the first change
+        """
+        request_json = Database(self.database_name).get(prepid)
+        if not request_json or (request_json.get('deleted') and not deleted):
+            raise ValueError(f'Request "{prepid}" does not exist')
+
+        return Request(json_input=request_json, read_only=True)
+
     def get_editing_info(self, obj):
         editing_info = super().get_editing_info(obj)
         prepid = obj.get_prepid()
@@ -216,63 +387,133 @@ class RequestController(ControllerBase):
         Get bash script with cmsDriver commands for a given request
         If script will be used for submission, replace input file with placeholder
         """
+        return ''.join(self.iter_cmsdriver(request, for_submission))
+
+    def iter_cmsdriver(self, request, for_submission=False):
+        """
+        Yield chunks of bash script with cmsDriver commands for a given request
+        """
         self.logger.debug('Getting cmsDriver commands for %s', request.get_prepid())
-        bash = ['#!/bin/bash',
-                '']
+        return self.iter_batch_cmsdriver([request], for_submission)
 
-        if for_submission:
-            drivers = request.get_cmsdrivers('_placeholder_.root')
-        else:
-            drivers = request.get_cmsdrivers()
+    def get_batch_release(self, requests):
+        """
+        Return CMSSW release that is shared by all given requests
+        """
+        cmssw_releases = {r.get('cmssw_release') for r in requests}
+        if len(cmssw_releases) != 1:
+            raise ValueError(f'Requests must have one CMSSW release, found {len(cmssw_releases)}')
 
-        cmssw_release = request.get('cmssw_release')
-        scram_arch = get_scram_arch(cmssw_release)
-        bash += run_commands_in_cmsenv(drivers, cmssw_release, scram_arch).split('\n')
-        return '\n'.join(bash)
+        return cmssw_releases.pop()
+
+    def iter_commands_in_cmsenv(self, commands, cmssw_release):
+        """
+        Yield chunks of bash script that runs commands from given iterable in
+        CMSSW environment. Commands are not joined to one string, instead they
+        are yielded between the beginning and the end of CMSSW environment setup
+        """
+        scram_arch = ScramArchIndex().get(cmssw_release)
+        marker = f'__COMMANDS_{id(commands)}__'
+        cmsenv = run_commands_in_cmsenv([marker], cmssw_release, scram_arch)
+        if cmsenv.count(marker) != 1:
+            # Fall back to joining chunks to one command if setup wraps commands
+            # in some other way, so the script is the same as with the marker
+            yield run_commands_in_cmsenv([''.join(commands)], cmssw_release, scram_arch)
+            return
+
+        cmsenv_start, cmsenv_end = cmsenv.split(marker)
+        yield cmsenv_start
+        yield from commands
+        yield cmsenv_end
+
+    def get_batch_cmsdriver(self, requests, for_submission=False):
+        """
+        Get bash script with cmsDriver commands for a list of requests that have
+        the same CMSSW release, so CMSSW environment is set up only once
+        """
+        return ''.join(self.iter_batch_cmsdriver(requests, for_submission))
+
+    def iter_batch_cmsdriver(self, requests, for_submission=False):
+        """
+        Yield chunks of bash script with cmsDriver commands for a list of requests
+        that have the same CMSSW release
+        """
+        def iter_drivers():
+            for index, request in enumerate(requests):
+                if index > 0:
+                    yield '\n\n'
+
+                if for_submission:
+                    yield from request.iter_cmsdrivers('_placeholder_.root')
+                else:
+                    yield from request.iter_cmsdrivers()
+
+        cmssw_release = self.get_batch_release(requests)
+        yield '#!/bin/bash\n\n'
+        yield from self.iter_commands_in_cmsenv(iter_drivers(), cmssw_release)
 
     def get_config_upload_file(self, request):
         """
         Get bash script that would upload config files to ReqMgr2
         """
+        return ''.join(self.iter_config_upload_file(request))
+
+    def iter_config_upload_file(self, request):
+        """
+        Yield chunks of bash script that would upload config files to ReqMgr2
+        """
         self.logger.debug('Getting config upload script for %s', request.get_prepid())
+        return self.iter_batch_config_upload_file([request])
+
+    def get_batch_config_upload_file(self, requests):
+        """
+        Get bash script that would upload config files of a list of requests that
+        have the same CMSSW release to ReqMgr2
+        """
+        return ''.join(self.iter_batch_config_upload_file(requests))
+
+    def iter_batch_config_upload_file(self, requests):
+        """
+        Yield chunks of bash script that would upload config files of a list of
+        requests that have the same CMSSW release to ReqMgr2
+        """
         database_url = environment.CMSWEB_URL.replace('https://', '').replace('http://', '')
-        bash = ['#!/bin/bash',
-                '']
         config_names = []
-        for configs in request.get_config_file_names():
-            config_names.append(configs['config'])
-            if configs.get('harvest'):
-                config_names.append(configs['harvest'])
-
+        for request in requests:
+            for configs in request.get_config_file_names():
+                config_names.append(configs['config'])
+                if configs.get('harvest'):
+                    config_names.append(configs['harvest'])
 
+        yield '#!/bin/bash\n'
         # Check if all expected config files are present
         for config_name in config_names:
-            bash += [f'if [ ! -s "{config_name}.py" ]; then',
-                     f'  echo "File {config_name}.py is missing" >&2',
-                     '  exit 1',
-                     'fi',
-                     '']
+            yield '\n'.join(['',
+                             f'if [ ! -s "{config_name}.py" ]; then',
+                             f'  echo "File {config_name}.py is missing" >&2',
+                             '  exit 1',
+                             'fi',
+                             ''])
 
         # Use ConfigCacheLite and TweakMakerLite instead of WMCore
-        bash += config_cache_lite_setup().split('\n')
-        bash += ['']
-
-        commands = []
-        for config_name in config_names:
-            # Run config uploader
-            commands.append(('$PYTHON_INT config_uploader.py '
-                             f'--file $(pwd)/{config_name}.py '
-                             f'--label {config_name} '
-                             '--group ppd '
-                             '--user $(echo $USER) '
-                             f'--db {database_url} || exit $?'))
-
-        if commands:
-            cmssw_release = request.get('cmssw_release')
-            scram_arch = get_scram_arch(cmssw_release)
-            bash += run_commands_in_cmsenv(commands, cmssw_release, scram_arch).split('\n')
-
-        return '\n'.join(bash)
+        yield '\n' + config_cache_lite_setup() + '\n'
+        if not config_names:
+            return
+
+        def iter_commands():
+            for index, config_name in enumerate(config_names):
+                # Run config uploader
+                yield (('\n' if index > 0 else '')
+                       + '$PYTHON_INT config_uploader.py '
+                       f'--file $(pwd)/{config_name}.py '
+                       f'--label {config_name} '
+                       '--group ppd '
+                       '--user $(echo $USER) '
+                       f'--db {database_url} || exit $?')
+
+        cmssw_release = self.get_batch_release(requests)
+        yield '\n'
+        yield from self.iter_commands_in_cmsenv(iter_commands(), cmssw_release)
 
     def get_job_dict(self, request):
         """
@@ -297,7 +538,7 @@ class RequestController(ControllerBase):
         job_dict['Requestor'] = 'pdmvserv'
         job_dict['RequestPriority'] = request.get('priority')
         job_dict['RequestString'] = request_string
-        job_dict['ScramArch'] = get_scram_arch(request.get('cmssw_release'))
+        job_dict['ScramArch'] = ScramArchIndex().get(request.get('cmssw_release'))
         job_dict['SizePerEvent'] = request.get('size_per_event')[0]
         job_dict['TimePerEvent'] = request.get('time_per_event')[0]
         if len(sequences) <= 1:
@@ -320,6 +561,42 @@ class RequestController(ControllerBase):
 
         return job_dict
 
+    def get_job_dicts(self, prepids):
+        """
+        Return job dicts of multiple requests, requests are fetched in one query
+        and job dicts of unchanged requests are taken from the cache
+        Return a dictionary of job dicts and a dictionary of errors by prepid
+        """
+        prepids = sorted(set(prepids))
+        request_db = Database(self.database_name)
+        requests_json = request_db.collection.find({'_id': {'$in': prepids}})
+        requests_json = {r['_id']: r for r in requests_json if not r.get('deleted')}
+        cache = JobDictCache()
+        job_dicts = {}
+        errors = {}
+        for prepid in prepids:
+            request_json = requests_json.get(prepid)
+            if not request_json:
+                errors[prepid] = 'Request does not exist'
+                continue
+
+            revision = cache.get_revision(request_json)
+            job_dict = cache.get(prepid, revision)
+            if job_dict is None:
+                try:
+                    request = Request(json_input=request_json, read_only=True)
+                    job_dict = self.get_job_dict(request)
+                except Exception as ex:
+                    self.logger.error('Error getting %s job dict: %s', prepid, ex)
+                    errors[prepid] = str(ex)
+                    continue
+
+                cache.set(prepid, revision, job_dict)
+
+            job_dicts[prepid] = job_dict
+
+        return job_dicts, errors
+
     def apply_job_dict_overwrite(self, job_dict, overwrite):
         """
         Apply overwrites to job dictionary
@@ -436,18 +713,21 @@ class RequestController(ControllerBase):
         self.logger.debug('Returning %s single task dict: %s', request.get_prepid(), job_dict)
         return job_dict
 
-    def update_input_dataset(self, request):
+    def update_input_dataset(self, request, input_request=None):
         """
         Update input dataset name from input request (if exists)
         Update runs from input request if they are not specified yet
         Input dataset is datatier aware, so if input request produced
         AOD + MiniAOD and this request is reMini, it should select AOD of input
         request and not MiniAOD
+        Input request is fetched from the database unless it is provided
         """
         prepid = request.get_prepid()
         input_request_prepid = request.get('input')['request']
         if input_request_prepid:
-            input_request = self.get(input_request_prepid)
+            if input_request is None or input_request.get_prepid() != input_request_prepid:
+                input_request = self.get(input_request_prepid)
+
             output_datasets = input_request.get('output_datasets')
             new_input_dataset = self.pick_input_dataset(request, input_request)
             should_update = False
@@ -499,9 +779,11 @@ class RequestController(ControllerBase):
         Set new status to request, update history accordingly and save to database
         """
         request_db = Database(self.database_name)
+        old_request = Request(json_input=request.get_json(), read_only=True)
         request.set('status', status)
         request.add_history('status', status, None, timestamp)
         request_db.save(request.get_json())
+        self.after_update(old_request, request, ['status'])
 
     def next_status(self, request):
         """
@@ -584,8 +866,15 @@ class RequestController(ControllerBase):
         """
         Try to move request to done status
         """
-        prepid = request.get_prepid()
         request = self.update_workflows(request)
+        return self.move_updated_request_to_done(request)
+
+    def move_updated_request_to_done(self, request):
+        """
+        Check workflows of a request that was already updated from Stats2
+        and move it to done status
+        """
+        prepid = request.get_prepid()
         workflows = request.get('workflows')
         workflows = [w for w in workflows if w['type'].lower() != 'resubmission']
         if workflows:
@@ -611,64 +900,216 @@ class RequestController(ControllerBase):
                 )
 
             self.update_status(request, 'done', completed_timestamp)
-            # Submit all subsequent requests
-            self.submit_subsequent_requests(request)
+            # Submit all subsequent requests in the background
+            JobQueue().add('submit_subsequent_requests',
+                           f'submit-subsequent-{prepid}-done-{completed_timestamp}',
+                           prepid=prepid,
+                           done_time=completed_timestamp)
         else:
             raise AssertionError(f'{prepid} does not have any workflows in computing')
 
         return request
 
-    def submit_subsequent_requests(self, request):
+    def start_move_submitted_to_done(self):
         """
-        Submit all requests that have given request as input
+        Add a background job that moves submitted requests to done unless such
+        job is already pending or running
+        Return key of the job
         """
+        job_queue = JobQueue()
+        job = job_queue.get_last_job('move_submitted_to_done')
+        if job and job['status'] in ('pending', 'running'):
+            return job['_id']
+
+        key = f'move-submitted-to-done-{int(time.time() * 1000)}'
+        job_queue.add('move_submitted_to_done', key, job_key=key)
+        return key
+
+    def move_submitted_to_done(self, job_key=None):
+        """
+        Try to move all submitted requests to done status
+        All requests are updated from Stats2 in one batch and then checked concurrently
+        Requests that are locked by other actions are skipped
+        Progress, outcome of each request, skipped prepids and timing information
+        are saved in the progress of a job with given key
+        Return a dictionary with the same information
+        """
+        job_queue = JobQueue()
+
+        def report(**progress):
+            if job_key:
+                job_queue.set_progress(job_key, progress)
+
+        start_time = time.time()
         request_db = Database('requests')
-        prepid = request.get_prepid()
-        query = f'input.request={prepid}&&status=approved'
-        subsequent_requests = request_db.query(query)
-        self.logger.info('Found %s subsequent requests for %s: %s',
-                         len(subsequent_requests),
-                         prepid,
-                         [r['prepid'] for r in subsequent_requests])
-        for subsequent_request_json in subsequent_requests:
-            subsequent_request_prepid = subsequent_request_json.get('prepid', '')
+        submitted = request_db.collection.find({'status': 'submitted',
+                                                'deleted': {'$ne': True}},
+                                               {'prepid': 1})
+        prepids = [r['prepid'] for r in submitted]
+        self.logger.info('Trying to move %s submitted requests to done', len(prepids))
+        report(stage='updating', total=len(prepids), checked=0, done=0, skipped=[], requests={})
+        requests, errors = self.update_workflows_many(prepids)
+        update_time = time.time()
+        outcomes = {p: {'status': 'submitted', 'message': e} for p, e in errors.items()}
+        report(stage='checking',
+               checked=len(outcomes),
+               requests=outcomes,
+               update_time=round(update_time - start_time, 3))
+
+        def move_to_done(request):
+            prepid = request.get_prepid()
+            lock = self.locker.get_lock(prepid)
+            if not lock.acquire(blocking=False):
+                return prepid, {'status': 'submitted',
+                                'message': 'Skipped because request is locked',
+                                'skipped': True}
+
             try:
-                subsequent_request = self.get(subsequent_request_prepid)
-                self.update_input_dataset(subsequent_request)
-                self.next_status(subsequent_request)
+                # Request might have changed after it was updated from Stats2
+                request = self.get(prepid)
+                if request.get('status') != 'submitted':
+                    status = request.get('status')
+                    return prepid, {'status': status, 'message': f'Request is {status}'}
+
+                self.move_updated_request_to_done(request)
+                return prepid, {'status': 'done', 'message': ''}
             except Exception as ex:
-                self.logger.error('Error moving %s to next status: %s',
-                                  subsequent_request_prepid,
-                                  ex)
+                return prepid, {'status': 'submitted', 'message': str(ex)}
+            finally:
+                lock.release()
+
+        skipped = []
+        done = 0
+        with ThreadPoolExecutor(max_workers=STATS_WORKERS) as executor:
+            for prepid, outcome in executor.map(move_to_done, requests):
+                self.logger.info('%s: %s %s', prepid, outcome['status'], outcome['message'])
+                outcomes[prepid] = outcome
+                done += outcome['status'] == 'done'
+                if outcome.get('skipped'):
+                    skipped.append(prepid)
+
+                report(**{f'requests.{prepid}': outcome,
+                          'checked': len(outcomes),
+                          'done': done,
+                          'skipped': skipped})
+
+        end_time = time.time()
+        self.logger.info('Moved %s of %s submitted requests to done in %.2fs',
+                         done,
+                         len(prepids),
+                         end_time - start_time)
+        results = {'requests': outcomes,
+                   'total': len(prepids),
+                   'checked': len(outcomes),
+                   'done': done,
+                   'skipped': sorted(skipped),
+                   'update_time': round(update_time - start_time, 3),
+                   'check_time': round(end_time - update_time, 3),
+                   'total_time': round(end_time - start_time, 3)}
+        report(stage='finished', **results)
+        return results
+
+    def submit_subsequent_requests(self, prepid, done_time):
+        """
+        Job that adds a submission job for each approved request that has
+        given request as input
+        """
+        request_db = Database('requests')
+        subsequent_prepids = RequestGraph().get_children(prepid)
+        subsequent_requests = request_db.collection.find({'_id': {'$in': subsequent_prepids},
+                                                          'status': 'approved'},
+                                                         {'_id': 1})
+        subsequent_prepids = [r['_id'] for r in subsequent_requests]
+        self.logger.info('Found %s subsequent requests for %s: %s',
+                         len(subsequent_prepids),
+                         prepid,
+                         subsequent_prepids)
+        job_queue = JobQueue()
+        for subsequent_prepid in subsequent_prepids:
+            job_queue.add('submit_subsequent_request',
+                          f'submit-{subsequent_prepid}-approved-{prepid}-{done_time}',
+                          prepid=subsequent_prepid)
+
+    def submit_subsequent_request(self, prepid):
+        """
+        Job that updates input dataset of an approved request and moves it to next status
+        """
+        request = self.get(prepid)
+        if request.get('status') != 'approved':
+            self.logger.info('Not submitting %s because it is %s', prepid, request.get('status'))
+            return
+
+        self.update_input_dataset(request)
+        self.next_status(request)
 
     def update_subsequent_requests(self, request, values):
         """
-        Update all subsequent requests
+        Update all requests that have given request as direct or indirect input
+        Requests are updated in one batch, parents before children. Only new and
+        approved requests are updated, requests after them in chain are not updated
         """
         request_db = Database('requests')
         prepid = request.get_prepid()
-        query = f'input.request={prepid}'
-        requests = request_db.query(query)
+        descendants = RequestGraph().get_descendants(prepid)
         self.logger.info('Found %s subsequent requests for %s: %s',
-                         len(requests),
+                         len(descendants),
                          prepid,
-                         [r['prepid'] for r in requests])
-        for request_json in requests:
-            if request_json.get('status') not in ('new', 'approved'):
+                         [n['_id'] for n in descendants])
+        if not descendants:
+            return
+
+        statuses = request_db.collection.find({'_id': {'$in': [n['_id'] for n in descendants]}},
+                                              {'status': 1})
+        statuses = {r['_id']: r.get('status') for r in statuses}
+        not_updated = set()
+        # Changes are propagated to all descendants here, so their updates
+        # must not propagate them again
+        controller = RequestController(propagate=False)
+        for node in descendants:
+            request_prepid = node['_id']
+            if node['input'] in not_updated:
+                not_updated.add(request_prepid)
+                continue
+
+            if statuses.get(request_prepid) not in ('new', 'approved'):
+                not_updated.add(request_prepid)
                 continue
 
-            request_prepid = request_json.get('prepid', '')
             try:
-                subsequent_request = self.get(request_prepid)
+                subsequent_request = controller.get(request_prepid)
                 for key, value in values.items():
                     subsequent_request.set(key, value)
 
-                self.update(subsequent_request.get_json())
+                controller.update(subsequent_request.get_json())
             except Exception as ex:
+                not_updated.add(request_prepid)
                 self.logger.error('Error updating subsequent request %s: %s',
                                   request_prepid,
                                   ex)
 
+    def update_subsequent_requests_job(self, prepid, values):
+        """
+        Job that updates all subsequent requests of a request with given values
+        """
+        self.update_subsequent_requests(self.get(prepid), values)
+
+    def get_chain(self, prepid):
+        """
+        Return a list of all ancestors and descendants of a request with
+        their inputs and statuses, parents are always before their children
+        """
+        request_graph = RequestGraph()
+        ancestors = request_graph.get_ancestors(prepid)
+        descendants = [n['_id'] for n in request_graph.get_descendants(prepid)]
+        chain = ancestors + [prepid] + descendants
+        request_db = Database('requests')
+        requests = request_db.collection.find({'_id': {'$in': chain}},
+                                              {'input': 1, 'status': 1})
+        requests = {r['_id']: r for r in requests}
+        return [{'prepid': p,
+                 'input': requests[p].get('input', {}),
+                 'status': requests[p].get('status')} for p in chain if p in requests]
+
     def move_request_back_to_new(self, request):
         """
         Try to move rquest back to new
@@ -719,23 +1160,25 @@ class RequestController(ControllerBase):
         Get lumisection ranges in a subcampaign's dcs json for given runs
         """
         subcampaign_controller = SubcampaignController()
-        dcs_json = subcampaign_controller.get_dcs_json(subcampaign_name)
-        runs = {str(r) for r in runs}
-        lumisections = {run: lumis for run, lumis in dcs_json.items() if run in runs}
+        dcs_mask = subcampaign_controller.get_dcs_mask(subcampaign_name)
+        lumi_mask = dcs_mask.filter_runs(runs)
         self.logger.debug('Fetched %s runs with lumi ranges for %s and %s runs',
-                          len(lumisections),
+                          len(lumi_mask.runs),
                           subcampaign_name,
                           len(runs))
-        return lumisections
+        return lumi_mask.to_json()
 
-    def get_runs(self, subcampaign_name, input_dataset):
+    def get_runs(self, subcampaign_name, input_dataset, dataset_runs=None):
         """
         Return a list of runs for given input dataset in a subcampaign
+        Dataset runs are fetched from DBS unless they are provided
         """
         subcampaign_controller = SubcampaignController()
-        dbs_runs = set(self.get_dataset_runs(input_dataset))
-        dcs_json = subcampaign_controller.get_dcs_json(subcampaign_name)
-        dcs_runs = set(int(x) for x in list(dcs_json.keys()))
+        if dataset_runs is None:
+            dataset_runs = self.get_dataset_runs(input_dataset)
+
+        dbs_runs = set(dataset_runs)
+        dcs_runs = set(subcampaign_controller.get_dcs_mask(subcampaign_name).get_runs())
         if dbs_runs and dcs_runs:
             all_runs = sorted(list(dbs_runs & dcs_runs))
         else:
@@ -858,6 +1301,63 @@ class RequestController(ControllerBase):
                                      sort_keys=True))
         return output_datasets
 
+    def apply_workflows(self, request, stats_workflows):
+        """
+        Set workflows, output datasets, priority and event counts of a request
+        based on given list of workflows from Stats2
+        """
+        prepid = request.get_prepid()
+        all_workflows = {}
+        for workflow in stats_workflows:
+            if not workflow or not workflow.get('RequestName'):
+                raise RuntimeError('Could not find workflow in Stats2')
+
+            name = workflow.get('RequestName')
+            all_workflows[name] = workflow
+            self.logger.info('Found workflow %s for %s', name, prepid)
+
+        output_datasets = self.get_output_datasets(request, all_workflows)
+        workflows = self.pick_workflows(all_workflows, output_datasets)
+        newest_workflow = None
+        for workflow in reversed(workflows):
+            workflow_name = workflow['name']
+            if workflow['type'].lower() == 'resubmission':
+                self.logger.debug('Skipping %s because resubmission', workflow_name)
+                continue
+
+            status_history = set(x['status'] for x in workflow.get('status_history', []))
+            if DEAD_WORKFLOW_STATUS & status_history:
+                self.logger.debug('Skipping %s because dead', workflow_name)
+                continue
+
+            if not newest_workflow:
+                newest_workflow = all_workflows[workflow_name]
+
+            completed_events = -1
+            for output_dataset in workflow.get('output_datasets', []):
+                if output_datasets and output_dataset['name'] == output_datasets[-1]:
+                    completed_events = output_dataset['events']
+                    break
+
+            if completed_events != -1:
+                request.set('completed_events', completed_events)
+                break
+
+        if newest_workflow:
+            if 'RequestPriority' in newest_workflow:
+                priority = newest_workflow['RequestPriority']
+                request.set('priority', priority)
+                self.logger.info('Setting %s priority to %s', prepid, priority)
+
+            if 'TotalEvents' in newest_workflow:
+                total_events = max(0, newest_workflow['TotalEvents'])
+                request.set('total_events', total_events)
+                self.logger.info('Setting %s total events to %s', prepid, total_events)
+
+        request.set('output_datasets', output_datasets)
+        request.set('workflows', workflows)
+        return request
+
     def update_workflows(self, request):
         """
         Update computing workflows from Stats2
@@ -874,68 +1374,171 @@ class RequestController(ControllerBase):
                              len(workflow_names),
                              workflow_names)
             stats_workflows += get_workflows_from_stats(list(workflow_names))
-            all_workflows = {}
-            for workflow in stats_workflows:
-                if not workflow or not workflow.get('RequestName'):
-                    raise RuntimeError('Could not find workflow in Stats2')
-
-                name = workflow.get('RequestName')
-                all_workflows[name] = workflow
-                self.logger.info('Found workflow %s for %s', name, prepid)
-
-            output_datasets = self.get_output_datasets(request, all_workflows)
-            workflows = self.pick_workflows(all_workflows, output_datasets)
-            newest_workflow = None
-            for workflow in reversed(workflows):
-                workflow_name = workflow['name']
-                if workflow['type'].lower() == 'resubmission':
-                    self.logger.debug('Skipping %s because resubmission', workflow_name)
-                    continue
+            self.apply_workflows(request, stats_workflows)
+            request_db.save(request.get_json())
+            SearchIndex().update('requests', request.get_json())
 
-                status_history = set(x['status'] for x in workflow.get('status_history', []))
-                if DEAD_WORKFLOW_STATUS & status_history:
-                    self.logger.debug('Skipping %s because dead', workflow_name)
-                    continue
+            if request.get('output_datasets'):
+                subsequent_prepids = RequestGraph().get_children(prepid)
+                self.logger.info('Found %s subsequent requests for %s: %s',
+                                 len(subsequent_prepids),
+                                 prepid,
+                                 subsequent_prepids)
+                for subsequent_request_prepid in subsequent_prepids:
+                    self.update_input_dataset(self.get(subsequent_request_prepid), request)
 
-                if not newest_workflow:
-                    newest_workflow = all_workflows[workflow_name]
+        return request
 
-                completed_events = -1
-                for output_dataset in workflow.get('output_datasets', []):
-                    if output_datasets and output_dataset['name'] == output_datasets[-1]:
-                        completed_events = output_dataset['events']
-                        break
+    def fetch_stats_workflows(self, requests_json):
+        """
+        Fetch workflows from Stats2 for many requests at once
+        Workflows are fetched by prepid on a bounded pool of threads and workflows
+        that are not found by prepid are fetched by name in a few batched calls
+        Return a dictionary of prepids and lists of workflows or exceptions
+        """
+        prepids = [r['prepid'] for r in requests_json]
+        stats_workflows = {}
+        with ThreadPoolExecutor(max_workers=STATS_WORKERS) as executor:
+            futures = {executor.submit(get_workflows_from_stats_for_prepid, p): p for p in prepids}
+            for future in as_completed(futures):
+                prepid = futures[future]
+                try:
+                    stats_workflows[prepid] = future.result()
+                except Exception as ex:
+                    self.logger.error('Error fetching %s workflows from Stats2: %s', prepid, ex)
+                    stats_workflows[prepid] = ex
+
+            # Workflows that are attached to requests, but are not found by prepid
+            missing_workflows = {}
+            for request_json in requests_json:
+                prepid = request_json['prepid']
+                if isinstance(stats_workflows[prepid], Exception):
+                    continue
 
-                if completed_events != -1:
-                    request.set('completed_events', completed_events)
-                    break
+                found_names = {w['RequestName'] for w in stats_workflows[prepid]}
+                for workflow in request_json.get('workflows', []):
+                    if workflow['name'] not in found_names:
+                        missing_workflows[workflow['name']] = prepid
 
-            if newest_workflow:
-                if 'RequestPriority' in newest_workflow:
-                    priority = newest_workflow['RequestPriority']
-                    request.set('priority', priority)
-                    self.logger.info('Setting %s priority to %s', prepid, priority)
+            self.logger.info('%s workflows that are not in stats: %s',
+                             len(missing_workflows),
+                             list(missing_workflows.keys()))
+            missing_names = list(missing_workflows.keys())
+            chunks = [missing_names[i:i + STATS_BATCH_SIZE]
+                      for i in range(0, len(missing_names), STATS_BATCH_SIZE)]
+            futures = {executor.submit(get_workflows_from_stats, c): c for c in chunks}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    fetched = {w.get('RequestName'): w for w in future.result() if w}
+                except Exception as ex:
+                    self.logger.error('Error fetching workflows from Stats2: %s', ex)
+                    fetched = {}
+
+                for name in chunk:
+                    # Workflow that is not found will fail the update of that request
+                    stats_workflows[missing_workflows[name]].append(fetched.get(name))
+
+        return stats_workflows
+
+    def update_workflows_many(self, prepids):
+        """
+        Update computing workflows from Stats2 for a list of requests
+        Stats2 is queried concurrently without holding locks of requests
+        Return a list of updated requests and a dictionary of errors by prepid
+        """
+        prepids = sorted(set(prepids))
+        request_db = Database('requests')
+        requests_json = sorted(request_db.collection.find({'prepid': {'$in': prepids}}),
+                               key=lambda r: r['prepid'])
+        found_prepids = {r['prepid'] for r in requests_json}
+        errors = {p: 'Request does not exist' for p in prepids if p not in found_prepids}
+        start_time = time.time()
+        stats_workflows = self.fetch_stats_workflows(requests_json)
+        self.logger.info('Fetched workflows of %s requests from Stats2 in %.2fs',
+                         len(requests_json),
+                         time.time() - start_time)
+        for prepid, workflows in stats_workflows.items():
+            if isinstance(workflows, Exception):
+                errors[prepid] = str(workflows)
+
+        prepids = sorted(p for p in found_prepids if p not in errors)
+        updated_requests = []
+        for i in range(0, len(prepids), WRITE_BATCH_SIZE):
+            batch = prepids[i:i + WRITE_BATCH_SIZE]
+            updated_requests.extend(self.save_workflows(batch, stats_workflows, errors))
+
+        # Update input datasets of requests that have these requests as input
+        input_requests = {r.get_prepid(): r for r in updated_requests if r.get('output_datasets')}
+        for subsequent_request_prepid in RequestGraph().get_children(list(input_requests)):
+            try:
+                subsequent_request = self.get(subsequent_request_prepid)
+                input_request = input_requests.get(subsequent_request.get('input')['request'])
+                self.update_input_dataset(subsequent_request, input_request)
+            except Exception as ex:
+                self.logger.error('Error updating %s input dataset: %s',
+                                  subsequent_request_prepid,
+                                  ex)
 
-                if 'TotalEvents' in newest_workflow:
-                    total_events = max(0, newest_workflow['TotalEvents'])
-                    request.set('total_events', total_events)
-                    self.logger.info('Setting %s total events to %s', prepid, total_events)
+        self.logger.info('Updated workflows of %s requests in %.2fs, %s errors',
+                         len(updated_requests),
+                         time.time() - start_time,
+                         len(errors))
+        return updated_requests, errors
 
-            request.set('output_datasets', output_datasets)
-            request.set('workflows', workflows)
-            request_db.save(request.get_json())
+    def save_workflows(self, prepids, stats_workflows, errors):
+        """
+        Apply workflows from Stats2 to requests and save them with one bulk write
+        Requests are locked only while they are read, updated and saved, because
+        they might have changed while Stats2 was queried
+        Each replacement matches only the version of a request that was read, so
+        changes made by other processes are not overwritten, such requests are
+        updated again from their new version
+        Add errors to given dictionary and return list of updated requests
+        """
+        request_db = Database('requests')
+        updated_requests = []
+        with ExitStack() as stack:
+            for prepid in sorted(prepids):
+                stack.enter_context(self.locker.get_lock(prepid))
+
+            for _ in range(WRITE_ATTEMPTS):
+                requests = {}
+                replacements = []
+                for request_json in request_db.collection.find({'_id': {'$in': prepids}}):
+                    prepid = request_json['_id']
+                    try:
+                        request = Request(json_input=request_json)
+                        self.apply_workflows(request, stats_workflows.get(prepid, []))
+                    except Exception as ex:
+                        self.logger.error('Error updating %s workflows: %s', prepid, ex)
+                        errors[prepid] = str(ex)
+                        continue
+
+                    requests[prepid] = request
+                    replacements.append(ReplaceOne(request_json, request.get_json()))
+
+                if replacements:
+                    request_db.collection.bulk_write(replacements, ordered=False)
+
+                # Requests that are not the same as saved ones were changed by others
+                saved = {r['_id']: r for r in request_db.collection.find({'_id': {'$in': prepids}})}
+                changed = [p for p, r in requests.items() if saved.get(p) != r.get_json()]
+                saved_requests = [r for p, r in requests.items() if p not in changed]
+                updated_requests.extend(saved_requests)
+                # Index is updated while requests are still locked
+                SearchIndex().update_many('requests', [r.get_json() for r in saved_requests])
+                for prepid in set(prepids) - set(requests) - set(errors):
+                    errors[prepid] = 'Request does not exist'
+
+                prepids = changed
+                if not prepids:
+                    break
 
-            if output_datasets:
-                subsequent_requests = request_db.query(f'input.request={prepid}')
-                self.logger.info('Found %s subsequent requests for %s: %s',
-                                 len(subsequent_requests),
-                                 prepid,
-                                 [r['prepid'] for r in subsequent_requests])
-                for subsequent_request_json in subsequent_requests:
-                    subsequent_request_prepid = subsequent_request_json.get('prepid')
-                    self.update_input_dataset(self.get(subsequent_request_prepid))
+            for prepid in prepids:
+                errors[prepid] = 'Request was changed by another process while it was updated'
 
-        return request
+        return updated_requests
 
     def option_reset(self, prepid):
         """
@@ -961,6 +1564,7 @@ class RequestController(ControllerBase):
             request.set('cmssw_release', subcampaign.get('cmssw_release'))
             request.set('enable_harvesting', subcampaign.get('enable_harvesting'))
             request_db.save(request.get_json())
+            JobDictCache().invalidate(prepid)
 
         return request
 
@@ -1,14 +1,15 @@
 """
 Module that contains SubcampaignController class
 """
-import json
-import environment
 from core_lib.database.database import Database
 from core_lib.controller.controller_base import ControllerBase
-from core_lib.utils.cache import TimeoutCache
-from core_lib.utils.connection_wrapper import ConnectionWrapper
 from core.model.subcampaign import Subcampaign
 from core.model.sequence import Sequence
+from core.utils.lumi_mask import LumiMask
+from core.utils.dcs_cache import DCSCache
+from core.utils.scram_arch_index import ScramArchIndex
+from core.utils.search_index import SearchIndex
+from core.utils.prepid_index import PrepidIndex
 
 
 class SubcampaignController(ControllerBase):
@@ -16,9 +17,6 @@ class SubcampaignController(ControllerBase):
     Controller that has all actions related to a subcampaign
     """
 
-    # DCS json cache
-    __dcs_cache = TimeoutCache(7200)
-
     def __init__(self):
         ControllerBase.__init__(self)
         self.database_name = 'subcampaigns'
@@ -34,6 +32,28 @@ class SubcampaignController(ControllerBase):
 
         return True
 
+    def after_create(self, obj):
+        SearchIndex().update('subcampaigns', obj.get_json())
+        PrepidIndex.add_prepid('subcampaigns', obj.get_prepid())
+        self.add_release_to_index(obj.get('cmssw_release'))
+
+    def after_update(self, old_obj, new_obj, changed_values):
+        SearchIndex().update('subcampaigns', new_obj.get_json())
+        if old_obj.get('cmssw_release') != new_obj.get('cmssw_release'):
+            self.add_release_to_index(new_obj.get('cmssw_release'))
+
+    def after_delete(self, obj):
+        SearchIndex().remove('subcampaigns', obj.get_prepid())
+        PrepidIndex.remove_prepid('subcampaigns', obj.get_prepid())
+
+    def add_release_to_index(self, cmssw_release):
+        """
+        Make scram arch index look up a new release before requests are rendered
+        """
+        scram_arch_index = ScramArchIndex()
+        if cmssw_release not in scram_arch_index.get_index():
+            scram_arch_index.refresh_soon()
+
     def get_editing_info(self, obj):
         editing_info = super().get_editing_info(obj)
         prepid = obj.get_prepid()
@@ -61,27 +81,14 @@ class SubcampaignController(ControllerBase):
         """
         Fetch a dict of runs and lumisection ranges for a subcampaign
         """
-        cached_value = SubcampaignController.__dcs_cache.get(subcampaign_name)
-        if cached_value:
-            return cached_value
+        return self.get_dcs_mask(subcampaign_name).to_json()
 
+    def get_dcs_mask(self, subcampaign_name):
+        """
+        Fetch a LumiMask of runs and lumisection ranges for a subcampaign
+        """
         runs_json_path = self.get(subcampaign_name).get('runs_json_path')
         if not runs_json_path:
-            return {}
-
-
-        grid_cert = environment.GRID_USER_CERT
-        grid_key = environment.GRID_USER_KEY
-        with ConnectionWrapper('https://cms-service-dqmdc.web.cern.ch',
-                               grid_cert,
-                               grid_key) as connection:
-            with self.locker.get_lock('get-dcs-runs'):
-                response = connection.api('GET', f'/CAF/certification/{runs_json_path}')
-
-        response = json.loads(response.decode('utf-8'))
-        if not response:
-            SubcampaignController.__dcs_cache.set(subcampaign_name, {})
-            return {}
+            return LumiMask()
 
-        SubcampaignController.__dcs_cache.set(subcampaign_name, response)
-        return response
+        return DCSCache().get_mask(runs_json_path)
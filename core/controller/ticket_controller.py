@@ -1,6 +1,8 @@
 """
 Module that contains TicketController class
 """
+import time
+from concurrent.futures import ThreadPoolExecutor
 from core_lib.utils.settings import Settings
 from core_lib.database.database import Database
 from core_lib.controller.controller_base import ControllerBase
@@ -8,6 +10,16 @@ from core_lib.utils.common_utils import dbs_datasetlist
 from core.model.model_base import ModelBase
 from core.model.ticket import Ticket
 from core.controller.request_controller import RequestController
+from core.controller.subcampaign_controller import SubcampaignController
+from core.utils.serial_number_counter import SerialNumberCounter
+from core.utils.search_index import SearchIndex
+from core.utils.prepid_index import PrepidIndex
+from core.utils.ticket_requests_cache import TicketRequestsCache
+from core.utils.object_stats import ObjectStats
+
+
+# Number of concurrent DBS and DCS queries when creating requests for a ticket
+PREFETCH_WORKERS = 8
 
 
 class TicketController(ControllerBase):
@@ -22,23 +34,17 @@ class TicketController(ControllerBase):
 
     def create(self, json_data):
         # Clean up the input
-        ticket_db = Database(self.database_name)
         json_data['prepid'] = 'Temp00001'
         ticket = Ticket(json_input=json_data)
         # Use first subcampaign name for prepid
         subcampaign_name = ticket.get('steps')[0]['subcampaign']
         processing_string = ticket.get('steps')[0]['processing_string']
         prepid_middle_part = f'{subcampaign_name}-{processing_string}'
-        with self.locker.get_lock(f'create-subcampaign-ticket-prepid-{prepid_middle_part}'):
-            # Get a new serial number
-            serial_number = self.get_highest_serial_number(ticket_db,
-                                                           f'{prepid_middle_part}-*')
-            serial_number += 1
-            # Form a new temporary prepid
-            prepid = f'{prepid_middle_part}-{serial_number:05d}'
-            json_data['prepid'] = prepid
-            new_ticket_json = super().create(json_data)
-
+        # Get a new serial number
+        serial_number = SerialNumberCounter(self.database_name).reserve(prepid_middle_part)
+        prepid = f'{prepid_middle_part}-{serial_number:05d}'
+        json_data['prepid'] = prepid
+        new_ticket_json = super().create(json_data)
         return new_ticket_json
 
     def check_input(self, ticket):
@@ -121,6 +127,21 @@ class TicketController(ControllerBase):
 
         return True
 
+    def after_create(self, obj):
+        SearchIndex().update('tickets', obj.get_json())
+        PrepidIndex.add_prepid('tickets', obj.get_prepid())
+        ObjectStats().change('tickets', None, obj.get_json())
+
+    def after_update(self, old_obj, new_obj, changed_values):
+        SearchIndex().update('tickets', new_obj.get_json())
+        ObjectStats().change('tickets', old_obj.get_json(), new_obj.get_json())
+
+    def after_delete(self, obj):
+        SearchIndex().remove('tickets', obj.get_prepid())
+        PrepidIndex.remove_prepid('tickets', obj.get_prepid())
+        TicketRequestsCache().invalidate()
+        ObjectStats().change('tickets', obj.get_json(), None)
+
     def get_datasets(self, query, exclude_list=None):
         """
         Query DBS for list of datasets
@@ -176,6 +197,56 @@ class TicketController(ControllerBase):
 
         return editing_info
 
+    def prefetch_runs_and_lumis(self, ticket):
+        """
+        Fetch runs and lumisections of all distinct subcampaign and input pairs of
+        a ticket. DBS runs of each input and DCS JSON of each subcampaign are
+        fetched concurrently. Return a dictionary of (subcampaign, input) pairs and
+        (runs, lumisections) tuples or exceptions
+        """
+        inputs = sorted(set(ticket.get('input')))
+        subcampaigns = sorted({step['subcampaign'] for step in ticket.get('steps')})
+        request_controller = RequestController()
+        subcampaign_controller = SubcampaignController()
+
+        def get_dataset_runs(input_item):
+            try:
+                return request_controller.get_dataset_runs(input_item)
+            except Exception as ex:
+                return ex
+
+        def get_dcs_mask(subcampaign_name):
+            try:
+                return subcampaign_controller.get_dcs_mask(subcampaign_name)
+            except Exception as ex:
+                return ex
+
+        with ThreadPoolExecutor(max_workers=PREFETCH_WORKERS) as executor:
+            # DCS JSONs are cached, so results are not needed here
+            dcs_futures = [executor.submit(get_dcs_mask, s) for s in subcampaigns]
+            dataset_runs = dict(zip(inputs, executor.map(get_dataset_runs, inputs)))
+            for future in dcs_futures:
+                future.result()
+
+        prefetched = {}
+        for input_item in inputs:
+            for subcampaign_name in subcampaigns:
+                key = (subcampaign_name, input_item)
+                if isinstance(dataset_runs[input_item], Exception):
+                    prefetched[key] = dataset_runs[input_item]
+                    continue
+
+                try:
+                    runs = request_controller.get_runs(subcampaign_name,
+                                                       input_item,
+                                                       dataset_runs[input_item])
+                    lumis = request_controller.get_lumisections(subcampaign_name, runs)
+                    prefetched[key] = (runs, lumis)
+                except Exception as ex:
+                    prefetched[key] = ex
+
+        return prefetched
+
     def create_requests_for_ticket(self, ticket):
         """
         Create requests from given ticket. Return list of request prepids
@@ -186,21 +257,28 @@ class TicketController(ControllerBase):
         request_controller = RequestController()
         with self.locker.get_lock(ticket_prepid):
             ticket = Ticket(json_input=database.get(ticket_prepid))
+            old_ticket = Ticket(json_input=ticket.get_json())
             created_requests = ticket.get('created_requests')
-            status = ticket.get('status')
-            if status != 'new':
+            if ticket.get('status') != 'new':
                 raise AssertionError(f'Ticket is not new, it already has '
                                      f'{len(created_requests)} requests created')
 
             # In case black list was updated after ticket was created
             self.check_input(ticket)
             self.check_steps(ticket)
+            start_time = time.time()
+            prefetched = self.prefetch_runs_and_lumis(ticket)
+            prefetch_time = time.time() - start_time
             try:
-                for input_item in ticket.get('input'):
+                new_request_jsons = []
+                for input_index, input_item in enumerate(ticket.get('input')):
                     last_request_prepid = None
                     for step_index, step in enumerate(ticket.get('steps')):
                         subcampaign_name = step['subcampaign']
-                        new_request_json = {'subcampaign': subcampaign_name,
+                        # Temporary prepid that is used as input of the next step
+                        temporary_prepid = f'{ticket_prepid}-{input_index}-{step_index}'
+                        new_request_json = {'prepid': temporary_prepid,
+                                            'subcampaign': subcampaign_name,
                                             'priority': step['priority'],
                                             'processing_string': step['processing_string'],
                                             'time_per_event': step['time_per_event'],
@@ -216,27 +294,34 @@ class TicketController(ControllerBase):
                         else:
                             new_request_json['input']['request'] = last_request_prepid
 
-                        try:
-                            runs = request_controller.get_runs(subcampaign_name, input_item)
-                            new_request_json['runs'] = runs
-                            lumis = request_controller.get_lumisections(subcampaign_name, runs)
-                            new_request_json['lumisections'] = lumis
-                        except Exception as ex:
+                        runs_and_lumis = prefetched[(subcampaign_name, input_item)]
+                        if isinstance(runs_and_lumis, Exception):
                             self.logger.error('Error getting runs or lumis for %s %s: \n%s',
                                               subcampaign_name,
                                               input_item,
-                                              ex)
+                                              runs_and_lumis)
+                        else:
+                            new_request_json['runs'] = runs_and_lumis[0]
+                            new_request_json['lumisections'] = runs_and_lumis[1]
+
+                        new_request_jsons.append(new_request_json)
+                        last_request_prepid = temporary_prepid
 
-                        request = request_controller.create(new_request_json)
-                        created_requests.append(request)
-                        last_request_prepid = request.get('prepid')
-                        self.logger.info('Created %s', last_request_prepid)
+                requests = request_controller.create_many(new_request_jsons)
+                created_requests.extend(requests)
+                self.logger.info('Created %s', ', '.join(r.get_prepid() for r in requests))
 
                 created_request_prepids = [r.get('prepid') for r in created_requests]
                 ticket.set('created_requests', created_request_prepids)
                 ticket.set('status', 'done')
                 ticket.add_history('create_requests', created_request_prepids, None)
+                create_time = time.time() - start_time - prefetch_time
+                ticket.add_history('create_requests_timing',
+                                   f'prefetch {prefetch_time:.2f}s, create {create_time:.2f}s',
+                                   None)
                 database.save(ticket.get_json())
+                TicketRequestsCache().invalidate()
+                self.after_update(old_ticket, ticket, ['status', 'created_requests'])
             except Exception as ex:
                 # Delete created requests if there was an Exception
                 for created_request in reversed(created_requests):
@@ -257,7 +342,7 @@ class TicketController(ControllerBase):
         acquisition_eras = {}
         request_controller = RequestController()
         for request_prepid in ticket.get('created_requests'):
-            request = request_controller.get(request_prepid)
+            request = request_controller.get_read_only(request_prepid)
             acquisition_era = request.get_era()
             acquisition_eras.setdefault(acquisition_era, []).append(request)
 
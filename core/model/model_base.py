@@ -1,6 +1,7 @@
 """
 Module that contains ModelBase class
 """
+from copy import deepcopy
 from core_lib.model.model_base import ModelBase as PdmVModelBase
 from core_lib.utils.common_utils import make_regex_matcher as regex
 
@@ -29,3 +30,39 @@ class ModelBase(PdmVModelBase):
         'priority': lambda priority: 20000 <= priority <= 1000000,
         'subcampaign': subcampaign_id_check,
     }
+
+    # Object was constructed without attribute checks and will be checked before first change
+    unchecked = False
+
+    def get(self, attribute):
+        """
+        Return value of an attribute
+        Values of an unchecked object might be shared with its input, so dictionaries
+        and lists are copied to make sure that all changes go through set
+        Objects in lists, e.g. sequences, copy their own values, so they are not copied
+        """
+        value = super().get(attribute)
+        if not self.unchecked or not isinstance(value, (dict, list)):
+            return value
+
+        memo = {}
+        if isinstance(value, list):
+            memo = {id(v): v for v in value if isinstance(v, PdmVModelBase)}
+
+        return deepcopy(value, memo)
+
+    def set(self, attribute, value=None):
+        if self.unchecked and self.initialized:
+            self.check_all_attributes()
+
+        return super().set(attribute, value)
+
+    def check_all_attributes(self):
+        """
+        Check values of all attributes of an object that was constructed without checks
+        """
+        self.unchecked = False
+        for attribute in self.schema():
+            value = self.get(attribute)
+            if not self.check_attribute(attribute, value):
+                raise ValueError(f'Invalid {attribute} value "{value}" for {self.get_prepid()}')
@@ -85,15 +85,27 @@ class Request(ModelBase):
         'total_events': lambda events: events >= 0,
     }
 
-    def __init__(self, json_input=None, check_attributes=True):
+    def __init__(self, json_input=None, check_attributes=True, read_only=False):
+        """
+        Read only request is not copied and not checked until it is changed, so
+        its values, e.g. lumisections, might be shared with provided json_input
+        Its get returns copies of values until it is checked, so values must be
+        changed with set
+        """
+        if read_only:
+            self.unchecked = True
+            check_attributes = False
+
         if json_input:
-            json_input = deepcopy(json_input)
+            json_input = dict(json_input) if read_only else deepcopy(json_input)
             json_input['runs'] = [int(r) for r in json_input.get('runs', [])]
             sequence_objects = []
-            for sequence_json in json_input.get('sequences', []):
+            for index, sequence_json in enumerate(json_input.get('sequences', [])):
                 sequence_objects.append(Sequence(json_input=sequence_json,
                                                  parent=self,
-                                                 check_attributes=check_attributes))
+                                                 check_attributes=check_attributes,
+                                                 index=index,
+                                                 read_only=read_only))
 
             json_input['sequences'] = sequence_objects
 
@@ -106,6 +118,27 @@ class Request(ModelBase):
 
         return super().check_attribute(attribute_name, attribute_value)
 
+    def check_all_attributes(self):
+        super().check_all_attributes()
+        for sequence in self.get('sequences'):
+            if sequence.unchecked:
+                sequence.check_all_attributes()
+
+    def set(self, attribute, value=None):
+        result = super().set(attribute, value)
+        if attribute == 'sequences':
+            self.update_sequence_indices()
+
+        return result
+
+    def update_sequence_indices(self):
+        """
+        Set index of each sequence in the list of sequences
+        """
+        for index, sequence in enumerate(self.get('sequences')):
+            if isinstance(sequence, Sequence):
+                sequence.index = index
+
     def get_config_file_names(self):
         """
         Get list of dictionaries of all config file names without extensions
@@ -120,20 +153,24 @@ class Request(ModelBase):
         """
         Get all cmsDriver commands for this request
         """
-        built_command = ''
+        return ''.join(self.iter_cmsdrivers(overwrite_input))
+
+    def iter_cmsdrivers(self, overwrite_input=None):
+        """
+        Yield chunks of all cmsDriver commands for this request
+        """
         for index, sequence in enumerate(self.get('sequences')):
+            if index > 0:
+                yield '\n\n'
+
             if index == 0 and overwrite_input:
-                built_command += sequence.get_cmsdriver(overwrite_input)
+                yield from sequence.iter_cmsdriver(overwrite_input)
             else:
-                built_command += sequence.get_cmsdriver()
+                yield from sequence.iter_cmsdriver()
 
             if sequence.needs_harvesting():
-                built_command += '\n\n'
-                built_command += sequence.get_harvesting_cmsdriver()
-
-            built_command += '\n\n'
-
-        return built_command.strip()
+                yield '\n\n'
+                yield sequence.get_harvesting_cmsdriver()
 
     def get_era(self):
         """
@@ -5,6 +5,10 @@ import weakref
 from core.model.model_base import ModelBase
 
 
+# Number of DAS queries that are run at the same time when listing files of runs
+DAS_QUERY_WORKERS = 8
+
+
 class Sequence(ModelBase):
     """
     Sequence is a dictionary that has all user editable attributes
@@ -70,9 +74,23 @@ class Sequence(ModelBase):
                                                  'SKIM', 'L1REPACK', 'HLT'})
     }
 
-    def __init__(self, json_input=None, parent=None, check_attributes=True):
+    def __init__(self,
+                 json_input=None,
+                 parent=None,
+                 check_attributes=True,
+                 index=None,
+                 read_only=False):
         self.parent = None
+        # Cached index in parent's list of sequences
+        self.index = index
+        if read_only:
+            self.unchecked = True
+            check_attributes = False
+
         if json_input:
+            if read_only:
+                json_input = dict(json_input)
+
             if json_input.get('gpu', {}).get('requires') not in ('optional', 'required'):
                 json_input['gpu'] = self.schema().get('gpu')
                 json_input['gpu']['requires'] = 'forbidden'
@@ -81,8 +99,9 @@ class Sequence(ModelBase):
         if parent:
             self.parent = weakref.ref(parent)
 
-        self.check_attribute('eventcontent', self.get('eventcontent'))
-        self.check_attribute('datatier', self.get('datatier'))
+        if not read_only:
+            self.check_attribute('eventcontent', self.get('eventcontent'))
+            self.check_attribute('datatier', self.get('datatier'))
 
     def get_prepid(self):
         if not self.parent:
@@ -127,9 +146,22 @@ class Sequence(ModelBase):
     def get_index_in_parent(self):
         """
         Return sequence's index in parent's list of sequences
+        Index assigned by parent is checked and used if it is still correct,
+        otherwise sequences are scanned and found index is cached
         """
-        for index, sequence in enumerate(self.parent().get('sequences')):
+        sequences = self.parent().get('sequences')
+        index = self.index
+        if index is not None and index < len(sequences) and sequences[index] is self:
+            return index
+
+        for index, sequence in enumerate(sequences):
+            if self is sequence:
+                self.index = index
+                return index
+
+        for index, sequence in enumerate(sequences):
             if self == sequence:
+                self.index = index
                 return index
 
         raise AssertionError(f'Sequence is not a child of {self.parent().get_prepid()}')
@@ -211,6 +243,13 @@ class Sequence(ModelBase):
         Config file is named like this
         PrepID_0_cfg.py
         """
+        return ''.join(self.iter_cmsdriver(overwrite_input))
+
+    def iter_cmsdriver(self, overwrite_input=None):
+        """
+        Yield chunks of a cmsDriver command for this sequence, DAS queries of
+        requests with many runs are yielded one line at a time
+        """
         sequence_name = self.get_name()
         arguments_dict = dict(self.get_json())
         # Delete sequence metadata
@@ -219,7 +258,7 @@ class Sequence(ModelBase):
         arguments_dict.pop('harvesting_config_id', None)
 
         # Fetch list of files for specific runs
-        das_query = ''
+        das_query = []
         # Handle input/output file names
         if overwrite_input:
             arguments_dict['filein'] = overwrite_input
@@ -234,15 +273,7 @@ class Sequence(ModelBase):
                     arguments_dict['filein'] = f'"file:{input_request}.root"'
                 elif all_runs:
                     das_file = f'{sequence_name}_files.txt'
-                    das_query += '# Query DAS to get list of files for specified runs\n'
-                    # Chunkify to 25 runs, otherwise script line gets very long
-                    for runs in self.chunkify(all_runs, 25):
-                        runs = ','.join([str(r) for r in runs])
-                        das_query += 'dasgoclient --limit 0 '
-                        das_query += f'--query "file dataset={input_dataset} run in [{runs}]" '
-                        das_query += f'>> {das_file}\n'
-
-                    das_query += '\n'
+                    das_query = self.iter_das_queries(input_dataset, all_runs, das_file)
                     arguments_dict['filein'] = f'"filelist:{das_file}"'
                 else:
                     arguments_dict['filein'] = f'"dbs:{input_dataset}"'
@@ -260,7 +291,32 @@ class Sequence(ModelBase):
         arguments_dict['python_filename'] = f'"{config_names["config"]}.py"'
         arguments_dict['no_exec'] = True
         cms_driver_command = self.__build_cmsdriver('RECO', arguments_dict)
-        return dynamic_steps + das_query + cms_driver_command
+        yield dynamic_steps
+        yield from das_query
+        yield cms_driver_command
+
+    def iter_das_queries(self, input_dataset, runs, das_file):
+        """
+        Yield lines of script that writes a sorted list of unique files of given
+        runs to a file. Runs are split to chunks of 25 that are written to a file
+        and DAS is queried for a few chunks at a time, each query writes to a
+        separate file. Failed queries do not stop the script
+        """
+        das_dir = f'{das_file}.d'
+        runs_file = f'{das_file}.runs'
+        query = f'file dataset={input_dataset} run in [$1]'
+        yield '# Query DAS to get list of files for specified runs\n'
+        yield f'rm -rf {das_dir} {runs_file}\n'
+        yield f'mkdir -p {das_dir}\n'
+        # Chunkify to 25 runs, otherwise DAS query gets very long
+        for chunk_index, runs_chunk in enumerate(self.chunkify(runs, 25)):
+            yield f'echo "{chunk_index} {",".join(str(r) for r in runs_chunk)}" >> {runs_file}\n'
+
+        yield (f'xargs -a {runs_file} -L 1 -P {DAS_QUERY_WORKERS} '
+               f'sh -c \'dasgoclient --limit 0 --query "{query}" > {das_dir}/$0.txt\'\n')
+        yield f'cat {das_dir}/*.txt | sort -u > {das_file}\n'
+        yield f'rm -rf {das_dir} {runs_file}\n'
+        yield '\n'
 
     def update_dynamic_steps(self, steps):
         """
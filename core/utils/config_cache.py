@@ -0,0 +1,129 @@
+"""
+Module that contains ConfigCache class
+"""
+import json
+import time
+import hashlib
+import logging
+from threading import Lock
+from core_lib.database.database import Database
+from core.utils.scram_arch_index import ScramArchIndex
+
+
+class ConfigCache():
+    """
+    ConfigCache maps normalized cmsDriver arguments of a sequence to ConfigCache
+    IDs of configs that were already uploaded to ReqMgr2
+    Requests whose configs are all in the cache do not need to generate and upload them
+    """
+
+    # Seconds after which cached config IDs are not used anymore
+    ttl = 7 * 24 * 3600
+    __lock = Lock()
+    __stats = {'hits': 0, 'misses': 0, 'stored': 0}
+
+    def __init__(self):
+        self.logger = logging.getLogger()
+        self.database = Database('config_cache')
+
+    def get_key(self, sequence, scram_arch):
+        """
+        Return a hash of sequence's cmsDriver arguments, CMSSW release and scram arch
+        File names are not included as they are different for each request
+        """
+        request = sequence.parent()
+        arguments = dict(sequence.get_json())
+        arguments.pop('config_id', None)
+        arguments.pop('harvesting_config_id', None)
+        key_dict = {'arguments': arguments,
+                    'cmssw_release': request.get('cmssw_release'),
+                    'scram_arch': scram_arch,
+                    'harvesting': sequence.needs_harvesting(),
+                    'first': sequence.get_index_in_parent() == 0}
+        if {'ALCA', 'SKIM'} & set(sequence.get('step')):
+            # Dynamic steps depend on dataset name
+            key_dict['dataset'] = request.get_dataset()
+
+        key_string = json.dumps(key_dict, sort_keys=True)
+        return hashlib.sha256(key_string.encode('utf-8')).hexdigest()
+
+    def get_keys(self, request):
+        """
+        Return cache keys of all request's sequences
+        """
+        scram_arch = ScramArchIndex().get(request.get('cmssw_release'))
+        return [self.get_key(sequence, scram_arch) for sequence in request.get('sequences')]
+
+    def get_config_hashes(self, request):
+        """
+        Return a list of config name and hash tuples of a request if configs of all
+        sequences are in the cache, otherwise return None
+        """
+        keys = self.get_keys(request)
+        min_created = int(time.time() - ConfigCache.ttl)
+        entries = self.database.collection.find({'_id': {'$in': keys},
+                                                 'created': {'$gte': min_created}})
+        entries = {e['_id']: e for e in entries}
+        config_hashes = []
+        for key, sequence in zip(keys, request.get('sequences')):
+            entry = entries.get(key)
+            config_names = sequence.get_config_file_names()
+            if not entry or (config_names.get('harvest') and not entry['harvesting_config_id']):
+                config_hashes = None
+                break
+
+            config_hashes.append((config_names['config'], entry['config_id']))
+            if config_names.get('harvest'):
+                config_hashes.append((config_names['harvest'], entry['harvesting_config_id']))
+
+        with ConfigCache.__lock:
+            ConfigCache.__stats['hits' if config_hashes else 'misses'] += 1
+
+        prepid = request.get_prepid()
+        self.logger.info('Config cache %s for %s', 'hit' if config_hashes else 'miss', prepid)
+        return config_hashes
+
+    def store_config_hashes(self, request):
+        """
+        Save config IDs of all request's sequences to the cache
+        """
+        now = int(time.time())
+        for key, sequence in zip(self.get_keys(request), request.get('sequences')):
+            if not sequence.get('config_id'):
+                continue
+
+            self.database.collection.replace_one(
+                {'_id': key},
+                {'_id': key,
+                 'config_id': sequence.get('config_id'),
+                 'harvesting_config_id': sequence.get('harvesting_config_id'),
+                 'cmssw_release': request.get('cmssw_release'),
+                 'label': sequence.get_name(),
+                 'created': now},
+                upsert=True
+            )
+            with ConfigCache.__lock:
+                ConfigCache.__stats['stored'] += 1
+
+    def invalidate(self, cmssw_release=None):
+        """
+        Remove all entries or entries of given CMSSW release from the cache
+        Return number of removed entries
+        """
+        query = {'cmssw_release': cmssw_release} if cmssw_release else {}
+        deleted = self.database.collection.delete_many(query).deleted_count
+        self.logger.info('Removed %s entries from config cache', deleted)
+        return deleted
+
+    def get_status(self):
+        """
+        Return number of cache hits, misses and hit ratio
+        """
+        with ConfigCache.__lock:
+            hits = ConfigCache.__stats['hits']
+            misses = ConfigCache.__stats['misses']
+            total = hits + misses
+            return {'hits': hits,
+                    'misses': misses,
+                    'stored': ConfigCache.__stats['stored'],
+                    'hit_ratio': round(hits / total, 3) if total else 0.0}
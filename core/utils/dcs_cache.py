@@ -0,0 +1,186 @@
+"""
+Module that contains DCSCache class
+"""
+import os
+import json
+import time
+import fcntl
+import hashlib
+import logging
+from threading import Lock
+from contextlib import contextmanager
+import environment
+from core_lib.utils.locker import Locker
+from core_lib.utils.connection_wrapper import ConnectionWrapper
+from core.utils.lumi_mask import LumiMask
+
+
+class DCSCache():
+    """
+    DCSCache keeps DCS certification JSONs in a folder that is shared by all
+    application processes and as LumiMask objects in memory of each process
+    Files are downloaded again after some time, but they are written and parsed
+    again only if their content changed
+    """
+
+    host = 'https://cms-service-dqmdc.web.cern.ch'
+    path = '/CAF/certification'
+    # Seconds after which cached file is revalidated
+    revalidate_after = 600
+    __lock = Lock()
+    __masks = {}
+    __stats = {'memory_hits': 0,
+               'disk_hits': 0,
+               'revalidated': 0,
+               'downloaded': 0,
+               'errors': 0}
+
+    def __init__(self):
+        self.logger = logging.getLogger()
+        self.cache_dir = os.path.join(environment.CACHE_FOLDER, 'dcs')
+
+    def __count(self, name):
+        """
+        Increment a statistics counter
+        """
+        with DCSCache.__lock:
+            DCSCache.__stats[name] += 1
+
+    def get_file_path(self, runs_json_path):
+        """
+        Return path of cached file without extension
+        """
+        name = hashlib.sha1(runs_json_path.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, name)
+
+    @contextmanager
+    def file_lock(self, file_path):
+        """
+        Context manager that holds an exclusive lock of a file across processes
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(f'{file_path}.lock', 'w', encoding='utf-8') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read_metadata(self, file_path):
+        """
+        Return metadata of cached file or None if file is not cached
+        """
+        try:
+            with open(f'{file_path}.meta', 'r', encoding='utf-8') as meta_file:
+                return json.load(meta_file)
+        except (OSError, ValueError):
+            return None
+
+    def write_file(self, file_path, content):
+        """
+        Write a file atomically, so other processes never read a partial file
+        """
+        with open(f'{file_path}.tmp', 'w', encoding='utf-8') as output_file:
+            output_file.write(content)
+
+        os.replace(f'{file_path}.tmp', file_path)
+
+    def load_mask(self, file_path, metadata):
+        """
+        Read cached JSON from disk, keep it in memory and return it as LumiMask
+        """
+        with open(f'{file_path}.json', 'r', encoding='utf-8') as json_file:
+            lumi_mask = LumiMask.from_json(json.load(json_file) or {})
+
+        with DCSCache.__lock:
+            DCSCache.__masks[file_path] = (lumi_mask, metadata)
+
+        return lumi_mask
+
+    def download(self, runs_json_path):
+        """
+        Download a certification JSON and return its content
+        """
+        with ConnectionWrapper(self.host,
+                               environment.GRID_USER_CERT,
+                               environment.GRID_USER_KEY) as connection:
+            response = connection.api('GET', f'{self.path}/{runs_json_path}')
+
+        return response.decode('utf-8')
+
+    def get_mask(self, runs_json_path):
+        """
+        Return a LumiMask of given certification JSON
+        """
+        file_path = self.get_file_path(runs_json_path)
+        with DCSCache.__lock:
+            lumi_mask, metadata = DCSCache.__masks.get(file_path, (None, None))
+
+        if lumi_mask is not None and time.time() - metadata['checked'] < self.revalidate_after:
+            self.__count('memory_hits')
+            return lumi_mask
+
+        with Locker().get_lock(f'dcs-{runs_json_path}'), self.file_lock(file_path):
+            disk_metadata = self.read_metadata(file_path)
+            # Whether file in memory is the same as file on disk
+            same_file = (lumi_mask is not None
+                         and disk_metadata
+                         and disk_metadata.get('downloaded') == metadata.get('downloaded'))
+            if disk_metadata and time.time() - disk_metadata['checked'] < self.revalidate_after:
+                # Other thread or process checked the file recently
+                if same_file:
+                    with DCSCache.__lock:
+                        DCSCache.__masks[file_path] = (lumi_mask, disk_metadata)
+
+                    self.__count('memory_hits')
+                    return lumi_mask
+
+                self.__count('disk_hits')
+                return self.load_mask(file_path, disk_metadata)
+
+            try:
+                content = self.download(runs_json_path)
+            except Exception as ex:
+                self.__count('errors')
+                if not disk_metadata:
+                    raise
+
+                self.logger.warning('Using stale %s, error revalidating: %s', runs_json_path, ex)
+                return self.load_mask(file_path, disk_metadata)
+
+            new_metadata = dict(disk_metadata or {})
+            new_metadata['checked'] = time.time()
+            new_metadata['path'] = runs_json_path
+            content_hash = hashlib.sha1(content.encode('utf-8')).hexdigest()
+            modified = not disk_metadata or disk_metadata.get('hash') != content_hash
+            if not modified:
+                self.logger.debug('%s was not modified', runs_json_path)
+                self.__count('revalidated')
+            else:
+                self.logger.info('Downloaded %s, %s bytes', runs_json_path, len(content))
+                self.__count('downloaded')
+                new_metadata['downloaded'] = new_metadata['checked']
+                new_metadata['hash'] = content_hash
+                self.write_file(f'{file_path}.json', content)
+
+            self.write_file(f'{file_path}.meta', json.dumps(new_metadata))
+            if not modified and same_file:
+                with DCSCache.__lock:
+                    DCSCache.__masks[file_path] = (lumi_mask, new_metadata)
+
+                return lumi_mask
+
+            return self.load_mask(file_path, new_metadata)
+
+    def get_status(self):
+        """
+        Return cache hit, revalidation and download counts
+        """
+        with DCSCache.__lock:
+            status = dict(DCSCache.__stats)
+            status['in_memory'] = len(DCSCache.__masks)
+
+        hits = status['memory_hits'] + status['disk_hits'] + status['revalidated']
+        total = hits + status['downloaded']
+        status['hit_ratio'] = round(hits / total, 3) if total else 0.0
+        return status
@@ -0,0 +1,215 @@
+"""
+Module that contains IndexManager class
+"""
+import re
+import time
+import logging
+from threading import Lock, Thread
+from core_lib.database.database import Database
+from core.utils.search_renames import SEARCH_RENAMES
+
+
+# Attributes that controllers query or sort by in addition to search renames
+QUERIED_ATTRIBUTES = {
+    'requests': ['prepid', 'status', 'subcampaign', 'processing_string',
+                 'input.request', 'input.dataset', 'deleted'],
+    'subcampaigns': ['prepid'],
+    'tickets': ['prepid', 'status', 'created_requests'],
+}
+
+
+class IndexManager():
+    """
+    IndexManager declares indexes that searches and controllers need, creates
+    the missing ones and checks how slow queries are executed
+    Indexes are declared for every search rename and queried attribute, so a
+    new search rename gets its index at the next start
+    """
+
+    # Seconds after which a search is considered slow
+    slow_query_time = 1.0
+    # Seconds between explain plans of queries of the same shape
+    explain_interval = 600
+    __lock = Lock()
+    __explained = {}
+    __slow_queries = []
+    # Number of latest slow queries that are kept for the status
+    max_slow_queries = 50
+
+    def __init__(self):
+        self.logger = logging.getLogger()
+
+    @staticmethod
+    def get_declared_indexes():
+        """
+        Return dictionary of collections and sorted lists of attributes that must
+        be indexed
+        """
+        indexes = {}
+        for db_name, attributes in QUERIED_ATTRIBUTES.items():
+            indexes.setdefault(db_name, set()).update(attributes)
+
+        for db_name, renames in SEARCH_RENAMES.items():
+            for path in renames.values():
+                indexes.setdefault(db_name, set()).add(re.sub(r'<\w+>$', '', path))
+
+        return {db_name: sorted(paths) for db_name, paths in indexes.items()}
+
+    @staticmethod
+    def get_existing_indexes(collection):
+        """
+        Return set of attributes that have a single attribute index in a collection
+        """
+        existing = set()
+        for index in collection.index_information().values():
+            keys = index.get('key', [])
+            if len(keys) == 1:
+                existing.add(keys[0][0])
+
+        return existing
+
+    def get_missing_indexes(self):
+        """
+        Return dictionary of collections and lists of attributes that are not indexed
+        """
+        missing = {}
+        for db_name, paths in self.get_declared_indexes().items():
+            existing = self.get_existing_indexes(Database(db_name).collection)
+            paths = [p for p in paths if p not in existing and p != '_id']
+            if paths:
+                missing[db_name] = paths
+
+        return missing
+
+    def create_indexes(self):
+        """
+        Create all missing indexes, existing indexes are not changed
+        Return dictionary of collections and lists of created attribute indexes
+        """
+        created = {}
+        for db_name, paths in self.get_missing_indexes().items():
+            collection = Database(db_name).collection
+            for path in paths:
+                start_time = time.time()
+                try:
+                    collection.create_index(path)
+                except Exception as ex:
+                    self.logger.error('Could not create %s index of %s: %s', path, db_name, ex)
+                    continue
+
+                self.logger.info('Created %s index of %s in %.2fs',
+                                 path,
+                                 db_name,
+                                 time.time() - start_time)
+                created.setdefault(db_name, []).append(path)
+
+        return created
+
+    def create_indexes_in_background(self):
+        """
+        Create missing indexes in a background thread, so startup does not wait
+        """
+        def create():
+            try:
+                self.create_indexes()
+            except Exception as ex:
+                self.logger.error('Could not create indexes: %s', ex)
+
+        Thread(target=create, daemon=True).start()
+
+    @classmethod
+    def get_shape(cls, query):
+        """
+        Return shape of a query: attributes and operators without values
+        """
+        if isinstance(query, dict):
+            return '{%s}' % (','.join(f'{k}:{cls.get_shape(v)}' for k, v in sorted(query.items())))
+
+        if isinstance(query, list):
+            return '[%s]' % (','.join(sorted({cls.get_shape(v) for v in query})))
+
+        return '?'
+
+    @classmethod
+    def get_plan_stages(cls, plan):
+        """
+        Return list of stages of a query plan from top to bottom
+        """
+        if not plan:
+            return []
+
+        # Plans of slot based execution engine are nested in queryPlan
+        plan = plan.get('queryPlan', plan)
+        stages = [plan.get('stage')]
+        if plan.get('indexName'):
+            stages[0] = f'{stages[0]}({plan["indexName"]})'
+
+        for input_stage in [plan.get('inputStage')] + plan.get('inputStages', []):
+            stages.extend(cls.get_plan_stages(input_stage))
+
+        return [s for s in stages if s]
+
+    def explain(self, db_name, query, sort=None):
+        """
+        Return a summary of how a query is executed: stages of the winning plan,
+        number of examined keys and documents, returned documents and time
+        """
+        cursor = Database(db_name).collection.find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+
+        plan = cursor.explain()
+        stats = plan.get('executionStats', {})
+        stages = self.get_plan_stages(plan.get('queryPlanner', {}).get('winningPlan'))
+        return {'database': db_name,
+                'shape': self.get_shape(query),
+                'stages': stages,
+                'collection_scan': 'COLLSCAN' in stages,
+                'keys_examined': stats.get('totalKeysExamined'),
+                'documents_examined': stats.get('totalDocsExamined'),
+                'returned': stats.get('nReturned'),
+                'time_ms': stats.get('executionTimeMillis')}
+
+    def sample_query(self, db_name, query, sort, query_time):
+        """
+        Explain a slow query in the background, at most once per explain interval
+        for each query shape, and keep the summary for the status
+        """
+        if query_time < self.slow_query_time:
+            return
+
+        key = (db_name, self.get_shape(query), str(sort))
+        now = time.time()
+        with IndexManager.__lock:
+            if now - IndexManager.__explained.get(key, 0) < self.explain_interval:
+                return
+
+            IndexManager.__explained[key] = now
+
+        def explain():
+            try:
+                summary = self.explain(db_name, query, sort)
+            except Exception as ex:
+                self.logger.error('Could not explain %s query: %s', db_name, ex)
+                return
+
+            summary['query_time'] = round(query_time, 3)
+            summary['sort'] = str(sort)
+            self.logger.warning('Slow %s query %s sorted by %s took %.2fs, plan: %s',
+                                db_name,
+                                summary['shape'],
+                                summary['sort'],
+                                query_time,
+                                ' <- '.join(summary['stages']))
+            with IndexManager.__lock:
+                IndexManager.__slow_queries.append(summary)
+                del IndexManager.__slow_queries[:-self.max_slow_queries]
+
+        Thread(target=explain, daemon=True).start()
+
+    def get_status(self):
+        """
+        Return latest slow queries and their plans
+        """
+        with IndexManager.__lock:
+            return {'slow_queries': list(IndexManager.__slow_queries)}
@@ -0,0 +1,79 @@
+"""
+Module that contains JobDictCache class
+"""
+import json
+import hashlib
+from copy import deepcopy
+from threading import Lock
+from collections import OrderedDict
+
+
+class JobDictCache():
+    """
+    JobDictCache keeps ReqMgr2 job dicts of requests in memory
+    Job dict is cached together with a revision of the request it was made of,
+    so it is used only as long as the request is not changed
+    """
+
+    # Maximum number of job dicts in memory, least recently used are removed first
+    max_size = 5000
+    __lock = Lock()
+    __job_dicts = OrderedDict()
+    __stats = {'hits': 0, 'misses': 0}
+
+    @staticmethod
+    def get_revision(request_json):
+        """
+        Return revision of a request JSON: hash of all its values except history,
+        so any change of a request that job dict is made of changes the revision
+        """
+        values = {k: v for k, v in request_json.items() if k != 'history'}
+        return hashlib.sha1(json.dumps(values, sort_keys=True, default=str).encode()).hexdigest()
+
+    def get(self, prepid, revision):
+        """
+        Return a copy of cached job dict of given request revision or None
+        """
+        with JobDictCache.__lock:
+            cached_revision, job_dict = JobDictCache.__job_dicts.get(prepid, (None, None))
+            if job_dict is None or cached_revision != revision:
+                JobDictCache.__stats['misses'] += 1
+                return None
+
+            JobDictCache.__job_dicts.move_to_end(prepid)
+            JobDictCache.__stats['hits'] += 1
+
+        return deepcopy(job_dict)
+
+    def set(self, prepid, revision, job_dict):
+        """
+        Cache a job dict of given request revision
+        """
+        job_dict = deepcopy(job_dict)
+        with JobDictCache.__lock:
+            JobDictCache.__job_dicts[prepid] = (revision, job_dict)
+            JobDictCache.__job_dicts.move_to_end(prepid)
+            while len(JobDictCache.__job_dicts) > self.max_size:
+                JobDictCache.__job_dicts.popitem(last=False)
+
+    def invalidate(self, prepid=None):
+        """
+        Remove job dict of a request or all job dicts from the cache
+        """
+        with JobDictCache.__lock:
+            if prepid is None:
+                JobDictCache.__job_dicts.clear()
+            else:
+                JobDictCache.__job_dicts.pop(prepid, None)
+
+    def get_status(self):
+        """
+        Return cache hit and miss counts
+        """
+        with JobDictCache.__lock:
+            status = dict(JobDictCache.__stats)
+            status['in_memory'] = len(JobDictCache.__job_dicts)
+
+        total = status['hits'] + status['misses']
+        status['hit_ratio'] = round(status['hits'] / total, 3) if total else 0.0
+        return status
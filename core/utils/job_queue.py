@@ -0,0 +1,218 @@
+"""
+Module that contains JobQueue class
+"""
+import os
+import time
+import socket
+import logging
+from datetime import datetime, timedelta
+from threading import Event, Lock, Thread
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from core_lib.database.database import Database
+
+
+class JobQueue():
+    """
+    JobQueue is a queue of background jobs that is kept in the database, so jobs
+    are not lost after restart and are shared by all application processes
+    Each job has a unique key, so the same job is never added twice. Failed jobs
+    are retried with exponential backoff until they run out of attempts
+    """
+
+    # Seconds between checks for new jobs
+    poll_interval = 10
+    # Seconds before the first retry, each next retry waits twice as long
+    retry_delay = 30
+    # Maximum number of seconds between retries
+    max_retry_delay = 3600
+    max_attempts = 5
+    # Seconds after which running job is considered abandoned
+    running_timeout = 1800
+    # Days to keep finished jobs
+    keep_done_days = 7
+    __lock = Lock()
+    __handlers = {}
+    __worker = None
+    __wake_up = Event()
+
+    def __init__(self):
+        self.logger = logging.getLogger()
+        self.jobs = Database('jobs').collection
+
+    @classmethod
+    def register(cls, job_type, handler):
+        """
+        Register a function that runs jobs of given type with job arguments
+        """
+        with cls.__lock:
+            cls.__handlers[job_type] = handler
+
+    def start_worker(self):
+        """
+        Start a worker thread of this process if it is not running yet
+        """
+        with JobQueue.__lock:
+            if JobQueue.__worker:
+                return
+
+            self.jobs.create_index([('status', 1), ('next_run', 1)])
+            self.jobs.create_index('expires', expireAfterSeconds=0)
+            worker_name = f'{socket.gethostname()}-{os.getpid()}'
+            JobQueue.__worker = Thread(target=self.__work, args=(worker_name,), daemon=True)
+            JobQueue.__worker.start()
+
+        self.logger.info('Started job queue worker')
+
+    def add(self, job_type, key, **kwargs):
+        """
+        Add a job to the queue unless job with the same key already exists
+        Return whether job was added
+        """
+        now = time.time()
+        job = {'_id': key,
+               'type': job_type,
+               'args': kwargs,
+               'status': 'pending',
+               'attempts': 0,
+               'next_run': now,
+               'created': now,
+               'updated': now,
+               'error': ''}
+        try:
+            self.jobs.insert_one(job)
+        except DuplicateKeyError:
+            self.logger.info('Job %s already exists', key)
+            return False
+
+        self.logger.info('Added job %s', key)
+        JobQueue.__wake_up.set()
+        return True
+
+    def retry(self, key):
+        """
+        Make a failed job pending again with new attempts
+        """
+        now = time.time()
+        result = self.jobs.update_one({'_id': key, 'status': 'failed'},
+                                      {'$set': {'status': 'pending',
+                                                'attempts': 0,
+                                                'next_run': now,
+                                                'updated': now}})
+        if not result.modified_count:
+            raise ValueError(f'Failed job "{key}" does not exist')
+
+        JobQueue.__wake_up.set()
+
+    def claim(self, worker_name):
+        """
+        Atomically take a pending job that is due or an abandoned running job
+        """
+        now = time.time()
+        query = {'$or': [{'status': 'pending', 'next_run': {'$lte': now}},
+                         {'status': 'running', 'started': {'$lt': now - self.running_timeout}}]}
+        return self.jobs.find_one_and_update(query,
+                                             {'$set': {'status': 'running',
+                                                       'worker': worker_name,
+                                                       'started': now,
+                                                       'updated': now},
+                                              '$inc': {'attempts': 1}},
+                                             sort=[('next_run', 1)],
+                                             return_document=ReturnDocument.AFTER)
+
+    def run(self, job):
+        """
+        Run a claimed job and save its outcome
+        """
+        key = job['_id']
+        start_time = time.time()
+        try:
+            with JobQueue.__lock:
+                handler = JobQueue.__handlers.get(job['type'])
+
+            if not handler:
+                raise NotImplementedError(f'No handler for job type "{job["type"]}"')
+
+            handler(**job['args'])
+        except Exception as ex:
+            now = time.time()
+            attempts = job['attempts']
+            if attempts < self.max_attempts:
+                delay = min(self.retry_delay * 2 ** (attempts - 1), self.max_retry_delay)
+                update = {'status': 'pending', 'next_run': now + delay}
+                self.logger.warning('Job %s attempt %s failed, retry in %ss: %s',
+                                    key,
+                                    attempts,
+                                    delay,
+                                    ex)
+            else:
+                update = {'status': 'failed'}
+                self.logger.error('Job %s failed after %s attempts: %s', key, attempts, ex)
+
+            update.update({'error': str(ex), 'updated': now})
+            self.jobs.update_one({'_id': key}, {'$set': update})
+            return
+
+        now = time.time()
+        expires = datetime.utcnow() + timedelta(days=self.keep_done_days)
+        self.jobs.update_one({'_id': key}, {'$set': {'status': 'done',
+                                                     'error': '',
+                                                     'updated': now,
+                                                     'expires': expires}})
+        self.logger.info('Job %s done in %.2fs', key, now - start_time)
+
+    def __work(self, worker_name):
+        """
+        Worker thread that claims and runs jobs
+        """
+        while True:
+            try:
+                job = self.claim(worker_name)
+            except Exception as ex:
+                self.logger.error('Error claiming a job: %s', ex)
+                job = None
+
+            if job:
+                self.run(job)
+                continue
+
+            JobQueue.__wake_up.wait(self.poll_interval)
+            JobQueue.__wake_up.clear()
+
+    def set_progress(self, key, progress):
+        """
+        Set progress values of a running job, keys can be dotted paths of
+        nested values
+        """
+        values = {f'progress.{name}': value for name, value in progress.items()}
+        values['updated'] = time.time()
+        self.jobs.update_one({'_id': key}, {'$set': values})
+
+    def get_job(self, key):
+        """
+        Return a job with given key or None if it does not exist
+        """
+        return self.jobs.find_one({'_id': key}, {'expires': 0})
+
+    def get_last_job(self, job_type):
+        """
+        Return most recently created job of given type or None if there are none
+        """
+        return self.jobs.find_one({'type': job_type}, {'expires': 0}, sort=[('created', -1)])
+
+    def get_jobs(self, status=None, limit=100):
+        """
+        Return jobs with given status, most recently updated first
+        """
+        query = {'status': status} if status else {'status': {'$ne': 'done'}}
+        jobs = self.jobs.find(query, {'expires': 0}).sort('updated', -1).limit(limit)
+        return list(jobs)
+
+    def get_status(self):
+        """
+        Return number of jobs in each status
+        """
+        counts = self.jobs.aggregate([{'$group': {'_id': '$status', 'count': {'$sum': 1}}}])
+        status = {'pending': 0, 'running': 0, 'done': 0, 'failed': 0}
+        status.update({c['_id']: c['count'] for c in counts})
+        return status
@@ -0,0 +1,160 @@
+"""
+Module that contains LumiMask class
+"""
+from array import array
+from bisect import bisect_left
+
+
+class LumiMask():
+    """
+    LumiMask is a compact representation of runs and their lumisection ranges
+    Ranges are kept sorted, merged and stored in flat integer arrays:
+    runs and run_offsets have one item per run, ranges of run at index i are
+    starts[run_offsets[i]:run_offsets[i + 1]] and ends[run_offsets[i]:run_offsets[i + 1]]
+    """
+
+    def __init__(self):
+        self.runs = array('i')
+        self.run_offsets = array('i', [0])
+        self.starts = array('i')
+        self.ends = array('i')
+
+    @staticmethod
+    def merge_ranges(ranges):
+        """
+        Return sorted list of ranges where overlapping and adjacent ranges are merged
+        """
+        merged = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+
+        return merged
+
+    def add_run(self, run, ranges):
+        """
+        Append a run and its sorted, merged ranges to the end of the mask
+        Runs must be added in increasing order
+        """
+        if not ranges:
+            return
+
+        if self.runs and run <= self.runs[-1]:
+            raise ValueError(f'Run {run} is added after run {self.runs[-1]}')
+
+        self.runs.append(run)
+        for start, end in ranges:
+            self.starts.append(start)
+            self.ends.append(end)
+
+        self.run_offsets.append(len(self.starts))
+
+    @classmethod
+    def from_json(cls, lumisections):
+        """
+        Make a mask from a dictionary of run numbers and lists of lumisection ranges,
+        e.g. {"123": [[1, 10], [15, 20]]}
+        """
+        mask = cls()
+        for run in sorted(int(r) for r in lumisections):
+            ranges = lumisections.get(str(run), lumisections.get(run))
+            mask.add_run(run, cls.merge_ranges(ranges))
+
+        return mask
+
+    def to_json(self):
+        """
+        Return a dictionary of run numbers as strings and lists of lumisection ranges
+        """
+        lumisections = {}
+        for index, run in enumerate(self.runs):
+            lumisections[str(run)] = self.get_ranges_at(index)
+
+        return lumisections
+
+    def get_runs(self):
+        """
+        Return a sorted list of run numbers
+        """
+        return list(self.runs)
+
+    def get_ranges_at(self, index):
+        """
+        Return list of ranges of run at given index
+        """
+        begin, end = self.run_offsets[index], self.run_offsets[index + 1]
+        return [[s, e] for s, e in zip(self.starts[begin:end], self.ends[begin:end])]
+
+    def get_ranges(self, run):
+        """
+        Return list of lumisection ranges of a run or empty list if run is not in the mask
+        """
+        index = bisect_left(self.runs, run)
+        if index < len(self.runs) and self.runs[index] == run:
+            return self.get_ranges_at(index)
+
+        return []
+
+    def filter_runs(self, runs):
+        """
+        Return a new mask that has only given runs
+        """
+        mask = LumiMask()
+        for run in sorted({int(r) for r in runs}):
+            index = bisect_left(self.runs, run)
+            if index < len(self.runs) and self.runs[index] == run:
+                # Copy array slices without making range lists
+                begin, end = self.run_offsets[index], self.run_offsets[index + 1]
+                mask.runs.append(run)
+                mask.starts.extend(self.starts[begin:end])
+                mask.ends.extend(self.ends[begin:end])
+                mask.run_offsets.append(len(mask.starts))
+
+        return mask
+
+    def intersect(self, other):
+        """
+        Return a new mask with lumisections that are in both masks
+        """
+        mask = LumiMask()
+        for index, run in enumerate(self.runs):
+            other_ranges = other.get_ranges(run)
+            if not other_ranges:
+                continue
+
+            ranges = []
+            ranges_a = self.get_ranges_at(index)
+            i, j = 0, 0
+            while i < len(ranges_a) and j < len(other_ranges):
+                start = max(ranges_a[i][0], other_ranges[j][0])
+                end = min(ranges_a[i][1], other_ranges[j][1])
+                if start <= end:
+                    ranges.append([start, end])
+
+                if ranges_a[i][1] < other_ranges[j][1]:
+                    i += 1
+                else:
+                    j += 1
+
+            mask.add_run(run, ranges)
+
+        return mask
+
+    def union(self, other):
+        """
+        Return a new mask with lumisections that are in any of the masks
+        """
+        mask = LumiMask()
+        for run in sorted(set(self.runs) | set(other.runs)):
+            ranges = self.get_ranges(run) + other.get_ranges(run)
+            mask.add_run(run, self.merge_ranges(ranges))
+
+        return mask
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __bool__(self):
+        return bool(self.runs)
@@ -0,0 +1,228 @@
+"""
+Module that contains ObjectStats class
+"""
+import json
+import time
+import logging
+from threading import Lock, Thread
+from pymongo import UpdateOne
+from core_lib.database.database import Database
+
+
+class ObjectStats():
+    """
+    ObjectStats keeps numbers of requests and tickets in the database
+    Each combination of status, subcampaign and processing string of requests and
+    each status of tickets has a document with a number of objects, which is changed
+    when objects are created, deleted or change status, so Dashboard statistics
+    are read without aggregations over whole collections
+    Numbers are periodically recounted to correct drift. Every change increments
+    version of a number, so recount corrects only numbers that did not change
+    while objects were counted
+    """
+
+    # Grouping attributes of each database
+    attributes = {'requests': ('status', 'subcampaign', 'processing_string'),
+                  'tickets': ('status',)}
+    # Id of a document that exists after numbers were reconciled at least once
+    reconciled_id = 'reconciled'
+    # Seconds between background reconciliations
+    reconcile_interval = 3600
+    __lock = Lock()
+    __reconciler = None
+    __stats = {'reconciliations': 0, 'corrections': 0, 'errors': 0, 'last_reconciliation': 0}
+
+    def __init__(self):
+        self.logger = logging.getLogger()
+        self.counts = Database('object_stats').collection
+
+    def get_key(self, db_name, item):
+        """
+        Return tuple of grouping attribute values of an object or None if there is no object
+        """
+        if not item:
+            return None
+
+        return tuple(item.get(attribute) or '' for attribute in self.attributes[db_name])
+
+    @staticmethod
+    def get_id(db_name, key):
+        """
+        Return id of a document with number of objects with given key
+        """
+        return json.dumps([db_name] + list(key))
+
+    def make_update(self, db_name, key, increment):
+        """
+        Return an update of number of objects with given key
+        """
+        values = dict(zip(self.attributes[db_name], key))
+        return UpdateOne({'_id': self.get_id(db_name, key)},
+                         {'$inc': {'count': increment, 'version': 1},
+                          '$setOnInsert': {'database': db_name, **values}},
+                         upsert=True)
+
+    def make_correction(self, db_name, key, difference, version):
+        """
+        Return an update that corrects number of objects with given key only if
+        its version did not change, number that was not stored is only inserted
+        """
+        object_id = self.get_id(db_name, key)
+        if version is False:
+            values = dict(zip(self.attributes[db_name], key))
+            return UpdateOne({'_id': object_id},
+                             {'$setOnInsert': {'database': db_name,
+                                               'count': difference,
+                                               'version': 0,
+                                               **values}},
+                             upsert=True)
+
+        return UpdateOne({'_id': object_id, 'version': version},
+                         {'$inc': {'count': difference, 'version': 1}})
+
+    def change(self, db_name, old_item, new_item):
+        """
+        Update numbers after an object changed from old to new
+        Old item is None for created objects and new item is None for deleted objects
+        """
+        self.change_many(db_name, [(old_item, new_item)])
+
+    def change_many(self, db_name, changes):
+        """
+        Update numbers after multiple objects of the same database changed
+        """
+        increments = {}
+        for old_item, new_item in changes:
+            old_key = self.get_key(db_name, old_item)
+            new_key = self.get_key(db_name, new_item)
+            if old_key == new_key:
+                continue
+
+            if old_key is not None:
+                increments[old_key] = increments.get(old_key, 0) - 1
+
+            if new_key is not None:
+                increments[new_key] = increments.get(new_key, 0) + 1
+
+        updates = [self.make_update(db_name, k, i) for k, i in increments.items() if i]
+        if updates:
+            try:
+                self.counts.bulk_write(updates, ordered=False)
+            except Exception as ex:
+                # Drift is corrected by the next reconciliation
+                self.logger.error('Error updating %s statistics: %s', db_name, ex)
+
+    def count(self, db_name):
+        """
+        Return numbers of objects of a database counted with an aggregation
+        """
+        attributes = self.attributes[db_name]
+        collection = Database(db_name).collection
+        groups = collection.aggregate([{'$match': {'deleted': {'$ne': True}}},
+                                       {'$group': {'_id': {a: f'${a}' for a in attributes},
+                                                   'count': {'$sum': 1}}}])
+        counts = {}
+        for group in groups:
+            key = self.get_key(db_name, group['_id'])
+            counts[key] = counts.get(key, 0) + group['count']
+
+        return counts
+
+    def reconcile(self):
+        """
+        Recount all objects and correct stored numbers that differ
+        Stored numbers and their versions are read before objects are counted,
+        numbers that changed in the meantime are corrected by next reconciliation
+        Return number of corrected numbers
+        """
+        start_time = time.time()
+        corrections = 0
+        for db_name in self.attributes:
+            stored = {}
+            stale = []
+            for item in self.counts.find({'database': db_name}):
+                key = self.get_key(db_name, item)
+                if item['_id'] != self.get_id(db_name, key):
+                    # Number of grouping attributes that are not used any more
+                    stale.append(item['_id'])
+                else:
+                    stored[key] = (item['count'], item.get('version'))
+
+            counts = self.count(db_name)
+            updates = []
+            for key in set(counts) | set(stored):
+                stored_count, version = stored.get(key, (0, False))
+                difference = counts.get(key, 0) - stored_count
+                if difference:
+                    updates.append(self.make_correction(db_name, key, difference, version))
+
+            if updates:
+                result = self.counts.bulk_write(updates, ordered=False)
+                corrections += result.modified_count + result.upserted_count
+
+            if stale:
+                self.counts.delete_many({'_id': {'$in': stale}})
+
+        self.counts.delete_many({'count': 0})
+        self.counts.update_one({'_id': self.reconciled_id},
+                               {'$set': {'time': int(time.time())}},
+                               upsert=True)
+        with ObjectStats.__lock:
+            ObjectStats.__stats['reconciliations'] += 1
+            ObjectStats.__stats['corrections'] += corrections
+            ObjectStats.__stats['last_reconciliation'] = int(time.time())
+
+        self.logger.info('Reconciled object statistics in %.2fs, %s corrections',
+                         time.time() - start_time,
+                         corrections)
+        return corrections
+
+    def is_reconciled(self):
+        """
+        Return whether numbers were reconciled at least once by any process
+        """
+        return bool(self.counts.find_one({'_id': self.reconciled_id}, {'_id': 1}))
+
+    def start_reconciler(self):
+        """
+        Start a background thread that periodically reconciles numbers
+        """
+        with ObjectStats.__lock:
+            if ObjectStats.__reconciler:
+                return
+
+            ObjectStats.__reconciler = Thread(target=self.__reconcile_loop, daemon=True)
+            ObjectStats.__reconciler.start()
+
+        self.logger.info('Started object statistics reconciler')
+
+    def __reconcile_loop(self):
+        """
+        Background thread that reconciles numbers
+        """
+        while True:
+            try:
+                self.reconcile()
+            except Exception as ex:
+                self.logger.error('Error reconciling object statistics: %s', ex)
+                with ObjectStats.__lock:
+                    ObjectStats.__stats['errors'] += 1
+
+            time.sleep(self.reconcile_interval)
+
+    def get_counts(self, db_name):
+        """
+        Return dictionary of grouping attribute tuples and numbers of objects
+        """
+        counts = {}
+        for item in self.counts.find({'database': db_name, 'count': {'$gt': 0}}):
+            counts[self.get_key(db_name, item)] = item['count']
+
+        return counts
+
+    def get_status(self):
+        """
+        Return reconciliation statistics
+        """
+        with ObjectStats.__lock:
+            return dict(ObjectStats.__stats)
@@ -0,0 +1,246 @@
+"""
+Module that contains PrepidIndex class
+"""
+import re
+import time
+import logging
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from threading import Lock, Thread
+from core_lib.database.database import Database
+
+
+class PrepidIndex():
+    """
+    PrepidIndex is an in-memory index of prepids of one collection for suggestions
+    Lowercase prepids are kept in a sorted list for prefix search and each
+    lowercase trigram has a list of ids of prepids that contain it for substring search
+    Prepids are added and removed when objects are created and deleted in this
+    process, whole index is reloaded after ttl seconds to pick up changes of other processes
+    """
+
+    # Seconds after which index is reloaded from the database
+    ttl = 600
+    # Maximum number of prepids with the rarest trigram of a query that are
+    # checked one by one, otherwise all prepids are walked in sorted order
+    max_candidates = 5000
+    __lock = Lock()
+    __indexes = {}
+    __loading = set()
+
+    def __init__(self, prepids=()):
+        self.lock = Lock()
+        self.loaded = time.time()
+        self.prepids = []
+        self.keys = []
+        self.ids = {}
+        self.removed = set()
+        self.sorted_keys = []
+        self.postings = {}
+        self.text = None
+        for prepid in prepids:
+            self.ids[prepid] = len(self.prepids)
+            self.prepids.append(prepid)
+            self.keys.append(prepid.lower())
+
+        self.sorted_keys = sorted((k, i) for i, k in enumerate(self.keys))
+        postings = {}
+        for prepid_id, key in enumerate(self.keys):
+            for gram in self.get_grams(key):
+                postings.setdefault(gram, []).append(prepid_id)
+
+        self.postings = {gram: array('i', ids) for gram, ids in postings.items()}
+
+    @staticmethod
+    def get_grams(value):
+        """
+        Return set of lowercase trigrams of a string
+        """
+        value = value.lower()
+        return {value[i:i + 3] for i in range(len(value) - 2)}
+
+    @classmethod
+    def get(cls, db_name):
+        """
+        Return index of given collection, load it if it is not loaded yet
+        Expired index is returned while a new one is loaded in the background
+        """
+        with cls.__lock:
+            index = cls.__indexes.get(db_name)
+            expired = index is not None and time.time() - index.loaded > cls.ttl
+            if expired and db_name not in cls.__loading:
+                cls.__loading.add(db_name)
+                Thread(target=cls.load, args=(db_name,), daemon=True).start()
+
+        if index is None:
+            index = cls.load(db_name)
+
+        return index
+
+    @classmethod
+    def load(cls, db_name):
+        """
+        Load index of given collection from the database
+        """
+        try:
+            start_time = time.time()
+            collection = Database(db_name).collection
+            items = collection.find({'deleted': {'$ne': True}}, {'prepid': 1})
+            index = cls(item['prepid'] for item in items)
+            logging.getLogger().info('Loaded %s prepids of %s in %.2fs',
+                                     len(index.ids),
+                                     db_name,
+                                     time.time() - start_time)
+            with cls.__lock:
+                cls.__indexes[db_name] = index
+
+            return index
+        finally:
+            with cls.__lock:
+                cls.__loading.discard(db_name)
+
+    @classmethod
+    def add_prepid(cls, db_name, prepid):
+        """
+        Add a prepid to index of given collection if the index is loaded
+        """
+        with cls.__lock:
+            index = cls.__indexes.get(db_name)
+
+        if index is not None:
+            index.add(prepid)
+
+    @classmethod
+    def remove_prepid(cls, db_name, prepid):
+        """
+        Remove a prepid from index of given collection if the index is loaded
+        """
+        with cls.__lock:
+            index = cls.__indexes.get(db_name)
+
+        if index is not None:
+            index.remove(prepid)
+
+    def add(self, prepid):
+        """
+        Add a prepid to the index
+        """
+        with self.lock:
+            if prepid in self.ids:
+                return
+
+            prepid_id = len(self.prepids)
+            self.ids[prepid] = prepid_id
+            self.prepids.append(prepid)
+            self.keys.append(prepid.lower())
+            insort(self.sorted_keys, (self.keys[prepid_id], prepid_id))
+            self.text = None
+            for gram in self.get_grams(prepid):
+                self.postings.setdefault(gram, array('i')).append(prepid_id)
+
+    def remove(self, prepid):
+        """
+        Remove a prepid from the index, its id stays in postings and is skipped
+        """
+        with self.lock:
+            prepid_id = self.ids.pop(prepid, None)
+            if prepid_id is None:
+                return
+
+            self.removed.add(prepid_id)
+            key = (self.keys[prepid_id], prepid_id)
+            position = bisect_left(self.sorted_keys, key)
+            if position < len(self.sorted_keys) and self.sorted_keys[position] == key:
+                del self.sorted_keys[position]
+                self.text = None
+
+    def get_candidates(self, parts):
+        """
+        Return ids of prepids that have the rarest trigram of given parts or None
+        if parts are too short to have trigrams or all trigrams are too common
+        """
+        grams = set()
+        for part in parts:
+            grams.update(self.get_grams(part))
+
+        if not grams:
+            return None
+
+        rarest = min((self.postings.get(gram, ()) for gram in grams), key=len)
+        if len(rarest) > self.max_candidates:
+            return None
+
+        return rarest
+
+    def suggest(self, query, limit=20):
+        """
+        Return sorted prepids that start with the query followed by other sorted
+        prepids that contain the query, spaces and * in query match anything
+        """
+        parts = [p for p in re.split(r'[\s*]+', query.lower()) if p]
+        if not parts:
+            return []
+
+        with self.lock:
+            prepid_ids = self.find(parts, limit)
+            return [self.prepids[i] for i in prepid_ids]
+
+    def get_text(self):
+        """
+        Return all sorted prepids joined by new lines and offsets of each prepid
+        in the text, text is made again after prepids are added or removed
+        """
+        if self.text is None:
+            offsets = array('i')
+            offset = 0
+            for key, _ in self.sorted_keys:
+                offsets.append(offset)
+                offset += len(key) + 1
+
+            self.text = ('\n'.join(key for key, _ in self.sorted_keys), offsets)
+
+        return self.text
+
+    def find(self, parts, limit):
+        """
+        Return ids of prepids that match all parts in the same order
+        """
+        results = []
+        if len(parts) == 1:
+            # Prefix matches
+            position = bisect_left(self.sorted_keys, (parts[0],))
+            for key, prepid_id in self.sorted_keys[position:position + limit]:
+                if not key.startswith(parts[0]):
+                    break
+
+                results.append(prepid_id)
+
+        matcher = re.compile('.*'.join(re.escape(p) for p in parts))
+        used_ids = set(results)
+        candidates = self.get_candidates(parts)
+        if candidates is None:
+            # Search text of all sorted prepids until there are enough matches
+            text, offsets = self.get_text()
+            for match in matcher.finditer(text):
+                if len(results) >= limit:
+                    break
+
+                _, prepid_id = self.sorted_keys[bisect_right(offsets, match.start()) - 1]
+                if prepid_id not in used_ids:
+                    used_ids.add(prepid_id)
+                    results.append(prepid_id)
+
+            return results
+
+        matches = []
+        for prepid_id in candidates:
+            if prepid_id in used_ids or prepid_id in self.removed:
+                continue
+
+            key = self.keys[prepid_id]
+            if matcher.search(key):
+                matches.append((key, prepid_id))
+
+        matches.sort()
+        results.extend(prepid_id for _, prepid_id in matches[:limit - len(results)])
+        return results
@@ -0,0 +1,150 @@
+"""
+Module that contains RequestGraph class
+"""
+import logging
+from threading import Lock
+from pymongo import ReplaceOne
+from core_lib.database.database import Database
+
+
+class RequestGraph():
+    """
+    RequestGraph is an index of input request dependencies
+    Each request has a node with its input request and a list of all its
+    ancestors starting from the root, so ancestors and descendants of a request
+    are found with a single query
+    """
+
+    __lock = Lock()
+    __indexes_created = False
+
+    def __init__(self):
+        self.logger = logging.getLogger()
+        self.graph = Database('request_graph').collection
+        self.requests = Database('requests').collection
+        self.create_indexes()
+
+    def create_indexes(self):
+        """
+        Create indexes of graph collection once per process
+        """
+        with RequestGraph.__lock:
+            if RequestGraph.__indexes_created:
+                return
+
+            self.graph.create_index('ancestors')
+            self.graph.create_index('input')
+            RequestGraph.__indexes_created = True
+
+    def get_ancestors(self, prepid):
+        """
+        Return a list of ancestors of a request starting from the root request
+        Missing nodes are made from input requests in requests collection
+        """
+        node = self.graph.find_one({'_id': prepid}, {'ancestors': 1})
+        if node is not None:
+            return node['ancestors']
+
+        request = self.requests.find_one({'_id': prepid}, {'input.request': 1})
+        if request is None:
+            raise ValueError(f'Request "{prepid}" does not exist')
+
+        input_prepid = request.get('input', {}).get('request', '')
+        return self.add(prepid, input_prepid)['ancestors']
+
+    def make_node(self, prepid, input_prepid, input_ancestors):
+        """
+        Return a graph node of a request with given input and its ancestors
+        """
+        ancestors = input_ancestors + [input_prepid] if input_prepid else []
+        return {'_id': prepid, 'input': input_prepid, 'ancestors': ancestors}
+
+    def add(self, prepid, input_prepid):
+        """
+        Add a request with given input request to the graph and return its node
+        """
+        input_ancestors = self.get_ancestors(input_prepid) if input_prepid else []
+        node = self.make_node(prepid, input_prepid, input_ancestors)
+        self.graph.replace_one({'_id': prepid}, node, upsert=True)
+        return node
+
+    def add_many(self, requests):
+        """
+        Add multiple requests to the graph, input request must be either
+        in the graph already or before the request in the list
+        """
+        nodes = {}
+        for request in requests:
+            prepid = request.get_prepid()
+            input_prepid = request.get('input')['request']
+            if not input_prepid:
+                input_ancestors = []
+            elif input_prepid in nodes:
+                input_ancestors = nodes[input_prepid]['ancestors']
+            else:
+                input_ancestors = self.get_ancestors(input_prepid)
+
+            nodes[prepid] = self.make_node(prepid, input_prepid, input_ancestors)
+
+        if nodes:
+            self.graph.bulk_write([ReplaceOne({'_id': p}, n, upsert=True)
+                                   for p, n in nodes.items()])
+
+    def remove(self, prepid):
+        """
+        Remove a request from the graph
+        """
+        self.graph.delete_one({'_id': prepid})
+
+    def get_children(self, prepids):
+        """
+        Return list of prepids of requests that have any of given requests as input
+        """
+        if isinstance(prepids, str):
+            prepids = [prepids]
+
+        return [n['_id'] for n in self.graph.find({'input': {'$in': list(prepids)}}, {'_id': 1})]
+
+    def get_descendants(self, prepid):
+        """
+        Return nodes of all requests that have given request as direct or indirect
+        input, parents are always before their children
+        """
+        descendants = list(self.graph.find({'ancestors': prepid}))
+        return sorted(descendants, key=lambda n: (len(n['ancestors']), n['_id']))
+
+    def rebuild(self):
+        """
+        Rebuild the whole graph from input requests in requests collection
+        Return number of nodes in the graph
+        """
+        inputs = {r['_id']: r.get('input', {}).get('request', '')
+                  for r in self.requests.find({}, {'input.request': 1})}
+        ancestors = {}
+
+        def fill_ancestors(prepid):
+            chain = []
+            while prepid and prepid not in ancestors and prepid not in chain:
+                chain.append(prepid)
+                prepid = inputs.get(prepid, '')
+
+            for chain_prepid in reversed(chain):
+                input_prepid = inputs.get(chain_prepid, '')
+                input_ancestors = ancestors.get(input_prepid, []) if input_prepid else []
+                ancestors[chain_prepid] = input_ancestors + [input_prepid] if input_prepid else []
+
+        operations = []
+        for prepid, input_prepid in inputs.items():
+            fill_ancestors(prepid)
+            operations.append(ReplaceOne({'_id': prepid},
+                                         {'_id': prepid,
+                                          'input': input_prepid,
+                                          'ancestors': ancestors[prepid]},
+                                         upsert=True))
+
+        if operations:
+            self.graph.bulk_write(operations, ordered=False)
+
+        self.graph.delete_many({'_id': {'$nin': list(inputs)}})
+        self.logger.info('Rebuilt request graph with %s nodes', len(inputs))
+        return len(inputs)
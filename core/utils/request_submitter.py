@@ -1,41 +1,159 @@
 """
 Module that has all classes used for request submission to computing
 """
+import os
+import json
 import time
+import tempfile
+from threading import Lock
+from contextlib import ExitStack
 import environment
-from core_lib.utils.ssh_executor import SSHExecutor
 from core_lib.utils.locker import Locker
 from core_lib.database.database import Database
 from core_lib.utils.connection_wrapper import ConnectionWrapper
 from core_lib.utils.submitter import Submitter as BaseSubmitter
 from core_lib.utils.common_utils import clean_split, refresh_workflows_in_stats
+from core.model.request import Request
 from core.utils.emailer import Emailer
+from core.utils.submission_stage import SubmissionStage
+from core.utils.ssh_pool import SSHPool
+from core.utils.voms_proxy import VomsProxy
+from core.utils.config_cache import ConfigCache
+from core.utils.scram_arch_index import ScramArchIndex
+
+
+# Number of workers that generate and upload configs on submission machine
+SSH_WORKERS = 10
+# Number of workers that submit and approve workflows in ReqMgr2
+REQMGR_WORKERS = 5
+# Seconds to wait for a workflow to reach expected status in ReqMgr2
+WORKFLOW_POLL_TIMEOUT = 60
+# Maximum number of requests with the same CMSSW release whose configs are
+# generated and uploaded together
+MAX_BATCH_SIZE = 20
 
 
 class RequestSubmitter(BaseSubmitter):
     """
     RequestSubmitter uploads scripts to submission machine, runs them to generate configs,
     uploads configs and job dict to ReqMgr2
+    Submission is split into two stages with separate worker pools: config generation
+    and upload on the submission machine and job dict submission to ReqMgr2
+    Configs that were already uploaded for identical sequences are taken from ConfigCache
     """
 
+    __ssh_stage = SubmissionStage('ssh', SSH_WORKERS)
+    __reqmgr_stage = SubmissionStage('reqmgr', REQMGR_WORKERS)
+    # Batches of requests that are waiting for the SSH stage
+    __batch_lock = Lock()
+    __open_batches = []
+
     def add(self, request, request_controller):
         """
         Add request to submission queue
+        Requests with the same CMSSW release that are waiting in the queue are
+        grouped to a batch and their configs are generated together
         """
         prepid = request.get_prepid()
-        super().add_task(prepid,
-                         self.submit_request,
-                         request=request,
-                         controller=request_controller)
+        cmssw_release = request.get('cmssw_release')
+        with RequestSubmitter.__batch_lock:
+            for batch in RequestSubmitter.__open_batches:
+                if batch['cmssw_release'] != cmssw_release:
+                    continue
+
+                if len(batch['requests']) < MAX_BATCH_SIZE:
+                    batch['requests'].append(request)
+                    self.logger.info('Added %s to %s batch', prepid, cmssw_release)
+                    return
+
+            batch = {'cmssw_release': cmssw_release, 'requests': [request]}
+            RequestSubmitter.__open_batches.append(batch)
+
+        try:
+            self.__ssh_stage.add(f'{cmssw_release} batch',
+                                 self.prepare_batch_configs,
+                                 batch=batch,
+                                 controller=request_controller)
+        except Exception:
+            self.__close_batch(batch)
+            raise
+
+    def __close_batch(self, batch):
+        """
+        Remove batch from open batches, so no more requests are added to it
+        Batch is compared by identity, because different batches might be equal
+        """
+        with RequestSubmitter.__batch_lock:
+            RequestSubmitter.__open_batches[:] = [b for b in RequestSubmitter.__open_batches
+                                                  if b is not batch]
+
+    def get_names_in_queue(self):
+        """
+        Return a list of prepids that are waiting in any of submission stages
+        """
+        with RequestSubmitter.__batch_lock:
+            names = [r.get_prepid() for b in RequestSubmitter.__open_batches for r in b['requests']]
+
+        return names + self.__reqmgr_stage.get_names_in_queue()
 
-    def __handle_error(self, request, error_message):
+    def get_worker_status(self):
+        """
+        Return a dictionary of all submission workers and what they are working on
+        """
+        status = self.__ssh_stage.get_worker_status()
+        status.update(self.__reqmgr_stage.get_worker_status())
+        return status
+
+    def get_stage_status(self):
+        """
+        Return queue depth and latency of each submission stage
+        """
+        return {'ssh': self.__ssh_stage.get_status(),
+                'reqmgr': self.__reqmgr_stage.get_status()}
+
+    def get_connection_status(self):
+        """
+        Return SSH session pool and shared voms proxy usage
+        """
+        return {'ssh_pool': SSHPool().get_status(),
+                'proxy': VomsProxy().get_status()}
+
+    def get_config_cache_status(self):
+        """
+        Return config cache hits, misses and hit ratio
+        """
+        return ConfigCache().get_status()
+
+    def get_cached_config_hashes(self, request):
+        """
+        Return config name and hash tuples of request from config cache or None
+        if configs are not cached and have to be generated and uploaded
+        """
+        try:
+            return ConfigCache().get_config_hashes(request)
+        except Exception as ex:
+            self.logger.error('Error getting %s configs from cache: %s', request.get_prepid(), ex)
+            return None
+
+    def store_config_hashes(self, request):
+        """
+        Save uploaded configs of request to config cache
+        """
+        try:
+            ConfigCache().store_config_hashes(request)
+        except Exception as ex:
+            self.logger.error('Error saving %s configs to cache: %s', request.get_prepid(), ex)
+
+    def __handle_error(self, request, controller, error_message):
         """
         Handle error that occured during submission, modify request accordingly
         """
         request_db = Database('requests')
+        old_request = Request(json_input=request.get_json(), read_only=True)
         request.set('status', 'new')
         request.add_history('submission', 'failed', 'automatic')
         request_db.save(request.get_json())
+        controller.after_update(old_request, request, ['status'])
         service_url = environment.SERVICE_URL
         emailer = Emailer()
         prepid = request.get_prepid()
@@ -76,27 +194,48 @@ class RequestSubmitter(BaseSubmitter):
         """
         prepid = request.get_prepid()
         self.logger.debug('Will prepare remote workspace for %s', prepid)
+        self.prepare_batch_workspace([request], controller, ssh_executor, request_dir)
+
+    def prepare_batch_workspace(self, requests, controller, ssh_executor, batch_dir):
+        """
+        Clean or create a remote directory and upload all files needed to
+        generate and upload configs of requests with the same CMSSW release
+        """
         # Get cmsDriver script
-        config_script = controller.get_cmsdriver(request, for_submission=True)
+        config_script = controller.iter_batch_cmsdriver(requests, for_submission=True)
         # Get config upload script
-        upload_script = controller.get_config_upload_file(request)
+        upload_script = controller.iter_batch_config_upload_file(requests)
 
-        # Re-create the directory and create a voms proxy there
-        command = [f'rm -rf {request_dir}',
-                   f'mkdir -p {request_dir}',
-                   f'cd {request_dir}',
-                   'voms-proxy-init -voms cms --valid 4:00 --out $(pwd)/proxy.txt']
+        # Re-create the directory and make sure shared voms proxy is valid
+        command = [f'rm -rf {batch_dir}',
+                   f'mkdir -p {batch_dir}']
         ssh_executor.execute_command(command)
+        VomsProxy().ensure_valid(ssh_executor)
 
         # Upload config generation script - cmsDrivers
-        ssh_executor.upload_as_file(config_script, f'{request_dir}/config_generate.sh')
+        self.upload_chunks(ssh_executor, config_script, f'{batch_dir}/config_generate.sh')
         # Upload config upload to ReqMgr2 script
-        ssh_executor.upload_as_file(upload_script, f'{request_dir}/config_upload.sh')
+        self.upload_chunks(ssh_executor, upload_script, f'{batch_dir}/config_upload.sh')
         # Upload python script used by upload script
         ssh_executor.upload_file('./core_lib/utils/config_uploader.py',
-                                 f'{request_dir}/config_uploader.py')
+                                 f'{batch_dir}/config_uploader.py')
+
+    def upload_chunks(self, ssh_executor, chunks, remote_path):
+        """
+        Write chunks of a file to a local temporary file as they are made and
+        upload it, so the whole file is never kept in memory
+        """
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', delete=False) as local_file:
+            try:
+                for chunk in chunks:
+                    local_file.write(chunk)
+
+                local_file.close()
+                ssh_executor.upload_file(local_file.name, remote_path)
+            finally:
+                os.remove(local_file.name)
 
-    def check_for_submission(self, request):
+    def check_for_submission(self, request, controller):
         """
         Perform one last check of values before submitting a request
         """
@@ -105,23 +244,38 @@ class RequestSubmitter(BaseSubmitter):
         if request.get('status') != 'submitting':
             raise AssertionError(f'Cannot submit a request with status {request.get("status")}')
 
+        # Scripts and job dict are made with scram arch from the index
+        cmssw_release = request.get('cmssw_release')
+        if not ScramArchIndex().lookup(cmssw_release):
+            raise AssertionError(f'Could not find scram arch of {cmssw_release}')
+
         if not request.get('input')['dataset']:
             request_db = Database('requests')
+            old_request = Request(json_input=request.get_json(), read_only=True)
             request.set('status', 'approved')
             request_db.save(request.get_json())
+            controller.after_update(old_request, request, ['status'])
             raise AssertionError('Cannot submit a request without input dataset')
 
+    def run_script(self, ssh_executor, directory, script_name):
+        """
+        SSH to a remote machine and run a script in given directory with shared voms proxy
+        """
+        command = [f'cd {directory}',
+                   f'chmod +x {script_name}',
+                   f'export X509_USER_PROXY={VomsProxy().get_path()}',
+                   f'./{script_name}']
+        return ssh_executor.execute_command(command)
+
     def generate_configs(self, request, ssh_executor, request_dir):
         """
         SSH to a remote machine and generate cmsDriver config files
         """
         prepid = request.get_prepid()
         self.logger.debug('Will generate configs for %s', prepid)
-        command = [f'cd {request_dir}',
-                   'chmod +x config_generate.sh',
-                   'export X509_USER_PROXY=$(pwd)/proxy.txt',
-                   './config_generate.sh']
-        stdout, stderr, exit_code = ssh_executor.execute_command(command)
+        stdout, stderr, exit_code = self.run_script(ssh_executor,
+                                                    request_dir,
+                                                    'config_generate.sh')
         if exit_code != 0:
             raise RuntimeError(f'Error generating configs for {prepid}.\n{stderr}')
 
@@ -133,19 +287,43 @@ class RequestSubmitter(BaseSubmitter):
         """
         prepid = request.get_prepid()
         self.logger.debug('Will upload configs for %s', prepid)
-        command = [f'cd {request_dir}',
-                   'chmod +x config_upload.sh',
-                   'export X509_USER_PROXY=$(pwd)/proxy.txt',
-                   './config_upload.sh']
-        stdout, stderr, exit_code = ssh_executor.execute_command(command)
+        stdout, stderr, exit_code = self.run_script(ssh_executor,
+                                                    request_dir,
+                                                    'config_upload.sh')
         if exit_code != 0:
             raise RuntimeError(f'Error uploading configs for {prepid}.\n{stderr}')
 
+        return self.parse_config_hashes(stdout)
+
+    def parse_config_hashes(self, stdout):
+        """
+        Return a list of config name and hash tuples from config upload output
+        """
         stdout = [x for x in clean_split(stdout, '\n') if 'DocID' in x]
         # Get all lines that have DocID as tuples split by space
         stdout = [tuple(clean_split(x.strip(), ' ')[1:]) for x in stdout]
         return stdout
 
+    def split_config_hashes(self, requests, config_hashes):
+        """
+        Split list of config name and hash tuples to lists of each request
+        """
+        request_hashes = {}
+        for request in requests:
+            config_names = set()
+            for configs in request.get_config_file_names():
+                config_names.update(configs.values())
+
+            request_hashes[request.get_prepid()] = [h for h in config_hashes
+                                                    if h[0] in config_names]
+
+        used_hashes = [h for hashes in request_hashes.values() for h in hashes]
+        unused_hashes = [h for h in config_hashes if h not in used_hashes]
+        if unused_hashes:
+            raise RuntimeError(f'Unused hashes: {unused_hashes}')
+
+        return request_hashes
+
     def update_sequences_with_config_hashes(self, request, config_hashes):
         """
         Iterate through request sequences and set config_id and harvesting_config_id values
@@ -190,37 +368,208 @@ class RequestSubmitter(BaseSubmitter):
                 sequence_name = sequence.get_name()
                 raise ValueError(f'Missing harvesting hash for {sequence_name}')
 
-    def submit_request(self, request, controller):
+    def get_workflow_status(self, workflow_name, connection):
         """
-        Method that is used by submission workers. This is where the actual submission happens
+        Return current status of a workflow in ReqMgr2 or None if it is not available yet
+        """
+        response = connection.api('GET', f'/reqmgr2/data/request?name={workflow_name}')
+        result = json.loads(response.decode('utf-8')).get('result', [])
+        for workflows in result:
+            if workflow_name in workflows:
+                return workflows[workflow_name].get('RequestStatus')
+
+        return None
+
+    def wait_for_workflow_status(self, workflow_name, statuses, connection):
+        """
+        Poll ReqMgr2 with increasing delay until workflow reaches one of given statuses
+        """
+        delay = 0.5
+        deadline = time.time() + WORKFLOW_POLL_TIMEOUT
+        while True:
+            status = self.get_workflow_status(workflow_name, connection)
+            if status in statuses:
+                return status
+
+            if time.time() > deadline:
+                raise RuntimeError(f'{workflow_name} status is "{status}" after '
+                                   f'{WORKFLOW_POLL_TIMEOUT}s, expected {", ".join(statuses)}')
+
+            self.logger.debug('%s status is %s, waiting %.1fs', workflow_name, status, delay)
+            time.sleep(delay)
+            delay = min(delay * 2, 5)
+
+    def prepare_configs(self, request, controller):
+        """
+        First submission stage that is used by SSH workers. Generate configs on
+        a remote machine, upload them to ReqMgr2 and pass request to the next stage
         """
         prepid = request.get_prepid()
         workspace_dir = environment.REMOTE_PATH.rstrip('/')
         request_dir = f'{workspace_dir}/{prepid}'
         self.logger.debug('Will try to acquire lock for %s', prepid)
         with Locker().get_lock(prepid):
-            self.logger.info('Locked %s for submission', prepid)
+            self.logger.info('Locked %s for config generation', prepid)
             request_db = Database('requests')
             request = controller.get(prepid)
             try:
-                self.check_for_submission(request)
-                with SSHExecutor(
-                    host=environment.REMOTE_SSH_NODE,
-                    username=environment.REMOTE_SSH_USERNAME,
-                    password=environment.REMOTE_SSH_PASSWORD
-                ) as ssh:
-                    # Start executing commands
-                    self.prepare_workspace(request, controller, ssh, request_dir)
-                    # Create configs
-                    self.generate_configs(request, ssh, request_dir)
-                    # Upload configs
-                    config_hashes = self.upload_configs(request, ssh, request_dir)
-                    # Remove remote request directory
-                    ssh.execute_command([f'rm -rf {request_dir}'])
+                self.check_for_submission(request, controller)
+                config_hashes = self.get_cached_config_hashes(request)
+                cache_hit = bool(config_hashes)
+                if not cache_hit:
+                    with SSHPool().session() as ssh:
+                        # Start executing commands
+                        self.prepare_workspace(request, controller, ssh, request_dir)
+                        # Create configs
+                        start_time = time.time()
+                        self.generate_configs(request, ssh, request_dir)
+                        generate_time = time.time() - start_time
+                        # Upload configs
+                        config_hashes = self.upload_configs(request, ssh, request_dir)
+                        upload_time = time.time() - start_time - generate_time
+                        # Remove remote request directory
+                        ssh.execute_command([f'rm -rf {request_dir}'])
+
+                    request.add_history('config_timing',
+                                        f'generate {generate_time:.2f}s, '
+                                        f'upload {upload_time:.2f}s',
+                                        'automatic')
 
                 self.logger.debug(config_hashes)
                 # Iterate through uploaded configs and save their hashes in request sequences
                 self.update_sequences_with_config_hashes(request, config_hashes)
+                request_db.save(request.get_json())
+                if not cache_hit:
+                    self.store_config_hashes(request)
+            except Exception as ex:
+                self.logger.error(
+                    'Unable to prepare configs of request (%s): %s',
+                    prepid,
+                    ex,
+                    exc_info=True
+                )
+                self.__handle_error(request, controller, str(ex))
+                return
+
+        self.__reqmgr_stage.add(prepid,
+                                self.submit_request,
+                                request=request,
+                                controller=controller)
+
+    def prepare_batch_configs(self, batch, controller):
+        """
+        First submission stage for a batch of requests that have the same CMSSW
+        release. Configs of all requests are generated in one CMSSW environment and
+        uploaded by one script. If anything fails, requests are prepared one by one
+        """
+        self.__close_batch(batch)
+        cmssw_release = batch['cmssw_release']
+        if len(batch['requests']) == 1:
+            self.prepare_configs(batch['requests'][0], controller)
+            return
+
+        prepids = sorted({r.get_prepid() for r in batch['requests']})
+        self.logger.info('Preparing configs of %s requests with %s: %s',
+                         len(prepids),
+                         cmssw_release,
+                         ', '.join(prepids))
+        workspace_dir = environment.REMOTE_PATH.rstrip('/')
+        batch_dir = f'{workspace_dir}/{prepids[0]}_batch'
+        requests = []
+        cached_requests = []
+        with ExitStack() as stack:
+            # Locks are always acquired in the same (sorted) order
+            for prepid in prepids:
+                stack.enter_context(Locker().get_lock(prepid))
+
+            request_db = Database('requests')
+            for prepid in prepids:
+                request = controller.get(prepid)
+                try:
+                    self.check_for_submission(request, controller)
+                    config_hashes = self.get_cached_config_hashes(request)
+                    if config_hashes:
+                        self.update_sequences_with_config_hashes(request, config_hashes)
+                        request_db.save(request.get_json())
+                        cached_requests.append(request)
+                    else:
+                        requests.append(request)
+                except Exception as ex:
+                    self.logger.error('Unable to submit request (%s): %s', prepid, ex)
+                    self.__handle_error(request, controller, str(ex))
+
+            batch_failed = False
+            try:
+                if requests:
+                    self.upload_batch_configs(requests, controller, batch_dir)
+                    for request in requests:
+                        request_db.save(request.get_json())
+                        self.store_config_hashes(request)
+
+            except Exception as ex:
+                self.logger.error('Unable to prepare configs of %s batch, '
+                                  'preparing requests one by one: %s',
+                                  cmssw_release,
+                                  ex,
+                                  exc_info=True)
+                batch_failed = True
+
+        if batch_failed:
+            for request in requests:
+                self.prepare_configs(request, controller)
+
+            requests = []
+
+        for request in cached_requests + requests:
+            self.__reqmgr_stage.add(request.get_prepid(),
+                                    self.submit_request,
+                                    request=request,
+                                    controller=controller)
+
+    def upload_batch_configs(self, requests, controller, batch_dir):
+        """
+        Generate and upload configs of requests with the same CMSSW release in
+        one remote directory and set config hashes in sequences of each request
+        """
+        with SSHPool().session() as ssh:
+            self.prepare_batch_workspace(requests, controller, ssh, batch_dir)
+            start_time = time.time()
+            _, stderr, exit_code = self.run_script(ssh, batch_dir, 'config_generate.sh')
+            if exit_code != 0:
+                raise RuntimeError(f'Error generating configs.\n{stderr}')
+
+            generate_time = time.time() - start_time
+            stdout, stderr, exit_code = self.run_script(ssh, batch_dir, 'config_upload.sh')
+            if exit_code != 0:
+                raise RuntimeError(f'Error uploading configs.\n{stderr}')
+
+            upload_time = time.time() - start_time - generate_time
+            config_hashes = self.parse_config_hashes(stdout)
+            ssh.execute_command([f'rm -rf {batch_dir}'])
+
+        request_hashes = self.split_config_hashes(requests, config_hashes)
+        for request in requests:
+            hashes = request_hashes[request.get_prepid()]
+            self.update_sequences_with_config_hashes(request, hashes)
+            request.add_history('config_timing',
+                                f'generate {generate_time:.2f}s, '
+                                f'upload {upload_time:.2f}s, '
+                                f'batch of {len(requests)}',
+                                'automatic')
+
+    def submit_request(self, request, controller):
+        """
+        Second submission stage that is used by ReqMgr2 workers. Submit job dict
+        of a request that already has uploaded configs and approve the workflow
+        """
+        prepid = request.get_prepid()
+        self.logger.debug('Will try to acquire lock for %s', prepid)
+        with Locker().get_lock(prepid):
+            self.logger.info('Locked %s for submission', prepid)
+            request_db = Database('requests')
+            request = controller.get(prepid)
+            try:
+                self.check_for_submission(request, controller)
                 # Submit job dict to ReqMgr2
                 job_dict = controller.get_job_dict(request)
                 cmsweb_url = environment.CMSWEB_URL
@@ -229,11 +578,14 @@ class RequestSubmitter(BaseSubmitter):
                 with ConnectionWrapper(cmsweb_url, grid_cert, grid_key) as connection:
                     workflow_name = self.submit_job_dict(job_dict, connection)
                     # Update request after successful submission
+                    old_request = Request(json_input=request.get_json(), read_only=True)
                     request.set('workflows', [{'name': workflow_name}])
                     request.set('status', 'submitted')
                     request.add_history('submission', 'succeeded', 'automatic')
                     request_db.save(request.get_json())
-                    time.sleep(3)
+                    controller.after_update(old_request, request, ['status', 'workflows'])
+                    # Workflow might not be available in ReqMgr2 right after submission
+                    self.wait_for_workflow_status(workflow_name, ('new',), connection)
                     self.approve_workflow(workflow_name, connection)
 
                 if not environment.DEVELOPMENT:
@@ -246,7 +598,7 @@ class RequestSubmitter(BaseSubmitter):
                     ex, 
                     exc_info=True
                 )
-                self.__handle_error(request, str(ex))
+                self.__handle_error(request, controller, str(ex))
                 return
 
             self.__handle_success(request)
@@ -0,0 +1,204 @@
+"""
+Module that contains ScramArchIndex class
+"""
+import os
+import json
+import logging
+from threading import Event, Lock, Thread
+import environment
+from core_lib.database.database import Database
+from core_lib.utils.common_utils import get_scram_arch
+
+
+class ScramArchIndex():
+    """
+    ScramArchIndex is an index of CMSSW releases and their scram architectures
+    It is kept in memory of each process and in a file that is shared by all
+    processes, so the index is available right after restart
+    Index is filled in the background with releases of all subcampaigns and
+    requests, so rendering of requests does not wait for the lookup
+    Submission looks up missing releases right away, because it needs them
+    """
+
+    # Seconds between background refreshes
+    refresh_interval = 6 * 3600
+    __lock = Lock()
+    __index = {}
+    __loaded = False
+    __stats = {'hits': 0, 'misses': 0, 'refreshes': 0, 'errors': 0}
+    __refresher = None
+    __refresh_now = Event()
+
+    def __init__(self):
+        self.logger = logging.getLogger()
+        self.file_path = os.path.join(environment.CACHE_FOLDER, 'scram_arch.json')
+
+    def read_file(self):
+        """
+        Return index from the shared file or empty dictionary if file does not exist
+        """
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as index_file:
+                return json.load(index_file)
+        except (OSError, ValueError):
+            return {}
+
+    def write_file(self, index):
+        """
+        Write index to the shared file atomically
+        """
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+        tmp_file_path = f'{self.file_path}.{os.getpid()}.tmp'
+        with open(tmp_file_path, 'w', encoding='utf-8') as index_file:
+            json.dump(index, index_file, indent=2, sort_keys=True)
+
+        os.replace(tmp_file_path, self.file_path)
+
+    def get_index(self):
+        """
+        Return in-memory index, load it from the shared file if it is not loaded yet
+        """
+        with ScramArchIndex.__lock:
+            if not ScramArchIndex.__loaded:
+                ScramArchIndex.__index = self.read_file()
+                ScramArchIndex.__loaded = True
+                self.logger.info('Loaded %s scram archs from %s',
+                                 len(ScramArchIndex.__index),
+                                 self.file_path)
+
+            return ScramArchIndex.__index
+
+    def update(self, scram_archs):
+        """
+        Add releases and their scram archs to the index and the shared file
+        """
+        self.get_index()
+        with ScramArchIndex.__lock:
+            index = self.read_file()
+            index.update(ScramArchIndex.__index)
+            index.update(scram_archs)
+            ScramArchIndex.__index = index
+            self.write_file(index)
+
+    def get(self, cmssw_release, default=None):
+        """
+        Return scram arch of a CMSSW release without waiting for a lookup
+        Default is returned for releases that are not in the index yet and
+        background thread is made to look them up
+        """
+        if not cmssw_release:
+            return default
+
+        scram_arch = self.get_index().get(cmssw_release)
+        with ScramArchIndex.__lock:
+            ScramArchIndex.__stats['hits' if scram_arch else 'misses'] += 1
+
+        if scram_arch:
+            return scram_arch
+
+        self.logger.info('%s is not in scram arch index', cmssw_release)
+        self.refresh_soon()
+        return default
+
+    def lookup(self, cmssw_release):
+        """
+        Return scram arch of a CMSSW release, release that is not in the index
+        yet is looked up right away and added to the index
+        """
+        if not cmssw_release:
+            return None
+
+        scram_arch = self.get_index().get(cmssw_release)
+        if scram_arch:
+            return scram_arch
+
+        scram_arch = get_scram_arch(cmssw_release)
+        if scram_arch:
+            self.update({cmssw_release: scram_arch})
+
+        return scram_arch
+
+    def get_used_releases(self):
+        """
+        Return set of CMSSW releases of all subcampaigns and requests
+        """
+        releases = set(Database('subcampaigns').collection.distinct('cmssw_release'))
+        releases.update(Database('requests').collection.distinct('cmssw_release'))
+        return {r for r in releases if r}
+
+    def refresh(self):
+        """
+        Reload the shared file and look up all used releases that are not in the index
+        Return number of added releases
+        """
+        with ScramArchIndex.__lock:
+            ScramArchIndex.__loaded = False
+
+        index = self.get_index()
+        scram_archs = {}
+        for cmssw_release in sorted(self.get_used_releases() - set(index)):
+            try:
+                scram_arch = get_scram_arch(cmssw_release)
+            except Exception as ex:
+                self.logger.error('Error getting %s scram arch: %s', cmssw_release, ex)
+                continue
+
+            if scram_arch:
+                scram_archs[cmssw_release] = scram_arch
+            else:
+                self.logger.warning('Could not find %s scram arch', cmssw_release)
+
+        if scram_archs:
+            self.update(scram_archs)
+
+        self.logger.info('Refreshed scram arch index, added %s releases', len(scram_archs))
+        return len(scram_archs)
+
+    def refresh_soon(self):
+        """
+        Make background thread refresh the index without waiting for next interval
+        """
+        ScramArchIndex.__refresh_now.set()
+
+    def start_refresher(self):
+        """
+        Start a background thread that warms up and periodically refreshes the index
+        """
+        with ScramArchIndex.__lock:
+            if ScramArchIndex.__refresher:
+                return
+
+            ScramArchIndex.__refresher = Thread(target=self.__refresh_loop, daemon=True)
+            ScramArchIndex.__refresher.start()
+
+        self.logger.info('Started scram arch index refresher')
+
+    def __refresh_loop(self):
+        """
+        Background thread that refreshes the index
+        """
+        while True:
+            try:
+                self.refresh()
+                with ScramArchIndex.__lock:
+                    ScramArchIndex.__stats['refreshes'] += 1
+            except Exception as ex:
+                self.logger.error('Error refreshing scram arch index: %s', ex)
+                with ScramArchIndex.__lock:
+                    ScramArchIndex.__stats['errors'] += 1
+
+            ScramArchIndex.__refresh_now.wait(self.refresh_interval)
+            ScramArchIndex.__refresh_now.clear()
+
+    def get_status(self):
+        """
+        Return index size and hit and miss counts
+        """
+        index = self.get_index()
+        with ScramArchIndex.__lock:
+            status = dict(ScramArchIndex.__stats)
+            status['releases'] = len(index)
+
+        total = status['hits'] + status['misses']
+        status['hit_ratio'] = round(status['hits'] / total, 3) if total else 0.0
+        return status
@@ -0,0 +1,256 @@
+"""
+Module that contains SearchIndex class
+"""
+import re
+import logging
+from threading import Lock
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from core_lib.database.database import Database
+
+
+class SearchIndex():
+    """
+    SearchIndex is an index of searchable values of subcampaigns, tickets and
+    requests that is kept in the database
+    Each distinct value has a document with lowercase trigrams of the value and
+    a number of objects that have it, so wild search is done with one query that
+    uses an index of trigrams instead of many regex queries that scan collections
+    Values of each object are kept separately, so the index is updated incrementally
+    """
+
+    # Database and attribute pairs in the order of their rank in results
+    attributes = [('requests', 'prepid'),
+                  ('tickets', 'prepid'),
+                  ('subcampaigns', 'prepid'),
+                  ('tickets', 'subcampaign'),
+                  ('tickets', 'processing_string'),
+                  ('tickets', 'input'),
+                  ('requests', 'subcampaign'),
+                  ('requests', 'processing_string'),
+                  ('requests', 'input_dataset'),
+                  ('requests', 'output_dataset'),
+                  ('requests', 'workflow')]
+    # Maximum number of matching values that are ranked
+    max_candidates = 500
+    # Number of times values of an object that was changed concurrently are updated
+    max_attempts = 5
+    __lock = Lock()
+    __indexes_created = False
+
+    def __init__(self):
+        self.logger = logging.getLogger()
+        self.values = Database('search_index').collection
+        self.objects = Database('search_index_objects').collection
+        self.create_indexes()
+
+    def create_indexes(self):
+        """
+        Create indexes of search index collection once per process
+        """
+        with SearchIndex.__lock:
+            if SearchIndex.__indexes_created:
+                return
+
+            self.values.create_index('grams')
+            self.values.create_index('value_lower')
+            self.values.create_index('count')
+            SearchIndex.__indexes_created = True
+
+    @staticmethod
+    def get_grams(value):
+        """
+        Return set of lowercase trigrams of a string
+        """
+        value = value.lower()
+        return {value[i:i + 3] for i in range(len(value) - 2)}
+
+    @staticmethod
+    def get_values(db_name, item):
+        """
+        Return set of database, attribute and value tuples of an object
+        """
+        values = {(db_name, 'prepid', item.get('prepid'))}
+        if db_name == 'tickets':
+            for step in item.get('steps', []):
+                values.add((db_name, 'subcampaign', step.get('subcampaign')))
+                values.add((db_name, 'processing_string', step.get('processing_string')))
+
+            for input_item in item.get('input', []):
+                values.add((db_name, 'input', input_item))
+
+        elif db_name == 'requests':
+            values.add((db_name, 'subcampaign', item.get('subcampaign')))
+            values.add((db_name, 'processing_string', item.get('processing_string')))
+            values.add((db_name, 'input_dataset', item.get('input', {}).get('dataset')))
+            for dataset in item.get('output_datasets', []):
+                values.add((db_name, 'output_dataset', dataset))
+
+            for workflow in item.get('workflows', []):
+                values.add((db_name, 'workflow', workflow.get('name')))
+
+        return {v for v in values if v[2]}
+
+    def make_value_update(self, value_tuple, increment):
+        """
+        Return an update of object count of a value document
+        """
+        db_name, attribute, value = value_tuple
+        return UpdateOne({'_id': f'{db_name}:{attribute}:{value}'},
+                         {'$inc': {'count': increment},
+                          '$setOnInsert': {'database': db_name,
+                                           'attribute': attribute,
+                                           'value': value,
+                                           'value_lower': value.lower(),
+                                           'grams': sorted(self.get_grams(value))}},
+                         upsert=True)
+
+    def update(self, db_name, item):
+        """
+        Update index with current values of an object
+        """
+        self.update_many(db_name, [item])
+
+    def update_many(self, db_name, items):
+        """
+        Update index with current values of multiple objects of the same database
+        Values of an object are replaced only if they were not changed since they
+        were read, so concurrent updates of the same object do not count its
+        values twice, such objects are read and updated again
+        """
+        object_ids = [f'{db_name}:{item["prepid"]}' for item in items]
+        old_objects = self.objects.find({'_id': {'$in': object_ids}})
+        stored_values = {o['_id']: o['values'] for o in old_objects}
+        value_updates = []
+        for object_id, item in zip(object_ids, items):
+            new_values = self.get_values(db_name, item)
+            for _ in range(self.max_attempts):
+                stored = stored_values.get(object_id)
+                previous_values = {tuple(v) for v in stored or []}
+                if new_values == previous_values:
+                    break
+
+                if self.replace_values(object_id, stored, new_values):
+                    value_updates.extend(self.make_value_update(v, -1)
+                                         for v in previous_values - new_values)
+                    value_updates.extend(self.make_value_update(v, 1)
+                                         for v in new_values - previous_values)
+                    break
+
+                stored_object = self.objects.find_one({'_id': object_id})
+                stored_values[object_id] = stored_object['values'] if stored_object else None
+            else:
+                self.logger.warning('Could not update search index of %s', object_id)
+
+        self.write(value_updates, [])
+
+    def replace_values(self, object_id, stored, new_values):
+        """
+        Replace stored values of an object with new values
+        Return whether stored values were still the same
+        """
+        new_values = [list(v) for v in sorted(new_values)]
+        if stored is None:
+            try:
+                self.objects.insert_one({'_id': object_id, 'values': new_values})
+            except DuplicateKeyError:
+                return False
+
+            return True
+
+        result = self.objects.update_one({'_id': object_id, 'values': stored},
+                                         {'$set': {'values': new_values}})
+        return result.matched_count > 0
+
+    def remove(self, db_name, prepid):
+        """
+        Remove values of an object from the index
+        """
+        old_object = self.objects.find_one_and_delete({'_id': f'{db_name}:{prepid}'})
+        if not old_object:
+            return
+
+        value_updates = [self.make_value_update(tuple(v), -1) for v in old_object['values']]
+        self.write(value_updates, [])
+
+    def write(self, value_updates, object_updates):
+        """
+        Apply updates of values and objects and remove values without objects
+        """
+        if value_updates:
+            self.values.bulk_write(value_updates, ordered=False)
+            self.values.delete_many({'count': {'$lte': 0}})
+
+        if object_updates:
+            self.objects.bulk_write(object_updates, ordered=False)
+
+    def search(self, query, limit=20):
+        """
+        Return ranked list of values that match a query, where * matches anything
+        """
+        query = query.strip().lower()
+        parts = [p for p in query.split('*') if p]
+        grams = set()
+        for part in parts:
+            grams.update(self.get_grams(part))
+
+        pattern = '.*'.join(re.escape(p) for p in parts)
+        db_query = {'value_lower': {'$regex': pattern}}
+        if grams:
+            db_query['grams'] = {'$all': sorted(grams)}
+
+        # Matches are not sorted before they are limited, so exact matches and
+        # matches that start with the query are looked up separately to not be
+        # cut off by other matches
+        projection = {'database': 1, 'attribute': 1, 'value': 1}
+        candidates = list(self.values.find({'value_lower': query}, projection))
+        if parts and not query.startswith('*'):
+            prefix_query = dict(db_query, value_lower={'$regex': f'^{pattern}'})
+            prefixed = self.values.find(prefix_query, projection).limit(self.max_candidates)
+            candidates.extend(prefixed)
+
+        candidates.extend(self.values.find(db_query, projection).limit(self.max_candidates))
+        candidates = list({c['_id']: c for c in candidates}.values())
+        ranks = {a: i for i, a in enumerate(self.attributes)}
+
+        def rank(candidate):
+            value = candidate['value'].lower()
+            return (value != query,
+                    not value.startswith(parts[0] if parts else ''),
+                    ranks.get((candidate['database'], candidate['attribute']), len(ranks)),
+                    len(value),
+                    value)
+
+        candidates = sorted(candidates, key=rank)[:limit]
+        return [{'value': c['value'],
+                 'attribute': c['attribute'],
+                 'database': c['database']} for c in candidates]
+
+    def rebuild(self):
+        """
+        Rebuild the whole index from subcampaigns, tickets and requests
+        Return number of values in the index
+        """
+        self.values.delete_many({})
+        self.objects.delete_many({})
+        counts = {}
+        object_updates = []
+        for db_name in ('subcampaigns', 'tickets', 'requests'):
+            projection = {'prepid': 1, 'steps': 1, 'input': 1, 'subcampaign': 1,
+                          'processing_string': 1, 'output_datasets': 1, 'workflows.name': 1}
+            items = Database(db_name).collection.find({'deleted': {'$ne': True}}, projection)
+            for item in items:
+                values = self.get_values(db_name, item)
+                for value in values:
+                    counts[value] = counts.get(value, 0) + 1
+
+                object_updates.append(UpdateOne({'_id': f'{db_name}:{item["prepid"]}'},
+                                                {'$set': {'values': sorted(values)}},
+                                                upsert=True))
+
+        value_updates = [self.make_value_update(v, c) for v, c in counts.items()]
+        self.write(value_updates, object_updates)
+        self.logger.info('Rebuilt search index with %s values of %s objects',
+                         len(counts),
+                         len(object_updates))
+        return len(counts)
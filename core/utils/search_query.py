@@ -0,0 +1,220 @@
+"""
+Module that contains SearchQuery class
+"""
+import re
+import json
+import time
+import base64
+from core_lib.database.database import Database
+from core.utils.search_renames import SEARCH_RENAMES
+from core.utils.index_manager import IndexManager
+
+
+class SearchQuery():
+    """
+    SearchQuery runs searches with the same attribute=value syntax, renames, types
+    and case insensitive wildcards as database queries, but returns only requested
+    fields and pages through results with a cursor that has the sort value and id
+    of the last returned object, so deep pages are as fast as the first one
+    """
+
+    # Maximum number of objects that are counted if count is estimated
+    max_estimated_count = 10000
+    # Condition that excludes deleted objects from all searches
+    not_deleted = {'deleted': {'$ne': True}}
+    types = {'int': int, 'float': float, 'bool': bool}
+
+    def __init__(self, db_name, model_class):
+        self.db_name = db_name
+        self.collection = Database(db_name).collection
+        self.renames = SEARCH_RENAMES.get(db_name, {})
+        self.schema = model_class.schema()
+
+    def get_path(self, attribute):
+        """
+        Return database path and value type of a search attribute
+        Type is taken from <type> suffix of a search rename or from the schema
+        """
+        path = self.renames.get(attribute, attribute)
+        match = re.fullmatch(r'(.+)<(int|float|bool)>', path)
+        if match:
+            return match.group(1), self.types[match.group(2)]
+
+        default_value = self.schema.get(path)
+        if isinstance(default_value, (bool, int, float)):
+            return path, type(default_value)
+
+        return path, str
+
+    @staticmethod
+    def cast_value(value, value_type):
+        """
+        Return a value cast to given type or a case insensitive regex where * matches anything
+        """
+        if value_type is bool:
+            return value.lower() == 'true'
+
+        if value_type in (int, float):
+            try:
+                return value_type(value)
+            except ValueError as ex:
+                raise ValueError(f'"{value}" is not a valid {value_type.__name__}') from ex
+
+        pattern = '.*'.join(re.escape(part) for part in value.split('*'))
+        return re.compile(f'^{pattern}$', re.IGNORECASE)
+
+    def build_condition(self, attribute, value):
+        """
+        Build a database condition of an attribute, comma separated values are alternatives
+        Return None if there are no values
+        """
+        path, value_type = self.get_path(attribute)
+        values = [self.cast_value(v.strip(), value_type) for v in value.split(',') if v.strip()]
+        if not values:
+            return None
+
+        if len(values) == 1:
+            return {path: values[0]}
+
+        return {path: {'$in': values}}
+
+    def build_filter(self, args, prepids=None):
+        """
+        Build a database filter from a dictionary of attributes and values,
+        deleted objects never match
+        If list of prepids is given, objects with these exact prepids also match
+        the prepid attribute
+        """
+        conditions = []
+        for attribute, value in args.items():
+            condition = self.build_condition(attribute, value)
+            if attribute == 'prepid' and prepids is not None:
+                in_prepids = {'prepid': {'$in': prepids}}
+                condition = {'$or': [condition, in_prepids]} if condition else in_prepids
+
+            if condition:
+                conditions.append(condition)
+
+        if prepids is not None and 'prepid' not in args:
+            conditions.append({'prepid': {'$in': prepids}})
+
+        conditions.append(self.not_deleted)
+        return {'$and': conditions}
+
+    @staticmethod
+    def get_value(item, path):
+        """
+        Return value at a dot separated path in an object
+        """
+        for key in path.split('.'):
+            if isinstance(item, list):
+                item = item[int(key)] if key.isdigit() and int(key) < len(item) else None
+            elif isinstance(item, dict):
+                item = item.get(key)
+            else:
+                return None
+
+        return item
+
+    @staticmethod
+    def encode_cursor(values):
+        """
+        Return an opaque cursor of given values
+        """
+        return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('utf-8')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Return values of a cursor
+        """
+        try:
+            return json.loads(base64.urlsafe_b64decode(cursor.encode('utf-8')))
+        except ValueError as ex:
+            raise ValueError(f'Invalid cursor "{cursor}"') from ex
+
+    def get_projection(self, fields, sort_path):
+        """
+        Return a projection of requested fields and the sort attribute
+        """
+        projection = {'_id': 1}
+        for field in fields:
+            projection[self.get_path(field)[0]] = 1
+
+        # Array items cannot be projected by index, so the whole array is projected
+        sort_field = sort_path.split('.')
+        numeric = [i for i, key in enumerate(sort_field) if key.isdigit()]
+        if numeric:
+            sort_field = sort_field[:numeric[0]]
+
+        projection['.'.join(sort_field)] = 1
+        # Parent and child paths cannot be projected together
+        for path in sorted(projection, key=len):
+            if any(path.startswith(f'{p}.') for p in projection if p != path):
+                projection.pop(path, None)
+
+        return projection
+
+    def get_page_query(self, query, sort_path, sort_asc, cursor):
+        """
+        Return a query of objects after the cursor
+        """
+        last_value, last_id = self.decode_cursor(cursor)
+        operator = '$gt' if sort_asc else '$lt'
+        if sort_path == '_id':
+            after = {'_id': {operator: last_id}}
+        else:
+            after = {'$or': [{sort_path: {operator: last_value}},
+                             {sort_path: last_value, '_id': {operator: last_id}}]}
+
+        return {'$and': [query, after]}
+
+    def count(self, query, count):
+        """
+        Return number of objects that match a query and whether it is exact
+        Count is either "exact", "estimated" or "none"
+        """
+        if count == 'exact':
+            return self.collection.count_documents(query), True
+
+        if count == 'estimated':
+            total_rows = self.collection.count_documents(query, limit=self.max_estimated_count)
+            return total_rows, total_rows < self.max_estimated_count
+
+        return None, False
+
+    def search(self, args, *, sort_attr=None, sort_asc=True, limit=20, cursor=None,
+               fields=None, count='estimated', page=0, prepids=None):
+        """
+        Return a dictionary with results, number of matching objects, whether
+        number is exact and cursor of the next page
+        Count is either "exact", "estimated" or "none"
+        Page is used only if there is no cursor
+        """
+        query = self.build_filter(args, prepids)
+        sort_path = self.get_path(sort_attr)[0] if sort_attr else '_id'
+        direction = 1 if sort_asc else -1
+        page_query = self.get_page_query(query, sort_path, sort_asc, cursor) if cursor else query
+        sort = [(sort_path, direction)]
+        if sort_path != '_id':
+            sort.append(('_id', direction))
+
+        start_time = time.time()
+        projection = self.get_projection(fields, sort_path) if fields else None
+        results = self.collection.find(page_query, projection).sort(sort)
+        if page and not cursor:
+            results = results.skip(page * limit)
+
+        results = list(results.limit(limit + 1))
+        IndexManager().sample_query(self.db_name, page_query, sort, time.time() - start_time)
+        next_cursor = None
+        if len(results) > limit:
+            results = results[:limit]
+            next_cursor = self.encode_cursor([self.get_value(results[-1], sort_path),
+                                              results[-1]['_id']])
+
+        total_rows, exact = self.count(query, count)
+        return {'results': results,
+                'total_rows': total_rows,
+                'total_rows_exact': exact,
+                'next_cursor': next_cursor}
@@ -0,0 +1,24 @@
+"""
+Module that contains search attribute renames of all collections
+"""
+
+
+# Search attribute names and their paths in the database, <int> means that
+# values are cast to integers
+SEARCH_RENAMES = {
+    'requests': {'runs': 'runs<int>',
+                 'run': 'runs<int>',
+                 'workflows': 'workflows.name',
+                 'workflow': 'workflows.name',
+                 'output_dataset': 'output_datasets',
+                 'input_dataset': 'input.dataset',
+                 'input_request': 'input.request',
+                 'created_on': 'history.0.time',
+                 'created_by': 'history.0.user'},
+    'subcampaigns': {'created_on': 'history.0.time',
+                     'created_by': 'history.0.user'},
+    'tickets': {'created_on': 'history.0.time',
+                'created_by': 'history.0.user',
+                'subcampaign': 'steps.subcampaign',
+                'processing_string': 'steps.processing_string'},
+}
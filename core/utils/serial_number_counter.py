@@ -0,0 +1,66 @@
+"""
+Module that contains SerialNumberCounter class
+"""
+import re
+import logging
+from pymongo import ReturnDocument
+from core_lib.database.database import Database
+
+
+class SerialNumberCounter():
+    """
+    SerialNumberCounter hands out serial numbers of prepids using atomic
+    increments of counters in the database, so numbers are unique across threads
+    and processes. Counter of a prefix that does not exist yet is initialized
+    with the highest serial number of existing objects
+    Reserved numbers are not given back, so prepids might have gaps
+    """
+
+    def __init__(self, database_name):
+        self.logger = logging.getLogger()
+        self.database_name = database_name
+        self.counters = Database('counters').collection
+
+    def get_counter_id(self, prefix):
+        """
+        Return id of a counter document for given prepid prefix
+        """
+        return f'{self.database_name}:{prefix}'
+
+    def get_highest_serial_number(self, prefix):
+        """
+        Return highest serial number of existing objects with given prepid prefix
+        """
+        collection = Database(self.database_name).collection
+        pattern = re.compile(f'^{re.escape(prefix)}-([0-9]+)$')
+        highest = 0
+        for item in collection.find({'_id': {'$regex': pattern.pattern}}, {'_id': 1}):
+            highest = max(highest, int(pattern.match(item['_id']).group(1)))
+
+        return highest
+
+    def backfill(self, prefix, serial_number):
+        """
+        Make sure that counter of a prefix is at least given serial number
+        """
+        self.counters.update_one({'_id': self.get_counter_id(prefix)},
+                                 {'$max': {'value': serial_number},
+                                  '$setOnInsert': {'database': self.database_name,
+                                                   'prefix': prefix}},
+                                 upsert=True)
+
+    def reserve(self, prefix, count=1):
+        """
+        Reserve given number of consecutive serial numbers for a prepid prefix
+        Return the first reserved serial number
+        """
+        counter_id = self.get_counter_id(prefix)
+        if not self.counters.find_one({'_id': counter_id}, {'_id': 1}):
+            highest = self.get_highest_serial_number(prefix)
+            self.logger.info('Initializing %s counter with %s', counter_id, highest)
+            self.backfill(prefix, highest)
+
+        counter = self.counters.find_one_and_update({'_id': counter_id},
+                                                    {'$inc': {'value': count}},
+                                                    return_document=ReturnDocument.AFTER)
+        return counter['value'] - count + 1
@@ -0,0 +1,116 @@
+"""
+Module that contains SSHPool class
+"""
+import time
+import logging
+from threading import Lock
+from contextlib import contextmanager
+import environment
+from core_lib.utils.ssh_executor import SSHExecutor
+
+
+class SSHPool():
+    """
+    SSHPool keeps SSH sessions to the submission machine open between submissions
+    Sessions are checked before they are reused and discarded after errors or
+    if they were not used for a long time
+    """
+
+    # Maximum number of idle sessions kept open
+    max_idle_sessions = 10
+    # Seconds after which idle session is closed
+    max_idle_time = 600
+    __lock = Lock()
+    __idle_sessions = []
+    __stats = {'hits': 0, 'misses': 0, 'discarded': 0}
+
+    def __init__(self):
+        self.logger = logging.getLogger()
+
+    @contextmanager
+    def session(self):
+        """
+        Context manager that yields an SSH session from the pool or a new one
+        Session is returned to the pool unless an exception was raised
+        """
+        ssh_executor = self.__acquire()
+        try:
+            yield ssh_executor
+        except Exception:
+            self.__discard(ssh_executor)
+            raise
+
+        self.__release(ssh_executor)
+
+    def __acquire(self):
+        """
+        Take an idle session that is still alive or create a new one
+        """
+        while True:
+            with SSHPool.__lock:
+                if not SSHPool.__idle_sessions:
+                    SSHPool.__stats['misses'] += 1
+                    break
+
+                ssh_executor, last_used = SSHPool.__idle_sessions.pop()
+
+            if time.time() - last_used > SSHPool.max_idle_time:
+                self.__discard(ssh_executor)
+                continue
+
+            try:
+                _, _, exit_code = ssh_executor.execute_command(['true'])
+            except Exception as ex:
+                self.logger.debug('Pooled SSH session is broken: %s', ex)
+                exit_code = -1
+
+            if exit_code != 0:
+                self.__discard(ssh_executor)
+                continue
+
+            with SSHPool.__lock:
+                SSHPool.__stats['hits'] += 1
+
+            return ssh_executor
+
+        self.logger.debug('Opening a new SSH session to %s', environment.REMOTE_SSH_NODE)
+        return SSHExecutor(host=environment.REMOTE_SSH_NODE,
+                           username=environment.REMOTE_SSH_USERNAME,
+                           password=environment.REMOTE_SSH_PASSWORD)
+
+    def __release(self, ssh_executor):
+        """
+        Return session to the pool or close it if pool is full
+        """
+        with SSHPool.__lock:
+            if len(SSHPool.__idle_sessions) < SSHPool.max_idle_sessions:
+                SSHPool.__idle_sessions.append((ssh_executor, time.time()))
+                return
+
+        self.__discard(ssh_executor)
+
+    def __discard(self, ssh_executor):
+        """
+        Close session and do not reuse it
+        """
+        with SSHPool.__lock:
+            SSHPool.__stats['discarded'] += 1
+
+        try:
+            ssh_executor.close_connections()
+        except Exception as ex:
+            self.logger.debug('Error closing SSH session: %s', ex)
+
+    def get_status(self):
+        """
+        Return number of idle sessions and pool hit rate
+        """
+        with SSHPool.__lock:
+            hits = SSHPool.__stats['hits']
+            misses = SSHPool.__stats['misses']
+            total = hits + misses
+            return {'idle': len(SSHPool.__idle_sessions),
+                    'hits': hits,
+                    'misses': misses,
+                    'discarded': SSHPool.__stats['discarded'],
+                    'hit_rate': round(hits / total, 3) if total else 0.0}
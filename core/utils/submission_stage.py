@@ -0,0 +1,131 @@
+"""
+Module that contains SubmissionStage class
+"""
+import time
+import logging
+from queue import Queue
+from threading import Lock, Thread
+
+
+class SubmissionStage():
+    """
+    SubmissionStage is a pool of worker threads that run tasks of one submission stage
+    Tasks are run in order they were added
+    Stage keeps track of queue depth, time tasks spend in queue and time they run
+    """
+
+    def __init__(self, name, workers_count):
+        self.name = name
+        self.workers_count = workers_count
+        self.logger = logging.getLogger()
+        self.queue = Queue()
+        self.lock = Lock()
+        self.names_in_queue = []
+        self.workers = {}
+        self.stats = {'completed': 0,
+                      'failed': 0,
+                      'wait_time': 0.0,
+                      'run_time': 0.0,
+                      'max_run_time': 0.0,
+                      'last_run_time': 0.0}
+
+    def start_workers(self):
+        """
+        Start worker threads if they are not running yet
+        """
+        with self.lock:
+            if self.workers:
+                return
+
+            for index in range(self.workers_count):
+                worker_name = f'{self.name}-{index + 1}'
+                self.workers[worker_name] = {'job_name': None, 'job_start': None}
+                Thread(target=self.__worker, args=(worker_name,), daemon=True).start()
+
+        self.logger.info('Started %s %s stage workers', self.workers_count, self.name)
+
+    def add(self, name, function, **kwargs):
+        """
+        Add a task to the stage queue
+        """
+        self.start_workers()
+        with self.lock:
+            self.names_in_queue.append(name)
+
+        self.queue.put((name, function, kwargs, time.time()))
+        self.logger.info('Added %s to %s stage queue, queue size %s',
+                         name,
+                         self.name,
+                         self.queue.qsize())
+
+    def __worker(self, worker_name):
+        """
+        Worker thread that takes tasks from queue and runs them
+        """
+        while True:
+            name, function, kwargs, added_time = self.queue.get()
+            start_time = time.time()
+            with self.lock:
+                self.names_in_queue.remove(name)
+                self.workers[worker_name] = {'job_name': name, 'job_start': start_time}
+
+            failed = False
+            try:
+                function(**kwargs)
+            except Exception as ex:
+                failed = True
+                self.logger.error('Error in %s stage task %s: %s',
+                                  self.name,
+                                  name,
+                                  ex,
+                                  exc_info=True)
+
+            end_time = time.time()
+            run_time = end_time - start_time
+            with self.lock:
+                self.workers[worker_name] = {'job_name': None, 'job_start': None}
+                self.stats['completed'] += 1
+                self.stats['failed'] += int(failed)
+                self.stats['wait_time'] += start_time - added_time
+                self.stats['run_time'] += run_time
+                self.stats['max_run_time'] = max(self.stats['max_run_time'], run_time)
+                self.stats['last_run_time'] = run_time
+
+            self.queue.task_done()
+            self.logger.debug('%s finished %s in %.2fs', worker_name, name, run_time)
+
+    def get_names_in_queue(self):
+        """
+        Return a list of task names that are waiting in the queue
+        """
+        with self.lock:
+            return list(self.names_in_queue)
+
+    def get_worker_status(self):
+        """
+        Return a dictionary of worker names and what they are working on
+        """
+        now = time.time()
+        with self.lock:
+            return {name: {'job_name': info['job_name'],
+                           'job_time': int(now - info['job_start']) if info['job_start'] else 0}
+                    for name, info in self.workers.items()}
+
+    def get_status(self):
+        """
+        Return queue depth, number of busy workers and latency of the stage
+        """
+        with self.lock:
+            completed = self.stats['completed']
+            busy = len([w for w in self.workers.values() if w['job_name']])
+            average_wait = self.stats['wait_time'] / completed if completed else 0
+            average_run = self.stats['run_time'] / completed if completed else 0
+            return {'queue': len(self.names_in_queue),
+                    'workers': self.workers_count,
+                    'busy': busy,
+                    'completed': completed,
+                    'failed': self.stats['failed'],
+                    'average_wait_time': round(average_wait, 3),
+                    'average_run_time': round(average_run, 3),
+                    'max_run_time': round(self.stats['max_run_time'], 3),
+                    'last_run_time': round(self.stats['last_run_time'], 3)}
@@ -0,0 +1,85 @@
+"""
+Module that contains TicketRequestsCache class
+"""
+import time
+from threading import Lock
+from core_lib.database.database import Database
+from core.model.ticket import Ticket
+from core.utils.search_query import SearchQuery
+
+
+class TicketRequestsCache():
+    """
+    TicketRequestsCache keeps prepids of requests created by tickets that match
+    a ticket query for a short time, so paging and sorting a table of requests
+    of a big ticket does not look up tickets again every time
+    Cache is cleared when requests of any ticket change. Changes increment a
+    generation in the database, so caches of all processes are cleared
+    """
+
+    # Seconds for which prepids of a ticket query are kept
+    ttl = 30
+    # Maximum number of ticket queries in memory
+    max_size = 200
+    # Maximum number of tickets that are looked up for one query
+    max_tickets = 100
+    # Id of a document in caches collection that has the generation
+    generation_id = 'ticket_requests'
+    __lock = Lock()
+    __requests = {}
+
+    def __init__(self):
+        self.caches = Database('caches').collection
+
+    def get_generation(self):
+        """
+        Return generation of requests of tickets, it changes with every invalidation
+        """
+        item = self.caches.find_one({'_id': self.generation_id}, {'generation': 1})
+        return item.get('generation', 0) if item else 0
+
+    def get(self, ticket_query):
+        """
+        Return sorted list of prepids of requests created by tickets that match
+        a query, where * matches anything and comma separated values are alternatives
+        """
+        key = ticket_query.strip().lower()
+        now = time.time()
+        generation = self.get_generation()
+        with TicketRequestsCache.__lock:
+            cached = TicketRequestsCache.__requests.get(key, (0, None, None))
+            cached_time, cached_generation, prepids = cached
+            if (prepids is not None
+                    and cached_generation == generation
+                    and now - cached_time < self.ttl):
+                return prepids
+
+        # Case insensitive prepid query where * matches anything
+        search_query = SearchQuery('tickets', Ticket)
+        query = search_query.build_filter({'prepid': ticket_query})
+        tickets = search_query.collection.find(query, {'created_requests': 1})
+        prepids = set()
+        for ticket in tickets.limit(self.max_tickets):
+            prepids.update(ticket.get('created_requests', []))
+
+        prepids = sorted(prepids)
+        with TicketRequestsCache.__lock:
+            if len(TicketRequestsCache.__requests) >= self.max_size:
+                expired = [k for k, (t, g, _) in TicketRequestsCache.__requests.items()
+                           if now - t >= self.ttl or g != generation]
+                for expired_key in expired or list(TicketRequestsCache.__requests):
+                    TicketRequestsCache.__requests.pop(expired_key)
+
+            TicketRequestsCache.__requests[key] = (now, generation, prepids)
+
+        return prepids
+
+    def invalidate(self):
+        """
+        Remove all ticket queries from caches of all processes
+        """
+        self.caches.update_one({'_id': self.generation_id},
+                               {'$inc': {'generation': 1}},
+                               upsert=True)
+        with TicketRequestsCache.__lock:
+            TicketRequestsCache.__requests.clear()
@@ -0,0 +1,96 @@
+"""
+Module that contains VomsProxy class
+"""
+import time
+import logging
+from threading import Lock
+import environment
+
+
+class VomsProxy():
+    """
+    VomsProxy manages a voms proxy file on the submission machine that is shared
+    by all submissions. Proxy is created again only when it is close to expiry
+    """
+
+    # Requested proxy validity
+    validity = '12:00'
+    # Seconds of validity that must be left for proxy to be reused
+    min_time_left = 7200
+    __lock = Lock()
+    __valid_until = 0
+    __stats = {'reused': 0, 'refreshed': 0}
+
+    def __init__(self):
+        self.logger = logging.getLogger()
+
+    def get_path(self):
+        """
+        Return path of the shared proxy file on the submission machine
+        """
+        workspace_dir = environment.REMOTE_PATH.rstrip('/')
+        return f'{workspace_dir}/proxy.txt'
+
+    def get_refresh_command(self):
+        """
+        Return command that creates a new proxy in a uniquely named temporary
+        file next to the shared one and atomically renames it over the shared
+        file, so submissions that are reading the old proxy never see a partial
+        file and concurrent refreshes do not write to the same file
+        """
+        proxy_path = self.get_path()
+        return (f'mkdir -p $(dirname {proxy_path}) && '
+                f'new_proxy=$(mktemp {proxy_path}.XXXXXX) && '
+                f'{{ voms-proxy-init -voms cms --valid {VomsProxy.validity} --out $new_proxy && '
+                f'mv -f $new_proxy {proxy_path} || {{ rm -f $new_proxy; false; }}; }}')
+
+    def get_time_left(self, ssh_executor):
+        """
+        Return number of seconds that remote proxy file is still valid
+        """
+        proxy_path = self.get_path()
+        stdout, _, _ = ssh_executor.execute_command(
+            [f'voms-proxy-info -file {proxy_path} -timeleft 2>/dev/null || echo 0']
+        )
+        try:
+            return int(stdout.strip().split('\n')[-1])
+        except ValueError:
+            return 0
+
+    def ensure_valid(self, ssh_executor):
+        """
+        Make sure that shared proxy is valid for at least min_time_left seconds
+        Return path to the proxy file
+        """
+        proxy_path = self.get_path()
+        with VomsProxy.__lock:
+            now = time.time()
+            if VomsProxy.__valid_until - now > VomsProxy.min_time_left:
+                VomsProxy.__stats['reused'] += 1
+                return proxy_path
+
+            # Proxy might have been refreshed by a different process
+            time_left = self.get_time_left(ssh_executor)
+            if time_left > VomsProxy.min_time_left:
+                VomsProxy.__valid_until = now + time_left
+                VomsProxy.__stats['reused'] += 1
+                return proxy_path
+
+            self.logger.info('Refreshing voms proxy %s, %ss left', proxy_path, time_left)
+            _, stderr, exit_code = ssh_executor.execute_command([self.get_refresh_command()])
+            if exit_code != 0:
+                raise RuntimeError(f'Error creating voms proxy.\n{stderr}')
+
+            VomsProxy.__valid_until = now + self.get_time_left(ssh_executor)
+            VomsProxy.__stats['refreshed'] += 1
+
+        return proxy_path
+
+    def get_status(self):
+        """
+        Return number of proxy reuses and refreshes and remaining validity
+        """
+        with VomsProxy.__lock:
+            return {'reused': VomsProxy.__stats['reused'],
+                    'refreshed': VomsProxy.__stats['refreshed'],
+                    'time_left': max(0, int(VomsProxy.__valid_until - time.time()))}
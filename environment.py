@@ -29,6 +29,9 @@ Attributes:
     PORT (int): Port for service the web application
     SECRET_KEY (str): Flask secret key for securing Flask sessions
     LOG_FOLDER (str): Path to the log folder to store ReReco logs.
+    CACHE_FOLDER (str): Path to a local folder that is shared by all application processes
+        of one deployment and is used to cache downloaded files, e.g. DCS certification JSONs.
+        It must not be shared with other deployments.
     CALLBACK_CLIENT_ID (str): This credential is used for requesting access_token
         via client_credential grant for batch job integrations. 
         For this application, it is used to request authentication tokens to perform
@@ -63,6 +66,7 @@ GRID_USER_KEY: str = os.getenv("GRID_USER_KEY", "")
 HOST: str = os.getenv("HOST", "0.0.0.0")
 PORT: int = int(os.getenv("PORT", "8000"))
 LOG_FOLDER: str = os.getenv("LOG_FOLDER", "")
+CACHE_FOLDER: str = os.getenv("CACHE_FOLDER", "")
 CALLBACK_CLIENT_ID: str = os.getenv("CALLBACK_CLIENT_ID", "")
 CALLBACK_CLIENT_SECRET: str = os.getenv("CALLBACK_CLIENT_SECRET", "")
 APPLICATION_CLIENT_ID: str = os.getenv("APPLICATION_CLIENT_ID", "")
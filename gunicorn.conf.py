@@ -0,0 +1,12 @@
+"""
+Gunicorn configuration that starts background tasks in each worker process
+"""
+
+
+def post_worker_init(_worker):
+    """
+    Start background tasks after application is loaded in a worker process
+    """
+    # pylint: disable-next=import-outside-toplevel
+    from main import start_background_tasks
+    start_background_tasks()
@@ -4,6 +4,7 @@ Main module that starts flask web server
 import os
 import os.path
 import sys
+import fcntl
 import logging
 import logging.handlers
 import pathlib
@@ -16,6 +17,12 @@ import environment
 from core_lib.database.database import Database
 from core_lib.utils.username_filter import UsernameFilter
 from core_lib.middlewares.auth import AuthenticationMiddleware
+from core.controller.request_controller import RequestController
+from core.utils.job_queue import JobQueue
+from core.utils.scram_arch_index import ScramArchIndex
+from core.utils.index_manager import IndexManager
+from core.utils.object_stats import ObjectStats
+from core.utils.search_renames import SEARCH_RENAMES
 from api.subcampaign_api import (
     CreateSubcampaignAPI,
     DeleteSubcampaignAPI,
@@ -40,15 +47,18 @@ from api.request_api import (
     DeleteRequestAPI,
     UpdateRequestAPI,
     GetRequestAPI,
+    GetRequestChainAPI,
     GetEditableRequestAPI,
     GetCMSDriverAPI,
     GetConfigUploadAPI,
     GetRequestJobDictAPI,
+    GetRequestJobDictsAPI,
     RequestNextStatus,
     RequestPreviousStatus,
     GetRequestRunsAPI,
     GetRequestLumisectionsAPI,
     UpdateRequestWorkflowsAPI,
+    MoveSubmittedToDoneAPI,
     RequestOptionResetAPI,
 )
 from api.search_api import SearchAPI, SuggestionsAPI, WildSearchAPI
@@ -56,6 +66,10 @@ from api.settings_api import SettingsAPI
 from api.system_api import (
     SubmissionWorkerStatusAPI,
     SubmissionQueueAPI,
+    ConfigCacheAPI,
+    CacheStatusAPI,
+    IndexStatusAPI,
+    JobQueueAPI,
     LockerStatusAPI,
     UserInfoAPI,
     ObjectsInfoAPI,
@@ -193,6 +207,10 @@ api.add_resource(SettingsAPI, "/api/settings/get", "/api/settings/get/<string:na
 
 api.add_resource(SubmissionWorkerStatusAPI, "/api/system/workers")
 api.add_resource(SubmissionQueueAPI, "/api/system/queue")
+api.add_resource(ConfigCacheAPI, "/api/system/config_cache")
+api.add_resource(CacheStatusAPI, "/api/system/caches")
+api.add_resource(IndexStatusAPI, "/api/system/indexes")
+api.add_resource(JobQueueAPI, "/api/system/jobs")
 api.add_resource(LockerStatusAPI, "/api/system/locks")
 api.add_resource(UserInfoAPI, "/api/system/user_info")
 api.add_resource(ObjectsInfoAPI, "/api/system/objects_info")
@@ -232,6 +250,7 @@ api.add_resource(CreateRequestAPI, "/api/requests/create")
 api.add_resource(DeleteRequestAPI, "/api/requests/delete")
 api.add_resource(UpdateRequestAPI, "/api/requests/update")
 api.add_resource(GetRequestAPI, "/api/requests/get/<string:prepid>")
+api.add_resource(GetRequestChainAPI, "/api/requests/get_chain/<string:prepid>")
 api.add_resource(
     GetEditableRequestAPI,
     "/api/requests/get_editable",
@@ -240,6 +259,7 @@ api.add_resource(
 api.add_resource(GetCMSDriverAPI, "/api/requests/get_cmsdriver/<string:prepid>")
 api.add_resource(GetConfigUploadAPI, "/api/requests/get_config_upload/<string:prepid>")
 api.add_resource(GetRequestJobDictAPI, "/api/requests/get_dict/<string:prepid>")
+api.add_resource(GetRequestJobDictsAPI, "/api/requests/get_dicts/<string:prepid>")
 api.add_resource(RequestNextStatus, "/api/requests/next_status")
 api.add_resource(RequestPreviousStatus, "/api/requests/previous_status")
 api.add_resource(
@@ -253,6 +273,7 @@ api.add_resource(
     "/api/requests/get_lumisections/<string:prepid>",
 )
 api.add_resource(UpdateRequestWorkflowsAPI, "/api/requests/update_workflows")
+api.add_resource(MoveSubmittedToDoneAPI, "/api/requests/move_submitted_to_done")
 api.add_resource(RequestOptionResetAPI, "/api/requests/option_reset")
 
 
@@ -262,25 +283,51 @@ Database.set_credentials(
     username=environment.MONGO_DB_USERNAME, password=environment.MONGO_DB_PASSWORD
 )
 Database.set_database_name("rereco")
-Database.add_search_rename("requests", "runs", "runs<int>")
-Database.add_search_rename("requests", "run", "runs<int>")
-Database.add_search_rename("requests", "workflows", "workflows.name")
-Database.add_search_rename("requests", "workflow", "workflows.name")
-Database.add_search_rename("requests", "output_dataset", "output_datasets")
-Database.add_search_rename("requests", "input_dataset", "input.dataset")
-Database.add_search_rename("requests", "input_request", "input.request")
-Database.add_search_rename("requests", "created_on", "history.0.time")
-Database.add_search_rename("requests", "created_by", "history.0.user")
-Database.add_search_rename("subcampaigns", "created_on", "history.0.time")
-Database.add_search_rename("subcampaigns", "created_by", "history.0.user")
-Database.add_search_rename("tickets", "created_on", "history.0.time")
-Database.add_search_rename("tickets", "created_by", "history.0.user")
-Database.add_search_rename("tickets", "subcampaign", "steps.subcampaign")
-Database.add_search_rename("tickets", "processing_string", "steps.processing_string")
+for db_name, renames in SEARCH_RENAMES.items():
+    for attribute, path in renames.items():
+        Database.add_search_rename(db_name, attribute, path)
 
 # Set logger
 setup_logging(debug=environment.DEBUG, log_folder_path=environment.LOG_FOLDER)
 
+# Register background jobs, they are run after background tasks are started
+JobQueue.register("submit_subsequent_requests", RequestController().submit_subsequent_requests)
+JobQueue.register("submit_subsequent_request", RequestController().submit_subsequent_request)
+JobQueue.register("update_subsequent_requests", RequestController().update_subsequent_requests_job)
+JobQueue.register("move_submitted_to_done", RequestController().move_submitted_to_done)
+# File that is locked by the single process that runs deployment wide tasks
+background_lock_file = None
+
+
+def start_background_tasks():
+    """
+    Start background job worker and scram arch index refresher of this process
+    Object statistics reconciler and creation of missing indexes are started
+    only in the process that gets the deployment wide lock
+    """
+    global background_lock_file  # pylint: disable=global-statement
+    logger = logging.getLogger()
+    JobQueue().start_worker()
+    ScramArchIndex().start_refresher()
+    if background_lock_file:
+        return
+
+    os.makedirs(environment.CACHE_FOLDER, exist_ok=True)
+    # pylint: disable-next=consider-using-with
+    lock_file = open(
+        os.path.join(environment.CACHE_FOLDER, "background.lock"), "w", encoding="utf-8"
+    )
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        logger.info("Deployment wide background tasks run in another process")
+        return
+
+    background_lock_file = lock_file
+    ObjectStats().start_reconciler()
+    IndexManager().create_indexes_in_background()
+
 
 def main():
     """
@@ -294,6 +341,10 @@ def main():
         with open("rereco.pid", "w", encoding="utf-8") as pid_file:
             pid_file.write(str(pid))
 
+    if not environment.DEBUG or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        # Do only in the process that serves requests, not in the reloader
+        start_background_tasks()
+
     logger.info(
         "Starting... Debug: %s, Host: %s, Port: %s",
         environment.DEBUG,
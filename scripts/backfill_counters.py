@@ -0,0 +1,36 @@
+"""
+Script to initialize serial number counters of request and ticket prepid prefixes
+with highest serial numbers of existing objects
+It is safe to run it multiple times and while the application is running
+"""
+import re
+import sys
+import os.path
+import os
+# pylint: disable-next=wrong-import-position
+sys.path.append(os.path.abspath(os.path.pardir))
+from core_lib.database.database import Database
+from core.utils.serial_number_counter import SerialNumberCounter
+
+Database.set_credentials_file(os.getenv('DB_AUTH'))
+Database.set_database_name('rereco')
+
+prepid_pattern = re.compile('^(.+)-([0-9]+)$')
+for database_name in ('requests', 'tickets'):
+    collection = Database(database_name).collection
+    highest = {}
+    for item in collection.find({}, {'_id': 1}):
+        match = prepid_pattern.match(item['_id'])
+        if not match:
+            print('Skipping %s' % (item['_id']))
+            continue
+
+        prefix, serial_number = match.group(1), int(match.group(2))
+        highest[prefix] = max(highest.get(prefix, 0), serial_number)
+
+    print('%s: %s prefixes' % (database_name, len(highest)))
+    counter = SerialNumberCounter(database_name)
+    for prefix, serial_number in sorted(highest.items()):
+        counter.backfill(prefix, serial_number)
+
+print('Done')
@@ -0,0 +1,47 @@
+"""
+Script to measure how long it takes to render cmsDriver commands and config
+file names of requests with many sequences
+Usage: python3 benchmark_cmsdriver.py [sequences] [repeats]
+"""
+import sys
+import time
+import os.path
+import logging
+# pylint: disable-next=wrong-import-position
+sys.path.append(os.path.abspath(os.path.pardir))
+from core.model.request import Request
+
+logging.disable(logging.INFO)
+
+sequences_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+request_json = {'prepid': 'ReReco-Run2022A-ZeroBias-00001',
+                'cmssw_release': 'CMSSW_12_4_0',
+                'input': {'dataset': '/ZeroBias/Run2022A-v1/RAW', 'request': ''},
+                'runs': [355100 + i for i in range(100)],
+                'sequences': []}
+for index in range(sequences_count):
+    request_json['sequences'].append({'conditions': '124X_dataRun3_Prompt_v4',
+                                      'customise': f'Customisation.custom_{index}',
+                                      'datatier': ['AOD', 'DQMIO'],
+                                      'era': 'Run3',
+                                      'eventcontent': ['AOD', 'DQM'],
+                                      'nThreads': 8,
+                                      'scenario': 'pp',
+                                      'step': ['RAW2DIGI', 'RECO', 'DQM:@rerecoCommon']})
+
+request = Request(json_input=request_json, check_attributes=False)
+start_time = time.time()
+for _ in range(repeats):
+    request.get_cmsdrivers()
+
+cmsdrivers_time = (time.time() - start_time) / repeats
+start_time = time.time()
+for _ in range(repeats):
+    request.get_config_file_names()
+
+file_names_time = (time.time() - start_time) / repeats
+print('Sequences: %s, repeats: %s' % (sequences_count, repeats))
+print('get_cmsdrivers: %.2fms' % (cmsdrivers_time * 1000))
+print('get_config_file_names: %.2fms' % (file_names_time * 1000))
@@ -0,0 +1,69 @@
+"""
+Script to compare time and peak memory of rendering cmsDriver script of a
+request with many runs as one string and as a stream of chunks written to a file
+Usage: python3 benchmark_cmsdriver_stream.py [runs] [repeats]
+"""
+import sys
+import time
+import os.path
+import logging
+import tracemalloc
+# pylint: disable-next=wrong-import-position
+sys.path.append(os.path.abspath(os.path.pardir))
+from core.model.request import Request
+
+logging.disable(logging.INFO)
+
+runs_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+request_json = {'prepid': 'ReReco-Run2022A-ZeroBias-00001',
+                'cmssw_release': 'CMSSW_12_4_0',
+                'input': {'dataset': '/ZeroBias/Run2022A-v1/RAW', 'request': ''},
+                'runs': [355100 + i for i in range(runs_count)],
+                'sequences': [{'conditions': '124X_dataRun3_Prompt_v4',
+                               'datatier': ['AOD', 'DQMIO'],
+                               'era': 'Run3',
+                               'eventcontent': ['AOD', 'DQM'],
+                               'scenario': 'pp',
+                               'step': ['RAW2DIGI', 'RECO', 'DQM:@rerecoCommon']},
+                              {'conditions': '124X_dataRun3_Prompt_v4',
+                               'datatier': ['MINIAOD'],
+                               'era': 'Run3',
+                               'eventcontent': ['MINIAOD'],
+                               'scenario': 'pp',
+                               'step': ['PAT']}]}
+
+
+def render_string(rendered_request, output_file):
+    """
+    Render whole script as one string and write it
+    """
+    output_file.write(rendered_request.get_cmsdrivers())
+
+
+def render_stream(rendered_request, output_file):
+    """
+    Write script chunks as they are rendered
+    """
+    for chunk in rendered_request.iter_cmsdrivers():
+        output_file.write(chunk)
+
+
+request = Request(json_input=request_json, check_attributes=False)
+print('Runs: %s, repeats: %s' % (runs_count, repeats))
+renderers = [('string', render_string)]
+if hasattr(request, 'iter_cmsdrivers'):
+    renderers.append(('stream', render_stream))
+
+with open(os.devnull, 'w', encoding='utf-8') as devnull:
+    for name, renderer in renderers:
+        tracemalloc.start()
+        start_time = time.time()
+        for _ in range(repeats):
+            renderer(request, devnull)
+
+        render_time = (time.time() - start_time) / repeats
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print('%s: %.2fms, peak memory %.2fKB' % (name, render_time * 1000, peak_memory / 1024))
@@ -0,0 +1,46 @@
+"""
+Script to compare latency of getting job dicts one request at a time
+and in one batch with cold and warm cache
+Usage: python3 benchmark_job_dicts.py <prepid> [<prepid> ...]
+"""
+import sys
+import time
+import os.path
+import logging
+# pylint: disable-next=wrong-import-position
+sys.path.append(os.path.abspath(os.path.pardir))
+from core_lib.database.database import Database
+from core.controller.request_controller import RequestController
+from core.utils.job_dict_cache import JobDictCache
+
+logging.disable(logging.INFO)
+Database.set_credentials_file(os.getenv('DB_AUTH'))
+Database.set_database_name('rereco')
+
+prepids = sys.argv[1:]
+if not prepids:
+    print('Usage: python3 benchmark_job_dicts.py <prepid> [<prepid> ...]')
+    sys.exit(1)
+
+request_controller = RequestController()
+cache = JobDictCache()
+
+start_time = time.time()
+for prepid in prepids:
+    request_controller.get_job_dict(request_controller.get_read_only(prepid))
+
+single_time = time.time() - start_time
+print('One by one without cache: %.2fms total, %.2fms per request'
+      % (single_time * 1000, single_time * 1000 / len(prepids)))
+
+for name in ('cold', 'warm'):
+    if name == 'cold':
+        cache.invalidate()
+
+    start_time = time.time()
+    job_dicts, errors = request_controller.get_job_dicts(prepids)
+    batch_time = time.time() - start_time
+    print('Batch with %s cache: %.2fms total, %.2fms per request, %s errors'
+          % (name, batch_time * 1000, batch_time * 1000 / len(prepids), len(errors)))
+
+print('Cache status: %s' % (cache.get_status()))
@@ -0,0 +1,42 @@
+"""
+Script to compare memory and time of DCS JSON stored as a dictionary and as LumiMask
+Usage: python3 benchmark_lumi_mask.py [ranges]
+"""
+import sys
+import time
+import os.path
+import tracemalloc
+# pylint: disable-next=wrong-import-position
+sys.path.append(os.path.abspath(os.path.pardir))
+from core.utils.lumi_mask import LumiMask
+
+ranges_count = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+dcs_json = {}
+for index in range(ranges_count):
+    run = str(300000 + index // 50)
+    dcs_json.setdefault(run, []).append([(index % 50) * 10 + 1, (index % 50) * 10 + 5])
+
+runs = [int(r) for r in dcs_json][::3]
+print('Lumisection ranges: %s, runs: %s, filtered runs: %s'
+      % (ranges_count, len(dcs_json), len(runs)))
+
+tracemalloc.start()
+dict_copy = {run: [list(r) for r in ranges] for run, ranges in dcs_json.items()}
+dict_memory, _ = tracemalloc.get_traced_memory()
+tracemalloc.stop()
+start_time = time.time()
+run_strings = {str(r) for r in runs}
+filtered = {run: lumis for run, lumis in dict_copy.items() if run in run_strings}
+dict_time = time.time() - start_time
+print('dict: %.2fMB, filter %.2fms' % (dict_memory / 1024 / 1024, dict_time * 1000))
+
+tracemalloc.start()
+mask = LumiMask.from_json(dcs_json)
+mask_memory, _ = tracemalloc.get_traced_memory()
+tracemalloc.stop()
+start_time = time.time()
+filtered_mask = mask.filter_runs(runs)
+mask_time = time.time() - start_time
+print('LumiMask: %.2fMB, filter %.2fms' % (mask_memory / 1024 / 1024, mask_time * 1000))
+if filtered_mask.to_json() != filtered:
+    print('Filtered results are different')
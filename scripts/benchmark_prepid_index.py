@@ -0,0 +1,46 @@
+"""
+Script to measure build time and suggestion latency of prepid index with
+many generated request prepids compared to a regex scan of all prepids
+Usage: python3 benchmark_prepid_index.py [prepids] [repeats]
+"""
+import re
+import sys
+import time
+import random
+import os.path
+# pylint: disable-next=wrong-import-position
+sys.path.append(os.path.abspath(os.path.pardir))
+from core.utils.prepid_index import PrepidIndex
+
+prepids_count = int(sys.argv[1]) if len(sys.argv) > 1 else 120000
+repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+random.seed(1)
+eras = ['Run2016H', 'Run2017F', 'Run2018D', 'Run2022A', 'Run2022B']
+datasets = ['BTagMu', 'DoubleMuon', 'EGamma', 'HLTPhysics', 'JetHT',
+            'MuonEG', 'SingleMuon', 'Tau', 'ZeroBias']
+processing_strings = ['PromptNano', 'RelVal', 'Summer22', 'UL2017_MiniAODv2', 'UL2018']
+prepids = set()
+while len(prepids) < prepids_count:
+    prepids.add(f'ReReco-{random.choice(eras)}-{random.choice(datasets)}-'
+                f'{random.choice(processing_strings)}-{random.randint(1, 99999):05d}')
+
+prepids = list(prepids)
+start_time = time.time()
+index = PrepidIndex(prepids)
+index.get_text()
+print('Prepids: %s, repeats: %s, build: %.2fs' % (prepids_count, repeats, time.time() - start_time))
+queries = ['rereco', 'run2022a-zerobias', '0012', 'jetht ul2018 0042', 'zz',
+           'egamma-summer22-1234', 'tau 99', 'does_not_exist']
+for query in queries:
+    start_time = time.time()
+    for _ in range(repeats):
+        results = index.suggest(query)
+
+    index_time = (time.time() - start_time) / repeats
+    start_time = time.time()
+    matcher = re.compile('.*'.join(re.escape(p) for p in query.split()), re.IGNORECASE)
+    scan_results = [p for p in prepids if matcher.search(p)][:20]
+    scan_time = time.time() - start_time
+    print('%s: index %.3fms (%s results), scan %.2fms (%s results)'
+          % (query, index_time * 1000, len(results), scan_time * 1000, len(scan_results)))
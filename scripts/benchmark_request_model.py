@@ -0,0 +1,49 @@
+"""
+Script to compare construction time and memory of regular and read only
+requests that have many lumisection ranges
+Usage: python3 benchmark_request_model.py [ranges] [repeats]
+"""
+import sys
+import time
+import os.path
+import logging
+import tracemalloc
+# pylint: disable-next=wrong-import-position
+sys.path.append(os.path.abspath(os.path.pardir))
+from core.model.request import Request
+
+logging.disable(logging.INFO)
+
+ranges_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+lumisections = {}
+for index in range(ranges_count):
+    run = str(355100 + index // 100)
+    lumisections.setdefault(run, []).append([index * 10 + 1, index * 10 + 5])
+
+request_json = {'prepid': 'ReReco-Run2022A-ZeroBias-00001',
+                'cmssw_release': 'CMSSW_12_4_0',
+                'input': {'dataset': '/ZeroBias/Run2022A-v1/RAW', 'request': ''},
+                'lumisections': lumisections,
+                'runs': [int(r) for r in lumisections],
+                'workflows': [{'name': f'workflow_{i}', 'type': 'ReReco'} for i in range(100)],
+                'sequences': [{'conditions': '124X_dataRun3_Prompt_v4',
+                               'datatier': ['AOD'],
+                               'era': 'Run3',
+                               'eventcontent': ['AOD'],
+                               'scenario': 'pp',
+                               'step': ['RAW2DIGI', 'RECO']}]}
+
+print('Lumisection ranges: %s, repeats: %s' % (ranges_count, repeats))
+for read_only in (False, True):
+    tracemalloc.start()
+    start_time = time.time()
+    for _ in range(repeats):
+        request = Request(json_input=request_json, read_only=read_only)
+
+    construction_time = (time.time() - start_time) / repeats
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('read_only=%s: %.2fms per request, peak memory %.2fMB'
+          % (read_only, construction_time * 1000, peak_memory / 1024 / 1024))
@@ -0,0 +1,52 @@
+"""
+Script to compare latency and response size of paging through requests with
+skip and full documents and with cursor and projection of table columns
+Usage: python3 benchmark_search_pagination.py [limit] [pages]
+"""
+import sys
+import json
+import time
+import os.path
+import os
+# pylint: disable-next=wrong-import-position
+sys.path.append(os.path.abspath(os.path.pardir))
+from core_lib.database.database import Database
+from core.model.request import Request
+from core.utils.search_query import SearchQuery
+
+Database.set_credentials_file(os.getenv('DB_AUTH'))
+Database.set_database_name('rereco')
+
+limit = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+pages = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+fields = ['prepid', 'status', 'subcampaign', 'processing_string', 'priority',
+          'total_events', 'completed_events', 'input', 'output_datasets']
+
+collection = Database('requests').collection
+search_query = SearchQuery('requests', Request)
+print('Limit: %s, pages: %s' % (limit, pages))
+skip_time = 0
+skip_size = 0
+for page in range(pages):
+    start_time = time.time()
+    results = list(collection.find({}).sort('_id', 1).skip(page * limit).limit(limit))
+    collection.count_documents({})
+    skip_time += time.time() - start_time
+    skip_size += len(json.dumps(results, default=str))
+
+cursor_time = 0
+cursor_size = 0
+cursor = None
+for page in range(pages):
+    start_time = time.time()
+    response = search_query.search({}, limit=limit, cursor=cursor, fields=fields)
+    cursor_time += time.time() - start_time
+    cursor_size += len(json.dumps(response, default=str))
+    cursor = response['next_cursor']
+    if not cursor:
+        break
+
+print('Skip, full documents, exact count: %.2fms per page, %.1fKB per page'
+      % (skip_time * 1000 / pages, skip_size / 1024 / pages))
+print('Cursor, projection, estimated count: %.2fms per page, %.1fKB per page'
+      % (cursor_time * 1000 / (page + 1), cursor_size / 1024 / (page + 1)))
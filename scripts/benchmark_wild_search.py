@@ -0,0 +1,48 @@
+"""
+Script to compare latency of wild search with search index and with
+case insensitive regex queries of each attribute
+Usage: python3 benchmark_wild_search.py <query> [<query> ...]
+"""
+import re
+import sys
+import time
+import os.path
+import os
+# pylint: disable-next=wrong-import-position
+sys.path.append(os.path.abspath(os.path.pardir))
+from core_lib.database.database import Database
+from core.utils.search_index import SearchIndex
+
+Database.set_credentials_file(os.getenv('DB_AUTH'))
+Database.set_database_name('rereco')
+
+queries = sys.argv[1:] or ['ZeroBias', 'Run2022', 'UL2018*MiniAOD', 'does_not_exist']
+# Attributes that were queried one by one before search index
+attributes = {('requests', 'prepid'): 'prepid',
+              ('tickets', 'prepid'): 'prepid',
+              ('subcampaigns', 'prepid'): 'prepid',
+              ('tickets', 'subcampaign'): 'steps.subcampaign',
+              ('tickets', 'processing_string'): 'steps.processing_string',
+              ('tickets', 'input'): 'input',
+              ('requests', 'subcampaign'): 'subcampaign',
+              ('requests', 'processing_string'): 'processing_string',
+              ('requests', 'input_dataset'): 'input.dataset',
+              ('requests', 'output_dataset'): 'output_datasets',
+              ('requests', 'workflow'): 'workflows.name'}
+
+search_index = SearchIndex()
+for query in queries:
+    start_time = time.time()
+    results = search_index.search(query)
+    index_time = time.time() - start_time
+
+    start_time = time.time()
+    pattern = re.compile('.*'.join(re.escape(p) for p in query.split('*') if p), re.IGNORECASE)
+    regex_results = 0
+    for (db_name, _), attribute in attributes.items():
+        collection = Database(db_name).collection
+        regex_results += len(list(collection.find({attribute: pattern}, {'_id': 1}).limit(5)))
+
+    regex_time = time.time() - start_time
+    print('%s: index %.2fms (%s results), regex %.2fms (%s results)'
+          % (query, index_time * 1000, len(results), regex_time * 1000, regex_results))
@@ -0,0 +1,100 @@
+"""
+Script to check that requests created at once by many processes and threads
+get unique prepids
+Requests are created with RequestController.create and create_many in a
+given subcampaign from a given input dataset with a separate test processing
+string, so they have a separate prepid prefix. Created requests and the counter
+of the prefix are removed afterwards
+Usage: python3 counter_stress.py <subcampaign> <input dataset>
+                                 [processes] [threads] [creations]
+"""
+import sys
+import os.path
+import os
+import logging
+from multiprocessing import Pool
+from concurrent.futures import ThreadPoolExecutor
+# pylint: disable-next=wrong-import-position
+sys.path.append(os.path.abspath(os.path.pardir))
+from core_lib.database.database import Database
+from core.controller.request_controller import RequestController
+from core.utils.serial_number_counter import SerialNumberCounter
+
+PROCESSING_STRING = 'CounterStressTest'
+
+
+def setup_database():
+    """
+    Set database credentials and name in current process
+    """
+    logging.disable(logging.INFO)
+    Database.set_credentials_file(os.getenv('DB_AUTH'))
+    Database.set_database_name('rereco')
+
+
+def create_requests(args):
+    """
+    Create requests in multiple threads of a process, every second creation
+    makes a chain of two requests with create_many, others use create
+    Return list of prepids of created requests
+    """
+    subcampaign, input_dataset, threads, creations = args
+    setup_database()
+    request_controller = RequestController()
+
+    def create(index):
+        request_json = {'subcampaign': subcampaign,
+                        'processing_string': PROCESSING_STRING,
+                        'input': {'dataset': input_dataset, 'request': ''}}
+        if index % 2:
+            return [request_controller.create(request_json).get_prepid()]
+
+        chain = [dict(request_json, prepid='temporary-1'),
+                 dict(request_json, input={'dataset': '', 'request': 'temporary-1'})]
+        return [r.get_prepid() for r in request_controller.create_many(chain)]
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return [p for prepids in executor.map(create, range(creations)) for p in prepids]
+
+
+def main():
+    """
+    Create requests in multiple processes, check prepids and remove the requests
+    """
+    if len(sys.argv) < 3:
+        print('Usage: python3 counter_stress.py <subcampaign> <input dataset> '
+              '[processes] [threads] [creations]')
+        sys.exit(1)
+
+    subcampaign = sys.argv[1]
+    input_dataset = sys.argv[2]
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    threads = int(sys.argv[4]) if len(sys.argv) > 4 else 4
+    creations = int(sys.argv[5]) if len(sys.argv) > 5 else 20
+    with Pool(processes) as pool:
+        results = pool.map(create_requests,
+                           [(subcampaign, input_dataset, threads, creations)] * processes)
+
+    prepids = [p for result in results for p in result]
+    expected = processes * (creations + (creations + 1) // 2)
+    print('Created %s requests, %s unique prepids, expected %s' % (len(prepids),
+                                                                  len(set(prepids)),
+                                                                  expected))
+    setup_database()
+    request_controller = RequestController()
+    # Subsequent requests have higher serial numbers and are removed first
+    for prepid in sorted(prepids, reverse=True):
+        request_controller.delete({'prepid': prepid})
+
+    prefix = prepids[0].rsplit('-', 1)[0] if prepids else ''
+    counter = SerialNumberCounter('requests')
+    Database('counters').collection.delete_one({'_id': counter.get_counter_id(prefix)})
+    if len(set(prepids)) != expected or len(prepids) != expected:
+        print('FAILED')
+        sys.exit(1)
+
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
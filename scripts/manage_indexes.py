@@ -0,0 +1,60 @@
+"""
+Script to check and create indexes of search renames and queried attributes
+and to print plans of typical queries
+Usage: python3 manage_indexes.py [check|create|explain]
+"""
+import sys
+import os.path
+import os
+# pylint: disable-next=wrong-import-position
+sys.path.append(os.path.abspath(os.path.pardir))
+from core_lib.database.database import Database
+from core.utils.index_manager import IndexManager
+
+Database.set_credentials_file(os.getenv('DB_AUTH'))
+Database.set_database_name('rereco')
+
+# Typical queries of controllers and searches
+QUERIES = [('requests', {'status': 'submitted', 'deleted': {'$ne': True}}, None),
+           ('requests', {'input.request': 'ReReco-Run2022A-ZeroBias-00001'}, None),
+           ('requests', {'subcampaign': 'Run2022A-ReReco'}, [('history.0.time', -1)]),
+           ('requests', {'runs': 355100}, None),
+           ('requests', {'workflows.name': 'pdmvserv_Run2022A_ZeroBias'}, None),
+           ('requests', {'output_datasets': '/ZeroBias/Run2022A-v1/AOD'}, None),
+           ('tickets', {'created_requests': 'ReReco-Run2022A-ZeroBias-00001'}, None),
+           ('tickets', {'status': 'new'}, [('history.0.time', -1)])]
+
+command = sys.argv[1] if len(sys.argv) > 1 else 'check'
+index_manager = IndexManager()
+if command == 'check':
+    missing = index_manager.get_missing_indexes()
+    for db_name, paths in index_manager.get_declared_indexes().items():
+        for path in paths:
+            print('%s %s: %s' % (db_name,
+                                 path,
+                                 'missing' if path in missing.get(db_name, []) else 'ok'))
+
+elif command == 'create':
+    created = index_manager.create_indexes()
+    for db_name, paths in created.items():
+        print('Created %s indexes: %s' % (db_name, ', '.join(paths)))
+
+    print('Created %s indexes' % (sum(len(paths) for paths in created.values())))
+elif command == 'explain':
+    for db_name, query, sort in QUERIES:
+        summary = index_manager.explain(db_name, query, sort)
+        print('%s %s sorted by %s' % (db_name, summary['shape'], sort))
+        print('  plan: %s' % (' <- '.join(summary['stages'])))
+        print('  keys examined: %s, documents examined: %s, returned: %s, %sms' %
+              (summary['keys_examined'],
+               summary['documents_examined'],
+               summary['returned'],
+               summary['time_ms']))
+        if summary['collection_scan']:
+            print('  WARNING: collection scan')
+
+else:
+    print('Unknown command %s, use check, create or explain' % (command))
+    sys.exit(1)
+
+print('Done')
@@ -1,53 +1,42 @@
 """
 Script that tries to move submitted requests to done
 It should be run periodically
-Requires MongoDB credentials and API access credentials for requesting
-access tokens.
+Requires API access credentials for requesting access tokens.
+Web application checks all submitted requests in a background job and this
+script waits for the job to finish while printing its progress.
 """
 import sys
 import json
+import time
 import os.path
 import http.client
-import pprint
 # pylint: disable-next=wrong-import-position
 sys.path.append(os.path.abspath(os.path.pardir))
-from core_lib.database.database import Database
 from core_lib.utils.common_utils import get_client_credentials, get_access_token
 
+# Seconds between checks of job progress
+POLL_INTERVAL = 30
+# Seconds to wait for the job to finish
+MAX_WAIT = 3600
 
-def get_database_credentials() -> dict[str, str | int]:
+
+def call_api(host, client_credentials, method, path):
     """
-    Retrieves database credentials from environment variables
-    and raises a runtime exception if any of them is missing
-
-    Returns:
-        dict[str, str | int]: Configuration variables for database
-    
-    Raises:
-        RuntimeError: If some of the required configuration variables for the
-            database is missing.
+    Make a call to the web application and return its response
+    Exit if call was not successful
     """
-    error_msg: str = (
-        "Some required environment variables for the database are missing. \n"
-        "Please set them, they are: \n"
-    )
-    missing_variables: list[str] = []
-    database_variables: dict[str, str | int] = {
-        "MONGO_DB_USERNAME": os.getenv("MONGO_DB_USERNAME", ""),
-        "MONGO_DB_PASSWORD": os.getenv("MONGO_DB_PASSWORD", ""),
-        "MONGO_DB_HOST": os.getenv("MONGO_DB_HOST", ""),
-        "MONGO_DB_PORT": int(os.getenv("MONGO_DB_PORT", "27017"))
-    }
-
-    for var, value in database_variables.items():
-        if not value:
-            missing_variables.append(var)
-
-    if missing_variables:
-        error_msg += pprint.pformat(missing_variables, indent=4)
-        raise RuntimeError(error_msg)
+    connection = http.client.HTTPSConnection(host=host, timeout=120)
+    headers = {'Content-Type': 'application/json',
+               'Authorization': get_access_token(credentials=client_credentials)}
+    connection.request(method, path, headers=headers)
+    response = connection.getresponse()
+    response_json = json.loads(response.read())
+    connection.close()
+    if not response_json.get('success'):
+        print('%s %s' % (response.status, response_json.get('message')))
+        sys.exit(1)
 
-    return database_variables
+    return response_json['response']
 
 
 def move_to_done(host, client_credentials):
@@ -59,24 +48,45 @@ def move_to_done(host, client_credentials):
         client_credentials (dict[str, str]): Credentials for requesting access tokens
             to authenticate request to the SSO
     """
-    connection = http.client.HTTPSConnection(host=host, timeout=300)
-    headers = {'Content-Type': 'application/json'}
-    request_db = Database('requests')
-    requests = [{}]
-    page = 0
-    while requests:
-        requests = request_db.query(query_string='status=submitted', page=page)
-        page += 1
-        for request in requests:
-            print(request['prepid'])
-            headers["Authorization"] = get_access_token(credentials=client_credentials)
-            connection.request('POST',
-                               '/rereco/api/requests/next_status',
-                               json.dumps(request),
-                               headers=headers)
-            response = connection.getresponse()
-            response_text = json.loads(response.read())['message']
-            print('  %s %s' % (response.code, response_text))
+    path = '/rereco/api/requests/move_submitted_to_done'
+    job_key = call_api(host, client_credentials, 'POST', path)
+    print('Started job %s' % (job_key))
+    start_time = time.time()
+    while True:
+        time.sleep(POLL_INTERVAL)
+        job = call_api(host, client_credentials, 'GET', '%s?job=%s' % (path, job_key))
+        progress = job.get('progress', {})
+        print('Job %s, %s, checked %s of %s requests, %s done'
+              % (job['status'],
+                 progress.get('stage', 'waiting'),
+                 progress.get('checked', 0),
+                 progress.get('total', '?'),
+                 progress.get('done', 0)))
+        if job['status'] == 'failed':
+            print('Job failed: %s' % (job['error']))
+            sys.exit(1)
+
+        if job['status'] == 'done':
+            break
+
+        if time.time() - start_time > MAX_WAIT:
+            print('Job did not finish in %ss' % (MAX_WAIT))
+            sys.exit(1)
+
+    for prepid, outcome in sorted(progress['requests'].items()):
+        print(prepid)
+        print('  %s %s' % (outcome['status'], outcome['message']))
+
+    if progress.get('skipped'):
+        print('Skipped %s locked requests: %s' % (len(progress['skipped']),
+                                                  ', '.join(progress['skipped'])))
+
+    print('Moved %s of %s requests to done in %ss (Stats2 update %ss, checks %ss)'
+          % (progress['done'],
+             progress['total'],
+             progress['total_time'],
+             progress['update_time'],
+             progress['check_time']))
 
 
 def main():
@@ -87,22 +97,8 @@ def main():
     # Retrieve client credentials
     api_access_credentials = get_client_credentials()
 
-    # Retrieve database credentials
-    database_credentials = get_database_credentials()
-
     # ReReco domain URL
     rereco_service_domain = os.getenv("SERVICE_DOMAIN", "cms-pdmv-prod.web.cern.ch")
-
-    # Set database configuration
-    Database.set_host_port(
-        host=database_credentials["MONGO_DB_HOST"],
-        port=database_credentials["MONGO_DB_PORT"]
-    )
-    Database.set_credentials(
-        username=database_credentials["MONGO_DB_USERNAME"],
-        password=database_credentials["MONGO_DB_PASSWORD"]
-    )
-    Database.set_database_name('rereco')
     move_to_done(host=rereco_service_domain, client_credentials=api_access_credentials)
 
 if __name__ == '__main__':
@@ -0,0 +1,18 @@
+"""
+Script to rebuild request dependency graph from input requests of all requests
+It should be run once before graph is used and can be run again at any time
+"""
+import sys
+import os.path
+import os
+# pylint: disable-next=wrong-import-position
+sys.path.append(os.path.abspath(os.path.pardir))
+from core_lib.database.database import Database
+from core.utils.request_graph import RequestGraph
+
+Database.set_credentials_file(os.getenv('DB_AUTH'))
+Database.set_database_name('rereco')
+
+nodes = RequestGraph().rebuild()
+print('Request graph has %s nodes' % (nodes))
+print('Done')
@@ -0,0 +1,18 @@
+"""
+Script to rebuild wild search index from all subcampaigns, tickets and requests
+It should be run once before search index is used and can be run again at any time
+"""
+import sys
+import os.path
+import os
+# pylint: disable-next=wrong-import-position
+sys.path.append(os.path.abspath(os.path.pardir))
+from core_lib.database.database import Database
+from core.utils.search_index import SearchIndex
+
+Database.set_credentials_file(os.getenv('DB_AUTH'))
+Database.set_database_name('rereco')
+
+values = SearchIndex().rebuild()
+print('Search index has %s values' % (values))
+print('Done')
@@ -0,0 +1,18 @@
+"""
+Script to recount requests and tickets and correct stored Dashboard statistics
+It should be run once before statistics are used and can be run again at any time
+"""
+import sys
+import os.path
+import os
+# pylint: disable-next=wrong-import-position
+sys.path.append(os.path.abspath(os.path.pardir))
+from core_lib.database.database import Database
+from core.utils.object_stats import ObjectStats
+
+Database.set_credentials_file(os.getenv('DB_AUTH'))
+Database.set_database_name('rereco')
+
+corrections = ObjectStats().reconcile()
+print('Corrected %s numbers' % (corrections))
+print('Done')
@@ -0,0 +1,16 @@
+"""
+Common test setup: environment module requires all settings to be present
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
+os.environ.setdefault('REMOTE_PATH', '/remote/rereco/')
+for variable in ('CMSWEB_URL', 'REMOTE_SSH_USERNAME', 'REMOTE_SSH_PASSWORD',
+                 'MONGO_DB_USERNAME', 'MONGO_DB_PASSWORD', 'MONGO_DB_HOST', 'GRID_USER_CERT',
+                 'GRID_USER_KEY', 'LOG_FOLDER', 'CALLBACK_CLIENT_ID', 'CALLBACK_CLIENT_SECRET',
+                 'APPLICATION_CLIENT_ID', 'SECRET_KEY'):
+    os.environ.setdefault(variable, f'test_{variable.lower()}')
+
+os.environ.setdefault('CACHE_FOLDER', tempfile.mkdtemp(prefix='rereco_test_cache_'))
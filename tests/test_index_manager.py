@@ -0,0 +1,91 @@
+"""
+Tests of index management with mongomock collections
+"""
+import pytest
+
+pytest.importorskip('core_lib')
+mongomock = pytest.importorskip('mongomock')
+# pylint: disable-next=wrong-import-position
+from core.utils import index_manager
+# pylint: disable-next=wrong-import-position
+from core.utils.index_manager import IndexManager
+
+
+class FakeThread():
+    """
+    Thread stand-in that runs target right away
+    """
+
+    def __init__(self, target, daemon=False):
+        self.target = target
+        self.daemon = daemon
+
+    def start(self):
+        """
+        Run target in current thread
+        """
+        self.target()
+
+
+@pytest.fixture(name='manager')
+def fixture_manager(monkeypatch):
+    """
+    Index manager that uses mongomock collections and runs threads right away
+    """
+    client = mongomock.MongoClient()
+
+    class FakeDatabase():  # pylint: disable=too-few-public-methods
+        """
+        Database stand-in with mongomock collection
+        """
+
+        def __init__(self, db_name):
+            self.collection = client['rereco'][db_name]
+
+    monkeypatch.setattr(index_manager, 'Database', FakeDatabase)
+    monkeypatch.setattr(index_manager, 'Thread', FakeThread)
+    manager = IndexManager()
+    manager.explained = []
+
+    def explain(db_name, query, sort=None):
+        manager.explained.append((db_name, query, sort))
+        return {'database': db_name,
+                'shape': manager.get_shape(query),
+                'stages': ['FETCH', 'IXSCAN(runs_1)']}
+
+    monkeypatch.setattr(manager, 'explain', explain)
+    return manager
+
+
+def test_search_renames_are_indexed(manager):
+    """
+    Paths of search renames are declared without types and created
+    """
+    declared = manager.get_declared_indexes()
+    assert 'runs' in declared['requests']
+    assert 'runs<int>' not in declared['requests']
+    assert 'workflows.name' in declared['requests']
+    assert 'steps.subcampaign' in declared['tickets']
+    created = manager.create_indexes()
+    assert set(created['requests']) == set(declared['requests']) - {'_id'}
+    assert not manager.get_missing_indexes()
+    assert not manager.create_indexes()
+
+
+def test_only_slow_queries_are_sampled(manager):
+    """
+    Queries faster than threshold are not explained, slow query of a shape is
+    explained once per explain interval
+    """
+    query = {'runs': 315000}
+    sort = [('_id', 1)]
+    manager.sample_query('requests', query, sort, manager.slow_query_time / 2)
+    assert not manager.explained
+    manager.sample_query('requests', query, sort, manager.slow_query_time + 0.5)
+    assert manager.explained == [('requests', query, sort)]
+    # Same shape with a different value is not explained again
+    manager.sample_query('requests', {'runs': 316000}, sort, manager.slow_query_time + 0.5)
+    assert len(manager.explained) == 1
+    slow_query = manager.get_status()['slow_queries'][-1]
+    assert slow_query['shape'] == '{runs:?}'
+    assert slow_query['query_time'] == round(manager.slow_query_time + 0.5, 3)
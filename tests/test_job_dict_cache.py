@@ -0,0 +1,56 @@
+"""
+Tests of job dict cache revisions
+"""
+import pytest
+from core.utils.job_dict_cache import JobDictCache
+
+
+REQUEST = {'prepid': 'ReReco-Run2022A-ZeroBias-PS-00001',
+           'memory': 2000,
+           'time_per_event': [1.0],
+           'size_per_event': [1.0],
+           'runs': [1, 2],
+           'lumisections': {},
+           'job_dict_overwrite': {},
+           'processing_string': 'PS',
+           'cmssw_release': 'CMSSW_12_4_0',
+           'sequences': [{'config_id': '', 'harvesting_config_id': ''}],
+           'history': [{'action': 'create'}]}
+
+
+@pytest.mark.parametrize('key, value', [('memory', 4000),
+                                        ('time_per_event', [2.0]),
+                                        ('size_per_event', [2.0]),
+                                        ('runs', [1, 2, 3]),
+                                        ('lumisections', {'1': [[1, 10]]}),
+                                        ('job_dict_overwrite', {'Memory': 1}),
+                                        ('processing_string', 'PS2'),
+                                        ('cmssw_release', 'CMSSW_13_0_0'),
+                                        ('sequences', [{'config_id': 'a',
+                                                        'harvesting_config_id': ''}])])
+def test_revision_changes_with_job_dict_inputs(key, value):
+    """
+    Revision changes when any value that job dict is made of changes
+    """
+    cache = JobDictCache()
+    assert cache.get_revision(dict(REQUEST, **{key: value})) != cache.get_revision(REQUEST)
+
+
+def test_revision_ignores_history():
+    """
+    New history entries alone do not invalidate cached job dicts
+    """
+    changed = dict(REQUEST, history=REQUEST['history'] + [{'action': 'update'}])
+    assert JobDictCache.get_revision(changed) == JobDictCache.get_revision(REQUEST)
+
+
+def test_invalidate_removes_cached_job_dict():
+    """
+    Invalidated job dict is not returned even with the same revision
+    """
+    cache = JobDictCache()
+    revision = cache.get_revision(REQUEST)
+    cache.set(REQUEST['prepid'], revision, {'Memory': 2000})
+    assert cache.get(REQUEST['prepid'], revision) == {'Memory': 2000}
+    cache.invalidate(REQUEST['prepid'])
+    assert cache.get(REQUEST['prepid'], revision) is None
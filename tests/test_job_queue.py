@@ -0,0 +1,55 @@
+"""
+Tests of job queue with mongomock collections
+"""
+import pytest
+
+pytest.importorskip('core_lib')
+mongomock = pytest.importorskip('mongomock')
+# pylint: disable-next=wrong-import-position
+from core.utils import job_queue
+# pylint: disable-next=wrong-import-position
+from core.utils.job_queue import JobQueue
+
+
+@pytest.fixture(name='queue')
+def fixture_queue(monkeypatch):
+    """
+    Job queue with jobs in a mongomock collection
+    """
+    client = mongomock.MongoClient()
+
+    class FakeDatabase():  # pylint: disable=too-few-public-methods
+        """
+        Database stand-in with mongomock collection
+        """
+
+        def __init__(self, db_name):
+            self.collection = client['rereco'][db_name]
+
+    monkeypatch.setattr(job_queue, 'Database', FakeDatabase)
+    return JobQueue()
+
+
+def test_progress(queue):
+    """
+    Handler reports progress of a job that can be read while and after it runs
+    """
+    def handler(job_key, prepids):
+        queue.set_progress(job_key, {'total': len(prepids), 'requests': {}})
+        for prepid in prepids:
+            assert queue.get_job(job_key)['status'] == 'running'
+            queue.set_progress(job_key, {f'requests.{prepid}': 'done'})
+
+    JobQueue.register('test_progress', handler)
+    assert queue.add('test_progress', 'job-1', job_key='job-1', prepids=['a-00001', 'a-00002'])
+    assert queue.add('test_progress', 'job-2', job_key='job-2', prepids=['b-00001'])
+    assert not queue.add('test_progress', 'job-2', job_key='job-2', prepids=[])
+    assert queue.get_last_job('test_progress')['_id'] == 'job-2'
+    while (job := queue.claim('worker')):
+        queue.run(job)
+
+    job = queue.get_job('job-1')
+    assert job['status'] == 'done'
+    assert job['progress'] == {'total': 2, 'requests': {'a-00001': 'done', 'a-00002': 'done'}}
+    assert queue.get_job('job-2')['progress'] == {'total': 1, 'requests': {'b-00001': 'done'}}
+    assert queue.get_job('job-3') is None
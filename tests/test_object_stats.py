@@ -0,0 +1,102 @@
+"""
+Tests of object statistics reconciliation with mongomock collections
+"""
+import pytest
+
+pytest.importorskip('core_lib')
+mongomock = pytest.importorskip('mongomock')
+# pylint: disable-next=wrong-import-position
+from core.utils import object_stats
+# pylint: disable-next=wrong-import-position
+from core.utils.object_stats import ObjectStats
+
+
+@pytest.fixture(name='client')
+def fixture_client(monkeypatch):
+    """
+    Mongomock client that is used by object statistics
+    """
+    client = mongomock.MongoClient()
+
+    class FakeDatabase():  # pylint: disable=too-few-public-methods
+        """
+        Database stand-in with mongomock collection
+        """
+
+        def __init__(self, db_name):
+            self.collection = client['rereco'][db_name]
+
+    monkeypatch.setattr(object_stats, 'Database', FakeDatabase)
+    return client
+
+
+def add_requests(client, status, number):
+    """
+    Insert given number of requests with a status
+    """
+    collection = client['rereco']['requests']
+    start = collection.count_documents({})
+    collection.insert_many([{'_id': f'R-{start + i}', 'status': status,
+                             'subcampaign': 'Subcampaign',
+                             'processing_string': 'PS'} for i in range(number)])
+
+
+def test_reconcile_corrects_numbers_and_persists_flag(client):
+    """
+    Reconciliation stores numbers of all objects and marks statistics reconciled
+    """
+    add_requests(client, 'new', 3)
+    add_requests(client, 'done', 2)
+    stats = ObjectStats()
+    assert not stats.is_reconciled()
+    assert stats.reconcile() == 2
+    assert stats.get_counts('requests') == {('new', 'Subcampaign', 'PS'): 3,
+                                            ('done', 'Subcampaign', 'PS'): 2}
+    assert ObjectStats().is_reconciled()
+    assert stats.reconcile() == 0
+
+
+def test_reconcile_skips_numbers_changed_while_counting(client, monkeypatch):
+    """
+    Number that changed after it was read is not overwritten with a stale count
+    """
+    add_requests(client, 'new', 3)
+    stats = ObjectStats()
+    stats.reconcile()
+    # Stored number drifted
+    stats.counts.update_one({'_id': stats.get_id('requests', ('new', 'Subcampaign', 'PS'))},
+                            {'$inc': {'count': 5}})
+    count = stats.count
+
+    def count_and_create(db_name):
+        counts = count(db_name)
+        if db_name == 'requests':
+            # Request is created after objects were counted
+            add_requests(client, 'new', 1)
+            stats.change('requests', None, {'status': 'new',
+                                            'subcampaign': 'Subcampaign',
+                                            'processing_string': 'PS'})
+
+        return counts
+
+    monkeypatch.setattr(stats, 'count', count_and_create)
+    assert stats.reconcile() == 0
+    assert stats.get_counts('requests') == {('new', 'Subcampaign', 'PS'): 9}
+    monkeypatch.setattr(stats, 'count', count)
+    assert stats.reconcile() == 1
+    assert stats.get_counts('requests') == {('new', 'Subcampaign', 'PS'): 4}
+
+
+def test_reconcile_removes_numbers_of_unused_attributes(client):
+    """
+    Numbers grouped by attributes that are not used any more are removed
+    """
+    add_requests(client, 'new', 1)
+    stats = ObjectStats()
+    stats.counts.insert_one({'_id': '["requests", "new", "PS"]',
+                             'database': 'requests',
+                             'status': 'new',
+                             'processing_string': 'PS',
+                             'count': 7})
+    stats.reconcile()
+    assert stats.get_counts('requests') == {('new', 'Subcampaign', 'PS'): 1}
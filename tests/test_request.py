@@ -0,0 +1,50 @@
+"""
+Tests of read only requests
+"""
+import pytest
+
+pytest.importorskip('core_lib')
+# pylint: disable-next=wrong-import-position
+from core.model.request import Request
+
+
+REQUEST = {'_id': 'ReReco-Run2022A-ZeroBias-PS-00001',
+           'prepid': 'ReReco-Run2022A-ZeroBias-PS-00001',
+           'cmssw_release': 'CMSSW_12_4_0',
+           'input': {'dataset': '/ZeroBias/Run2022A-v1/RAW', 'request': ''},
+           'lumisections': {'315000': [[1, 10]]},
+           'runs': [315000],
+           'sequences': [{'datatier': ['AOD'], 'eventcontent': ['AOD'], 'step': ['RECO']},
+                         {'datatier': ['MINIAOD'], 'eventcontent': ['MINIAOD'], 'step': ['PAT']}],
+           'subcampaign': 'Run2022A-ReReco',
+           'processing_string': 'PS'}
+
+
+def test_read_only_values_are_copied():
+    """
+    Changing values of a read only request without set does not change its input
+    """
+    request_json = {k: (v.copy() if isinstance(v, (dict, list)) else v)
+                    for k, v in REQUEST.items()}
+    request = Request(json_input=request_json, read_only=True)
+    request.get('input')['dataset'] = '/JetMET/Run2022A-v1/RAW'
+    request.get('lumisections')['315000'].append([20, 30])
+    request.get('runs').append(315001)
+    assert request.get('input')['dataset'] == '/ZeroBias/Run2022A-v1/RAW'
+    assert request.get('lumisections') == {'315000': [[1, 10]]}
+    assert request.get('runs') == [315000]
+    assert request_json['input']['dataset'] == '/ZeroBias/Run2022A-v1/RAW'
+    assert request_json['lumisections'] == {'315000': [[1, 10]]}
+
+
+def test_read_only_sequences_keep_index():
+    """
+    Sequences of a read only request are the same objects with cached indices
+    """
+    request = Request(json_input=REQUEST, read_only=True)
+    sequences = request.get('sequences')
+    sequences.reverse()
+    assert [s.get('step') for s in request.get('sequences')] == [['RECO'], ['PAT']]
+    for index, sequence in enumerate(request.get('sequences')):
+        assert sequence is request.get('sequences')[index]
+        assert sequence.get_index_in_parent() == index
@@ -0,0 +1,58 @@
+"""
+Tests of scram arch index lookups
+"""
+import pytest
+
+pytest.importorskip('core_lib')
+# pylint: disable-next=wrong-import-position
+from core.utils import scram_arch_index
+# pylint: disable-next=wrong-import-position
+from core.utils.scram_arch_index import ScramArchIndex
+
+
+@pytest.fixture(name='index')
+def fixture_index(monkeypatch, tmp_path):
+    """
+    Scram arch index in a temporary file that records looked up releases
+    """
+    looked_up = []
+
+    def get_scram_arch(cmssw_release):
+        looked_up.append(cmssw_release)
+        return 'el8_amd64_gcc10'
+
+    monkeypatch.setattr(scram_arch_index, 'get_scram_arch', get_scram_arch)
+    index = ScramArchIndex()
+    index.file_path = str(tmp_path / 'scram_arch.json')
+    index.looked_up = looked_up
+    index.refresh_soon_calls = []
+    monkeypatch.setattr(index, 'refresh_soon', lambda: index.refresh_soon_calls.append(1))
+    index.update({'CMSSW_12_4_0': 'el8_amd64_gcc10'})
+    return index
+
+
+def test_get_does_not_look_up_missing_release(index):
+    """
+    Missing release returns default and schedules a background refresh
+    """
+    assert index.get('CMSSW_99_0_0', 'default') == 'default'
+    assert not index.looked_up
+    assert index.refresh_soon_calls
+
+
+def test_get_returns_indexed_release(index):
+    """
+    Indexed release is returned without lookups or refreshes
+    """
+    assert index.get('CMSSW_12_4_0') == 'el8_amd64_gcc10'
+    assert not index.looked_up
+    assert not index.refresh_soon_calls
+
+
+def test_lookup_adds_missing_release(index):
+    """
+    Lookup for submission finds missing release and adds it to the index
+    """
+    assert index.lookup('CMSSW_13_0_0') == 'el8_amd64_gcc10'
+    assert index.looked_up == ['CMSSW_13_0_0']
+    assert index.get('CMSSW_13_0_0') == 'el8_amd64_gcc10'
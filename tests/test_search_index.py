@@ -0,0 +1,109 @@
+"""
+Tests of search index with mongomock collections
+"""
+import pytest
+
+pytest.importorskip('core_lib')
+mongomock = pytest.importorskip('mongomock')
+# pylint: disable-next=wrong-import-position
+from core.utils import search_index
+# pylint: disable-next=wrong-import-position
+from core.utils.search_index import SearchIndex
+
+
+def make_request(prepid, workflow):
+    """
+    Return request with values that are indexed
+    """
+    return {'prepid': prepid,
+            'subcampaign': 'Run2022A-ReReco',
+            'processing_string': 'PS',
+            'input': {'dataset': '/ZeroBias/Run2022A-v1/RAW'},
+            'output_datasets': [],
+            'workflows': [{'name': workflow}]}
+
+
+@pytest.fixture(name='index')
+def fixture_index(monkeypatch):
+    """
+    Search index in mongomock collections
+    """
+    client = mongomock.MongoClient()
+
+    class FakeDatabase():  # pylint: disable=too-few-public-methods
+        """
+        Database stand-in with mongomock collection
+        """
+
+        def __init__(self, db_name):
+            self.collection = client['rereco'][db_name]
+
+    monkeypatch.setattr(search_index, 'Database', FakeDatabase)
+    return SearchIndex()
+
+
+def get_counts(index):
+    """
+    Return object counts of values in the index
+    """
+    return {v['value']: v['count'] for v in index.values.find()}
+
+
+def test_update_and_remove(index):
+    """
+    Counts change only by values that changed and removed objects are not counted
+    """
+    index.update('requests', make_request('ReReco-Run2022A-ZeroBias-PS-00001', 'wf_1'))
+    index.update('requests', make_request('ReReco-Run2022A-ZeroBias-PS-00002', 'wf_2'))
+    index.update('requests', make_request('ReReco-Run2022A-ZeroBias-PS-00002', 'wf_2'))
+    index.update('requests', make_request('ReReco-Run2022A-ZeroBias-PS-00002', 'wf_3'))
+    assert get_counts(index) == {'ReReco-Run2022A-ZeroBias-PS-00001': 1,
+                                 'ReReco-Run2022A-ZeroBias-PS-00002': 1,
+                                 'Run2022A-ReReco': 2,
+                                 'PS': 2,
+                                 '/ZeroBias/Run2022A-v1/RAW': 2,
+                                 'wf_1': 1,
+                                 'wf_3': 1}
+    index.remove('requests', 'ReReco-Run2022A-ZeroBias-PS-00002')
+    index.remove('requests', 'ReReco-Run2022A-ZeroBias-PS-00002')
+    assert get_counts(index) == {'ReReco-Run2022A-ZeroBias-PS-00001': 1,
+                                 'Run2022A-ReReco': 1,
+                                 'PS': 1,
+                                 '/ZeroBias/Run2022A-v1/RAW': 1,
+                                 'wf_1': 1}
+
+
+def test_concurrent_update(index, monkeypatch):
+    """
+    Values are not counted twice when object changes between read and update
+    """
+    prepid = 'ReReco-Run2022A-ZeroBias-PS-00001'
+    index.update('requests', make_request(prepid, 'wf_1'))
+    replace_values = index.replace_values
+
+    def concurrent_replace_values(object_id, stored, new_values):
+        monkeypatch.setattr(index, 'replace_values', replace_values)
+        SearchIndex().update('requests', make_request(prepid, 'wf_2'))
+        return replace_values(object_id, stored, new_values)
+
+    monkeypatch.setattr(index, 'replace_values', concurrent_replace_values)
+    index.update('requests', make_request(prepid, 'wf_3'))
+    assert get_counts(index) == {prepid: 1,
+                                 'Run2022A-ReReco': 1,
+                                 'PS': 1,
+                                 '/ZeroBias/Run2022A-v1/RAW': 1,
+                                 'wf_3': 1}
+
+
+def test_search_exact_match(index, monkeypatch):
+    """
+    Exact match is found even if there are more matches than ranked candidates
+    """
+    monkeypatch.setattr(index, 'max_candidates', 5)
+    for i in reversed(range(20)):
+        index.update('requests', make_request(f'ReReco-Run2022A-ZeroBias-PS-{i:05d}', f'wf_{i}'))
+
+    assert [r['value'] for r in index.search('WF_1', limit=1)] == ['wf_1']
+    assert [r['value'] for r in index.search('*zerobias-ps-00001', limit=1)] == [
+        'ReReco-Run2022A-ZeroBias-PS-00001'
+    ]
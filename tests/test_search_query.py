@@ -0,0 +1,126 @@
+"""
+Tests of searches with mongomock collections
+"""
+import pytest
+
+pytest.importorskip('core_lib')
+mongomock = pytest.importorskip('mongomock')
+# pylint: disable-next=wrong-import-position
+from core.utils import search_query
+# pylint: disable-next=wrong-import-position
+from core.utils.search_query import SearchQuery
+
+
+class FakeRequest():  # pylint: disable=too-few-public-methods
+    """
+    Model class stand-in with a schema of typed attributes
+    """
+
+    @staticmethod
+    def schema():
+        """
+        Return default values of attributes
+        """
+        return {'prepid': '', 'priority': 110000, 'status': '', 'runs': []}
+
+
+REQUESTS = [
+    {'_id': 'ReReco-Run2022A-ZeroBias-PS-00001', 'status': 'new', 'priority': 110000,
+     'runs': [315000, 315001], 'workflows': [{'name': 'wf_1'}]},
+    {'_id': 'ReReco-Run2022A-ZeroBias-PS-00002', 'status': 'submitted', 'priority': 120000,
+     'runs': [315002], 'workflows': [{'name': 'wf_2'}]},
+    {'_id': 'ReReco-Run2022B-JetMET-PS-00001', 'status': 'done', 'priority': 110000,
+     'runs': [316000], 'workflows': []},
+    {'_id': 'ReReco-Run2022B-JetMET-PS-00002', 'status': 'new', 'priority': 110000,
+     'runs': [315000], 'workflows': [], 'deleted': True},
+]
+
+
+@pytest.fixture(name='query')
+def fixture_query(monkeypatch):
+    """
+    Search query of requests in a mongomock collection
+    """
+    client = mongomock.MongoClient()
+    collection = client['rereco']['requests']
+    collection.insert_many([dict(r, prepid=r['_id']) for r in REQUESTS])
+
+    class FakeDatabase():  # pylint: disable=too-few-public-methods
+        """
+        Database stand-in with mongomock collection
+        """
+
+        def __init__(self, db_name):
+            self.collection = client['rereco'][db_name]
+
+    monkeypatch.setattr(search_query, 'Database', FakeDatabase)
+    return SearchQuery('requests', FakeRequest)
+
+
+def get_prepids(query, args, **kwargs):
+    """
+    Return sorted prepids of search results
+    """
+    return sorted(r['_id'] for r in query.search(args, **kwargs)['results'])
+
+
+def test_wildcards_are_case_insensitive(query):
+    """
+    Star matches anything and letter case does not matter
+    """
+    assert get_prepids(query, {'prepid': 'rereco-*zerobias*'}) == [
+        'ReReco-Run2022A-ZeroBias-PS-00001', 'ReReco-Run2022A-ZeroBias-PS-00002']
+    assert get_prepids(query, {'status': 'NEW'}) == ['ReReco-Run2022A-ZeroBias-PS-00001']
+
+
+def test_renames_and_types(query):
+    """
+    Renamed attributes are searched in their paths with their types
+    """
+    assert get_prepids(query, {'run': '315000'}) == ['ReReco-Run2022A-ZeroBias-PS-00001']
+    assert get_prepids(query, {'workflow': 'WF_2'}) == ['ReReco-Run2022A-ZeroBias-PS-00002']
+    assert get_prepids(query, {'priority': '120000'}) == ['ReReco-Run2022A-ZeroBias-PS-00002']
+    with pytest.raises(ValueError):
+        query.search({'priority': 'high'})
+
+
+def test_alternatives_and_deleted(query):
+    """
+    Comma separated values are alternatives and deleted objects never match
+    """
+    assert get_prepids(query, {'status': 'new,done'}) == [
+        'ReReco-Run2022A-ZeroBias-PS-00001', 'ReReco-Run2022B-JetMET-PS-00001']
+    response = query.search({}, count='exact')
+    assert response['total_rows'] == 3
+    assert response['total_rows_exact']
+
+
+def test_prepids_of_tickets(query):
+    """
+    Exact prepids restrict results and are alternatives of a prepid query
+    """
+    prepids = ['ReReco-Run2022B-JetMET-PS-00001', 'ReReco-Run2022B-JetMET-PS-00002']
+    assert get_prepids(query, {}, prepids=prepids) == ['ReReco-Run2022B-JetMET-PS-00001']
+    assert get_prepids(query, {'prepid': '*00002'}, prepids=prepids) == [
+        'ReReco-Run2022A-ZeroBias-PS-00002', 'ReReco-Run2022B-JetMET-PS-00001']
+
+
+def test_cursor_pages_and_fields(query):
+    """
+    Cursor pages through all results sorted by an attribute with requested fields
+    """
+    prepids = []
+    cursor = None
+    while True:
+        response = query.search({}, sort_attr='priority', sort_asc=False, limit=2,
+                                cursor=cursor, fields=['status'])
+        prepids.extend(r['_id'] for r in response['results'])
+        assert all(set(r) == {'_id', 'status', 'priority'} for r in response['results'])
+        cursor = response['next_cursor']
+        if not cursor:
+            break
+
+    # Objects with the same priority are sorted by id in the same direction
+    assert prepids == ['ReReco-Run2022A-ZeroBias-PS-00002',
+                       'ReReco-Run2022B-JetMET-PS-00001',
+                       'ReReco-Run2022A-ZeroBias-PS-00001']
@@ -0,0 +1,72 @@
+"""
+Tests of DAS query script of sequences
+"""
+import os
+import stat
+import subprocess
+import pytest
+
+pytest.importorskip('core_lib')
+# pylint: disable-next=wrong-import-position
+from core.model.sequence import Sequence, DAS_QUERY_WORKERS
+
+
+DATASET = '/ZeroBias/Run2022A-v1/RAW'
+# Fake dasgoclient that prints a file for each run of the query and fails for run 13
+FAKE_DASGOCLIENT = '''#!/bin/sh
+runs=$(echo "$4" | sed 's/.*\\[\\(.*\\)\\]/\\1/' | tr ',' ' ')
+case " $runs " in *" 13 "*) exit 1;; esac
+for run in $runs; do
+  echo "/store/file_$run.root"
+done
+'''
+
+
+def get_script(runs):
+    """
+    Return DAS query script of given runs
+    """
+    sequence = Sequence(read_only=True)
+    return ''.join(sequence.iter_das_queries(DATASET, runs, 'RECO_files.txt'))
+
+
+def test_script_shape():
+    """
+    Chunks of runs are written to a file that xargs reads, there is no here-document
+    """
+    script = get_script(list(range(1, 61)))
+    lines = script.splitlines()
+    assert '<<' not in script
+    assert [l for l in lines if l.startswith('echo ')] == [
+        'echo "0 %s" >> RECO_files.txt.runs' % ','.join(str(r) for r in range(1, 26)),
+        'echo "1 %s" >> RECO_files.txt.runs' % ','.join(str(r) for r in range(26, 51)),
+        'echo "2 %s" >> RECO_files.txt.runs' % ','.join(str(r) for r in range(51, 61)),
+    ]
+    xargs = [l for l in lines if l.startswith('xargs ')]
+    assert len(xargs) == 1
+    assert xargs[0].startswith('xargs -a RECO_files.txt.runs -L 1 -P %s ' % (DAS_QUERY_WORKERS))
+    assert 'run in [$1]" > RECO_files.txt.d/$0.txt\'' in xargs[0]
+    assert 'exit' not in script
+
+
+def test_script_tolerates_failed_queries(tmp_path):
+    """
+    Script lists unique files of successful queries and continues after failures
+    """
+    dasgoclient = tmp_path / 'dasgoclient'
+    dasgoclient.write_text(FAKE_DASGOCLIENT, encoding='utf-8')
+    dasgoclient.chmod(dasgoclient.stat().st_mode | stat.S_IEXEC)
+    runs = list(range(1, 31))
+    script = get_script(runs) + 'echo done\n'
+    env = dict(os.environ, PATH=f'{tmp_path}:{os.environ["PATH"]}')
+    result = subprocess.run(['bash', '-c', script],
+                            cwd=tmp_path,
+                            env=env,
+                            capture_output=True,
+                            check=False,
+                            text=True)
+    assert result.stdout.strip() == 'done'
+    files = (tmp_path / 'RECO_files.txt').read_text(encoding='utf-8').split()
+    # First chunk has run 13 and fails, second chunk succeeds
+    assert files == sorted(f'/store/file_{run}.root' for run in range(26, 31))
+    assert sorted(os.listdir(tmp_path)) == ['RECO_files.txt', 'dasgoclient']
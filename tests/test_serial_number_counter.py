@@ -0,0 +1,86 @@
+"""
+Tests of serial number counter with mongomock collections
+"""
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+pytest.importorskip('core_lib')
+mongomock = pytest.importorskip('mongomock')
+# pylint: disable-next=wrong-import-position
+from core.utils import serial_number_counter
+# pylint: disable-next=wrong-import-position
+from core.utils.serial_number_counter import SerialNumberCounter
+
+
+PREFIX = 'ReReco-Run2022A-ZeroBias-PS'
+
+
+@pytest.fixture(name='client')
+def fixture_client(monkeypatch):
+    """
+    Mongomock client with existing requests of a prefix
+    """
+    client = mongomock.MongoClient()
+    lock = Lock()
+    client['rereco']['requests'].insert_many([{'_id': f'{PREFIX}-00003'},
+                                              {'_id': f'{PREFIX}-00012'},
+                                              {'_id': f'{PREFIX}X-00099'}])
+
+    class AtomicCollection():  # pylint: disable=too-few-public-methods
+        """
+        Mongomock collection stand-in whose operations are atomic like in MongoDB
+        """
+
+        def __init__(self, collection):
+            self.collection = collection
+
+        def __getattr__(self, name):
+            method = getattr(self.collection, name)
+
+            def atomic_method(*args, **kwargs):
+                with lock:
+                    return method(*args, **kwargs)
+
+            return atomic_method
+
+    class FakeDatabase():  # pylint: disable=too-few-public-methods
+        """
+        Database stand-in with mongomock collection
+        """
+
+        def __init__(self, db_name):
+            self.collection = AtomicCollection(client['rereco'][db_name])
+
+    monkeypatch.setattr(serial_number_counter, 'Database', FakeDatabase)
+    return client
+
+
+def test_counter_starts_after_existing_objects(client):
+    """
+    Counter of a new prefix continues from the highest existing serial number
+    """
+    assert client
+    counter = SerialNumberCounter('requests')
+    assert counter.reserve(PREFIX) == 13
+    assert counter.reserve(PREFIX, 3) == 14
+    assert counter.reserve(PREFIX) == 17
+    assert counter.reserve('ReReco-Run2022B-ZeroBias-PS') == 1
+
+
+def test_concurrent_reservations(client):
+    """
+    Serial numbers reserved by many threads at once do not overlap
+    """
+    assert client
+
+    def reserve(index):
+        count = index % 3 + 1
+        first = SerialNumberCounter('requests').reserve(PREFIX, count)
+        return list(range(first, first + count))
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        reserved = [n for numbers in executor.map(reserve, range(300)) for n in numbers]
+
+    assert len(reserved) == 600
+    assert sorted(reserved) == list(range(13, 613))
@@ -0,0 +1,88 @@
+"""
+Tests of SSH session pool with a fake SSH executor
+"""
+import pytest
+
+pytest.importorskip('core_lib')
+# pylint: disable-next=wrong-import-position
+from core.utils import ssh_pool
+# pylint: disable-next=wrong-import-position
+from core.utils.ssh_pool import SSHPool
+
+
+class FakeExecutor():
+    """
+    SSH executor stand-in that can be broken
+    """
+
+    def __init__(self, **_):
+        self.broken = False
+        self.closed = False
+
+    def execute_command(self, _):
+        """
+        Fail every command if session is broken
+        """
+        return '', '', 1 if self.broken else 0
+
+    def close_connections(self):
+        """
+        Mark session as closed
+        """
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def fake_executor(monkeypatch):
+    """
+    Use fake executor and empty pool in every test
+    """
+    monkeypatch.setattr(ssh_pool, 'SSHExecutor', FakeExecutor)
+    # pylint: disable=protected-access
+    SSHPool._SSHPool__idle_sessions.clear()
+    yield
+    SSHPool._SSHPool__idle_sessions.clear()
+
+
+def test_session_is_reused():
+    """
+    Session that was returned to the pool is used again
+    """
+    with SSHPool().session() as first:
+        pass
+
+    with SSHPool().session() as second:
+        pass
+
+    assert first is second
+    assert not first.closed
+
+
+def test_broken_session_is_discarded():
+    """
+    Session that fails a check is closed and a new one is opened
+    """
+    with SSHPool().session() as first:
+        pass
+
+    first.broken = True
+    with SSHPool().session() as second:
+        pass
+
+    assert second is not first
+    assert first.closed
+
+
+def test_session_is_discarded_after_error():
+    """
+    Session that was used when exception was raised is not reused
+    """
+    with pytest.raises(RuntimeError):
+        with SSHPool().session() as first:
+            raise RuntimeError('Command failed')
+
+    with SSHPool().session() as second:
+        pass
+
+    assert second is not first
+    assert first.closed
@@ -0,0 +1,79 @@
+"""
+Tests of requests of tickets cache with mongomock collections
+"""
+import pytest
+
+pytest.importorskip('core_lib')
+mongomock = pytest.importorskip('mongomock')
+# pylint: disable-next=wrong-import-position
+from core.utils import search_query, ticket_requests_cache
+# pylint: disable-next=wrong-import-position
+from core.utils.ticket_requests_cache import TicketRequestsCache
+
+
+TICKETS = [
+    {'_id': 'Run2022A-00001', 'created_requests': ['ReReco-Run2022A-ZeroBias-PS-00002',
+                                                   'ReReco-Run2022A-ZeroBias-PS-00001']},
+    {'_id': 'Run2022A-00002', 'created_requests': ['ReReco-Run2022A-JetMET-PS-00001']},
+    {'_id': 'Run2022B-00001', 'created_requests': ['ReReco-Run2022B-JetMET-PS-00001']},
+    {'_id': 'Run2022B-00002', 'created_requests': ['ReReco-Run2022B-JetMET-PS-00002'],
+     'deleted': True},
+]
+
+
+@pytest.fixture(name='client')
+def fixture_client(monkeypatch):
+    """
+    Mongomock client with tickets that is used by the cache
+    """
+    client = mongomock.MongoClient()
+    client['rereco']['tickets'].insert_many([dict(t, prepid=t['_id']) for t in TICKETS])
+
+    class FakeDatabase():  # pylint: disable=too-few-public-methods
+        """
+        Database stand-in with mongomock collection
+        """
+
+        def __init__(self, db_name):
+            self.collection = client['rereco'][db_name]
+
+    monkeypatch.setattr(search_query, 'Database', FakeDatabase)
+    monkeypatch.setattr(ticket_requests_cache, 'Database', FakeDatabase)
+    TicketRequestsCache().invalidate()
+    return client
+
+
+def test_ticket_lookup(client):
+    """
+    Ticket prepids are case insensitive, * matches anything and deleted
+    tickets are ignored
+    """
+    assert client
+    cache = TicketRequestsCache()
+    assert cache.get('run2022a-00001') == ['ReReco-Run2022A-ZeroBias-PS-00001',
+                                           'ReReco-Run2022A-ZeroBias-PS-00002']
+    assert cache.get('Run2022A-*') == ['ReReco-Run2022A-JetMET-PS-00001',
+                                       'ReReco-Run2022A-ZeroBias-PS-00001',
+                                       'ReReco-Run2022A-ZeroBias-PS-00002']
+    assert cache.get('Run2022B-*') == ['ReReco-Run2022B-JetMET-PS-00001']
+    assert cache.get('Run2022A-00002,Run2022B-00001') == ['ReReco-Run2022A-JetMET-PS-00001',
+                                                          'ReReco-Run2022B-JetMET-PS-00001']
+    assert cache.get('Run2022') == []
+
+
+def test_invalidate_other_process(client):
+    """
+    Invalidation in another process changes generation in the database and
+    cached requests are looked up again
+    """
+    cache = TicketRequestsCache()
+    assert cache.get('Run2022B-00001') == ['ReReco-Run2022B-JetMET-PS-00001']
+    tickets = client['rereco']['tickets']
+    tickets.update_one({'_id': 'Run2022B-00001'},
+                       {'$push': {'created_requests': 'ReReco-Run2022B-JetMET-PS-00003'}})
+    # Cached value is returned until generation changes
+    assert cache.get('Run2022B-00001') == ['ReReco-Run2022B-JetMET-PS-00001']
+    client['rereco']['caches'].update_one({'_id': TicketRequestsCache.generation_id},
+                                          {'$inc': {'generation': 1}})
+    assert cache.get('Run2022B-00001') == ['ReReco-Run2022B-JetMET-PS-00001',
+                                           'ReReco-Run2022B-JetMET-PS-00003']
@@ -0,0 +1,99 @@
+"""
+Tests of shared voms proxy refresh with a fake SSH executor
+"""
+import pytest
+from core.utils.voms_proxy import VomsProxy
+
+
+class FakeExecutor():
+    """
+    SSH executor stand-in that records commands and reports proxy validity
+    """
+
+    def __init__(self, time_left):
+        self.time_left = time_left
+        self.commands = []
+
+    def execute_command(self, command):
+        """
+        Record command, refresh makes proxy valid for 12 hours
+        """
+        command = '; '.join(command)
+        self.commands.append(command)
+        if 'voms-proxy-init' in command:
+            self.time_left = 12 * 3600
+            return '', '', 0
+
+        if 'voms-proxy-info' in command:
+            return f'{self.time_left}\n', '', 0
+
+        return '', '', 0
+
+    def refreshes(self):
+        """
+        Return commands that created a new proxy
+        """
+        return [c for c in self.commands if 'voms-proxy-init' in c]
+
+
+@pytest.fixture(autouse=True)
+def reset_proxy_state():
+    """
+    Forget validity of the proxy that is cached in the process
+    """
+    # pylint: disable=protected-access
+    VomsProxy._VomsProxy__valid_until = 0
+    yield
+    VomsProxy._VomsProxy__valid_until = 0
+
+
+def test_valid_remote_proxy_is_reused():
+    """
+    Proxy that has enough validity left on the machine is not created again
+    """
+    executor = FakeExecutor(time_left=6 * 3600)
+    proxy_path = VomsProxy().ensure_valid(executor)
+    assert proxy_path == VomsProxy().get_path()
+    assert not executor.refreshes()
+
+
+def test_expiring_proxy_is_refreshed_once():
+    """
+    Proxy close to expiry is refreshed once and then reused from memory
+    """
+    executor = FakeExecutor(time_left=60)
+    VomsProxy().ensure_valid(executor)
+    assert len(executor.refreshes()) == 1
+    commands_after_refresh = len(executor.commands)
+    VomsProxy().ensure_valid(executor)
+    assert len(executor.refreshes()) == 1
+    assert len(executor.commands) == commands_after_refresh
+
+
+def test_refresh_replaces_proxy_atomically():
+    """
+    New proxy is written to a unique temporary file and renamed over the shared one
+    """
+    proxy_path = VomsProxy().get_path()
+    command = VomsProxy().get_refresh_command()
+    assert f'mktemp {proxy_path}.XXXXXX' in command
+    assert f'--out {proxy_path} ' not in command
+    assert f'mv -f $new_proxy {proxy_path}' in command
+
+
+def test_failed_refresh_raises():
+    """
+    Error of proxy creation is raised
+    """
+    class FailingExecutor(FakeExecutor):
+        """
+        Executor where proxy creation fails
+        """
+        def execute_command(self, command):
+            if 'voms-proxy-init' in ' '.join(command):
+                return '', 'no certificate', 1
+
+            return super().execute_command(command)
+
+    with pytest.raises(RuntimeError):
+        VomsProxy().ensure_valid(FailingExecutor(time_left=0))